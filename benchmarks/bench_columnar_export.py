@@ -0,0 +1,57 @@
+"""
+Streams synthetic follower pages into ColumnarWriter and reports the peak
+memory, the file size and how long reading one column back takes.
+
+usage: python benchmarks/bench_columnar_export.py [number_of_followers]
+1000000 followers by default, in pages of 50 like iter_followers yields.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from igramscraper.columnar import ColumnarWriter, ColumnarReader, ACCOUNT_COLUMNS
+from igramscraper.model.lean import LeanAccount
+
+
+def follower_pages(count, page_size=50):
+    for start in range(0, count, page_size):
+        yield {'accounts': [LeanAccount({'id': str(10 ** 9 + i),
+                                         'username': f'follower_{i}',
+                                         'full_name': f'Follower {i}',
+                                         'profile_pic_url': f'https://scontent.cdninstagram.com/v/t51/{i}_n.jpg',
+                                         'is_private': i % 3 == 0,
+                                         'is_verified': i % 97 == 0})
+                            for i in range(start, min(count, start + page_size))]}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'followers.igcol')
+
+        tracemalloc.start()
+        started_at = time.perf_counter()
+        with ColumnarWriter(path, ACCOUNT_COLUMNS) as writer:
+            writer.write_pages(follower_pages(count), 'accounts')
+        elapsed = time.perf_counter() - started_at
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f'wrote {count} rows in {elapsed:.1f} s, peak memory {peak / 1024 / 1024:.1f} MB, '
+              f'file {os.path.getsize(path) / 1024 / 1024:.1f} MB')
+
+        started_at = time.perf_counter()
+        with ColumnarReader(path) as reader:
+            private = sum(sum(reader.read_batch(index, ['is_private'])['is_private'])
+                          for index in range(reader.batch_count))
+        print(f'read is_private of {count} rows in {time.perf_counter() - started_at:.2f} s '
+              f'({private} private)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Compares decoding response bodies with response.json() style
+(bytes -> str -> stdlib json) against every installed JsonCodec decoding
+the bytes directly.
+
+usage: python benchmarks/bench_json_codec.py [recorded_response.json ...]
+Without arguments a synthetic page of 50 followers and a synthetic
+hashtag page of 70 medias are used.
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from igramscraper.json_codec import CODECS, get_codec
+from bench_model_parsing import follower_page, media_page
+
+
+def synthetic_pages():
+    followers = {'data': {'user': {'edge_followed_by': {
+        'count': 48213,
+        'page_info': {'has_next_page': True, 'end_cursor': 'QVFE' + 'x' * 120},
+        'edges': follower_page()}}}}
+    medias = {'graphql': {'hashtag': {'name': 'youneverknow', 'edge_hashtag_to_media': {
+        'count': 1300000,
+        'page_info': {'has_next_page': True, 'end_cursor': 'QVFE' + 'y' * 120},
+        'edges': media_page() + media_page()[:20]}}}}
+    return [('followers page', json.dumps(followers).encode('utf-8')),
+            ('tag page', json.dumps(medias).encode('utf-8'))]
+
+
+def main():
+    if len(sys.argv) > 1:
+        pages = [(path, open(path, 'rb').read()) for path in sys.argv[1:]]
+    else:
+        pages = synthetic_pages()
+
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print(f'{name}: not installed')
+
+    number = 500
+    for name, content in pages:
+        baseline = timeit.timeit(lambda: json.loads(content.decode('utf-8')),
+                                 number=number) / number
+        print(f'{name}: {len(content) / 1024:.0f} KB, '
+              f'decode + json.loads {baseline * 1000:.3f} ms')
+        for codec in codecs:
+            elapsed = timeit.timeit(lambda: codec.loads(content), number=number) / number
+            print(f'  {codec.name}.loads(bytes) {elapsed * 1000:.3f} ms, '
+                  f'{baseline / elapsed:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Compares the memory of a large follower list parsed into Account and into
+LeanAccount, the models Instagram.set_lean_models() switches to.
+
+usage: python benchmarks/bench_lean_models.py [number_of_followers]
+Follower nodes are synthetic and shaped like the ones of FOLLOWERS_URL,
+50000 by default.
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from igramscraper.model.account import Account
+from igramscraper.model.lean import LeanAccount
+
+
+def follower_nodes(count):
+    return [{'node': {'id': str(10 ** 9 + i),
+                      'username': f'follower_{i}',
+                      'full_name': f'Follower {i}',
+                      'profile_pic_url': f'https://scontent.cdninstagram.com/v/t51/{i}_n.jpg',
+                      'is_private': i % 3 == 0,
+                      'is_verified': False,
+                      'followed_by_viewer': False,
+                      'requested_by_viewer': False,
+                      'reel': {'id': str(10 ** 9 + i), 'expiring_at': 1600000000,
+                               'has_pride_media': False, 'latest_reel_media': 0,
+                               'seen': None, 'owner': {'__typename': 'GraphUser',
+                                                       'id': str(10 ** 9 + i)}}}}
+            for i in range(count)]
+
+
+def measure(model_class, edges):
+    gc.collect()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    accounts = [model_class(edge['node']) for edge in edges]
+    elapsed = time.perf_counter() - started_at
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return accounts, size, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    edges = follower_nodes(count)
+
+    results = []
+    for model_class in (Account, LeanAccount):
+        accounts, size, elapsed = measure(model_class, edges)
+        assert accounts[-1].username == f'follower_{count - 1}'
+        results.append(size)
+        print(f'{model_class.__name__}: {count} followers, {size / 1024 / 1024:.1f} MB, '
+              f'{size / count:.0f} bytes each, parsed in {elapsed * 1000:.0f} ms')
+        del accounts
+
+    print(f'LeanAccount uses {results[0] / results[1]:.1f}x less memory')
+
+
+if __name__ == '__main__':
+    main()
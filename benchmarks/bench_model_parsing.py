@@ -0,0 +1,101 @@
+"""
+Times building Media and Account models from a page of 50 hashtag medias
+and a page of 50 followers, the unit every paginated call parses.
+
+usage: python benchmarks/bench_model_parsing.py [repeats] [--baseline REV]
+Pages are synthetic and shaped like the ones of MEDIA_JSON_BY_TAG and
+FOLLOWERS_URL. With --baseline the models of git revision REV, e.g. one
+from before the dispatch table, are timed on the same pages first.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def media_page():
+    return [{'node': {
+        '__typename': 'GraphImage',
+        'id': str(2 * 10 ** 18 + i),
+        'shortcode': f'B{i:010d}',
+        'comments_disabled': False,
+        'dimensions': {'height': 1080, 'width': 1080},
+        'display_url': f'https://scontent.cdninstagram.com/{i}.jpg',
+        'edge_liked_by': {'count': i * 7},
+        'edge_media_preview_like': {'count': i * 7},
+        'edge_media_to_caption': {'edges': [{'node': {'text': f'caption {i}'}}]},
+        'edge_media_to_comment': {'count': 3},
+        'owner': {'id': str(10 ** 9 + i)},
+        'taken_at_timestamp': 1600000000 + i,
+        'thumbnail_src': f'https://scontent.cdninstagram.com/{i}_s.jpg',
+        'thumbnail_resources': [{'src': f'https://scontent.cdninstagram.com/{i}_{w}.jpg',
+                                 'config_width': w, 'config_height': w}
+                                for w in (150, 240, 320, 480, 640)],
+        'is_video': False,
+        'accessibility_caption': None,
+    }} for i in range(50)]
+
+
+def follower_page():
+    return [{'node': {
+        'id': str(10 ** 9 + i),
+        'username': f'follower_{i}',
+        'full_name': f'Follower {i}',
+        'profile_pic_url': f'https://scontent.cdninstagram.com/v/t51/{i}_n.jpg',
+        'is_private': i % 3 == 0,
+        'is_verified': False,
+        'followed_by_viewer': False,
+        'requested_by_viewer': False,
+        'reel': {'id': str(10 ** 9 + i), 'expiring_at': 1600000000},
+    }} for i in range(50)]
+
+
+def time_models(root, repeats, label):
+    sys.path.insert(0, root)
+    from igramscraper.model.account import Account
+    from igramscraper.model.media import Media
+
+    for name, model_class, page in (('50 medias', Media, media_page()),
+                                    ('50 followers', Account, follower_page())):
+        elapsed = min(timeit.repeat(lambda: [model_class(edge['node']) for edge in page],
+                                    number=repeats, repeat=3)) / repeats
+        print(f'{label}{name}: {elapsed * 1000:.3f} ms per page')
+
+
+def time_revision(revision, repeats):
+    """
+    Times the models of another revision in a child process, so its package
+    does not clash with the one of the working tree
+    :param revision: git revision igramscraper is extracted from
+    :param repeats: parses of each page
+    """
+    with tempfile.TemporaryDirectory() as root:
+        archive = subprocess.run(['git', '-C', ROOT, 'archive', revision, 'igramscraper'],
+                                 check=True, stdout=subprocess.PIPE).stdout
+        subprocess.run(['tar', '-x', '-C', root], input=archive, check=True)
+        subprocess.run([sys.executable, os.path.abspath(__file__), str(repeats),
+                        '--root', root, '--label', f'{revision}: '], check=True)
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for option in ('--baseline', '--root', '--label'):
+        if option in args:
+            index = args.index(option)
+            options[option] = args[index + 1]
+            del args[index:index + 2]
+    repeats = int(args[0]) if args else 2000
+
+    if '--baseline' in options:
+        time_revision(options['--baseline'], repeats)
+        time_models(ROOT, repeats, 'working tree: ')
+    else:
+        time_models(options.get('--root', ROOT), repeats, options.get('--label', ''))
+
+
+if __name__ == '__main__':
+    main()
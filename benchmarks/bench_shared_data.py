@@ -0,0 +1,61 @@
+"""
+Compares the regex based _sharedData extraction with the marker and
+raw_decode based Instagram.extract_shared_data_from_body.
+
+usage: python benchmarks/bench_shared_data.py [saved_profile_page.html ...]
+Without arguments a synthetic profile page of roughly 250 KB is used.
+"""
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from igramscraper.instagram import Instagram
+
+
+def regex_extract(body):
+    array = re.findall(r'_sharedData = .*?;</script>', body)
+    if len(array) > 0:
+        raw_json = array[0][len("_sharedData ="):-len(";</script>")]
+        return json.loads(raw_json)
+    return None
+
+
+def synthetic_page():
+    edges = [{'node': {'id': str(i), 'shortcode': f'B{i:010d}',
+                       'display_url': f'https://scontent.cdninstagram.com/{i}.jpg',
+                       'edge_liked_by': {'count': i * 7},
+                       'edge_media_to_caption': {'edges': [{'node': {'text': 'caption ' * 20}}]}}}
+             for i in range(300)]
+    shared_data = {'config': {'csrf_token': 'x' * 32},
+                   'entry_data': {'ProfilePage': [{'graphql': {'user': {
+                       'id': '3', 'username': 'kevin',
+                       'edge_owner_to_timeline_media': {'count': 300, 'edges': edges}}}}]}}
+    head = '<html><head>' + '<script src="/static/bundle.js"></script>' * 2000
+    return (head + '<script type="text/javascript">window._sharedData = '
+            + json.dumps(shared_data) + ';</script>' + '<div></div>' * 5000
+            + '</body></html>')
+
+
+def main():
+    if len(sys.argv) > 1:
+        pages = [(path, open(path, encoding='utf-8').read()) for path in sys.argv[1:]]
+    else:
+        pages = [('synthetic', synthetic_page())]
+
+    for name, body in pages:
+        assert regex_extract(body) == Instagram.extract_shared_data_from_body(body)
+        number = 50
+        regex_time = timeit.timeit(lambda: regex_extract(body), number=number) / number
+        find_time = timeit.timeit(lambda: Instagram.extract_shared_data_from_body(body),
+                                  number=number) / number
+        print(f'{name}: {len(body) / 1024:.0f} KB, regex {regex_time * 1000:.2f} ms, '
+              f'find + raw_decode {find_time * 1000:.2f} ms, '
+              f'{regex_time / find_time:.1f}x faster')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import os
+
+from context import Instagram # pylint: disable=no-name-in-module
+from igramscraper.blob_store import BlobStore
+from igramscraper.media_downloader import MediaDownloader
+
+instagram = Instagram()
+instagram.with_credentials('username', 'password', 'path/to/cache/folder')
+instagram.login()
+
+# Reposts and profile pictures seen on several accounts are fetched once;
+# files nobody references any more are dropped once the store passes 20 GB
+store = BlobStore('archive/blobs', max_size=20 * 1024 ** 3)
+
+for user_stories in instagram.get_stories():
+    folder = os.path.join('archive', user_stories.owner.username)
+    downloader = MediaDownloader(folder, store=store)
+    downloader.download(user_stories.stories)
+    downloader.download_url(user_stories.owner.get_profile_picture_url(),
+                            os.path.join(folder, 'profile.jpg'))
+    print(user_stories.owner.username, downloader.get_stats())
+
+print(store.get_stats())
+store.close()
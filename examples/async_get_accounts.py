@@ -0,0 +1,18 @@
+import asyncio
+
+from context import Instagram # pylint: disable=no-name-in-module
+from igramscraper.async_instagram import AsyncInstagram
+
+instagram = AsyncInstagram(Instagram(), max_workers=4)
+
+
+async def main():
+    # Both lookups run at the same time without blocking the event loop
+    accounts = await asyncio.gather(
+        instagram.get_account('kevin'),
+        instagram.get_account('instagram'),
+    )
+    for account in accounts:
+        print(account)
+
+asyncio.run(main())
@@ -0,0 +1,25 @@
+import queue
+import threading
+
+from context import Instagram # pylint: disable=no-name-in-module
+from igramscraper.crawl_scheduler import CrawlScheduler
+from igramscraper.media_watcher import MediaWatcher
+
+instagram = Instagram(sleep_between_requests=0.5)
+
+new_medias = queue.Queue()
+watcher = MediaWatcher(instagram, queue=new_medias, path='/cachepath/marks.json')
+
+# Four workers share the two requests per second of the instance; busy tags
+# get a larger share of them and are polled every minute
+scheduler = CrawlScheduler(watcher, workers=4)
+scheduler.add_tag('photography', priority=3, refresh_interval=60)
+scheduler.add_tag('sunset', refresh_interval=300)
+scheduler.add_location('17326249', refresh_interval=600)
+
+stop_event = threading.Event()
+threading.Thread(target=scheduler.run, args=(stop_event,)).start()
+
+while True:
+    media = new_medias.get()
+    print(media.identifier, media.link)
@@ -0,0 +1,23 @@
+from context import Instagram # pylint: disable=no-name-in-module
+from igramscraper.media_downloader import MediaDownloader
+
+instagram = Instagram()
+instagram.with_credentials('username', 'password', 'path/to/cache/folder')
+instagram.login()
+
+
+def report(result, stats):
+    print(result['status'], result['path'],
+          f"{stats['completed']}/{stats['queued']}",
+          f"{stats['throughput'] / 1024 / 1024:.1f} MB/s")
+
+
+downloader = MediaDownloader('downloads', resolution=MediaDownloader.HIGH,
+                             workers=8, progress=report)
+
+downloader.download(instagram.get_medias('kevin', 50))
+
+for user_stories in instagram.get_stories():
+    downloader.download(user_stories.stories)
+
+print(downloader.get_stats())
@@ -0,0 +1,27 @@
+from itertools import islice
+
+from context import Instagram # pylint: disable=no-name-in-module
+from igramscraper.columnar import ColumnarWriter, ColumnarReader, ACCOUNT_COLUMNS, MEDIA_COLUMNS
+
+instagram = Instagram()
+instagram.with_credentials('username', 'password', '/cachepath')
+instagram.login()
+instagram.set_lean_models()
+
+account = instagram.get_account('kevin')
+
+# Pages are written batch by batch, the crawl is never held in memory
+with ColumnarWriter('kevin_followers.igcol', ACCOUNT_COLUMNS) as writer:
+    writer.write_pages(instagram.iter_followers(account.identifier, page_size=50), 'accounts')
+
+with ColumnarWriter('kevin_medias.igcol', MEDIA_COLUMNS) as writer:
+    writer.write_pages(instagram.iter_medias_by_user_id(account.identifier, page_size=50), 'medias')
+
+with ColumnarWriter('tag_medias.igcol', MEDIA_COLUMNS) as writer:
+    # hashtag feeds rarely end, so only the first 20 pages are exported
+    writer.write_pages(islice(instagram.iter_medias_by_tag('youneverknow'), 20), 'medias')
+
+with ColumnarReader('kevin_followers.igcol') as reader:
+    for index in range(reader.batch_count):
+        batch = reader.read_batch(index, ['id', 'is_private'])
+        print(sum(batch['is_private']), 'private followers in batch', index)
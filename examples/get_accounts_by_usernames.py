@@ -0,0 +1,12 @@
+from context import Instagram # pylint: disable=no-name-in-module
+
+instagram = Instagram()
+
+# Fetches up to 4 profiles at the same time, duplicates are only fetched once
+results = instagram.get_accounts(['kevin', 'instagram', 'kevin'], concurrency=4)
+
+for result in results:
+    if result['error'] is not None:
+        print(result['username'], 'failed:', result['error'])
+    else:
+        print(result['account'])
@@ -0,0 +1,16 @@
+from context import Instagram # pylint: disable=no-name-in-module
+
+instagram = Instagram()
+instagram.with_credentials('username', 'password', '/cachepath')
+instagram.login()
+
+account = instagram.get_account('kevin')
+
+# Pages are yielded as soon as they are parsed, nothing is kept in memory
+next_page = ''
+for page in instagram.iter_followers(account.identifier, page_size=50):
+    for follower in page['accounts']:
+        print(follower.username)
+
+    # Store this cursor to continue the crawl later with end_cursor=next_page
+    next_page = page['next_page']
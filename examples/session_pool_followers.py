@@ -0,0 +1,17 @@
+from context import Instagram # pylint: disable=no-name-in-module
+from igramscraper.session_pool import SessionPool
+
+pool = SessionPool(strategy=SessionPool.LEAST_LOADED, cooldown=900)
+pool.add_account('username1', 'password1', '/cachepath')
+pool.add_account('username2', 'password2', '/cachepath')
+
+# Each crawl runs on the least loaded session; if that session gets a 429
+# or a checkpoint the crawl continues from its last cursor on another one
+for page in pool.iter_pages('iter_followers', '3', page_size=50, delayed=False):
+    for follower in page['accounts']:
+        print(follower.username)
+
+account = pool.run(lambda instagram: instagram.get_account('kevin'))
+print(account)
+
+print(pool.get_stats())
@@ -1,24 +1,18 @@
-from igramscraper.instagram import Instagram
+from igramscraper.async_instagram import AsyncInstagram
+from igramscraper.follower_diff import FollowerSnapshots
 import time
 from telethon import TelegramClient,events,sync,Button
 
-instagram= Instagram()
+instagram= AsyncInstagram()
 username= '_photo__paradise_'
 password= 'insta@photoparadise'
+tracked_username= "iam_sandeepk10"
+snapshots= FollowerSnapshots('snapshots')
 
 instagram.with_credentials(username,password)
 
-instagram.login()
-
-account= instagram.get_account("iam_sandeepk10")
-
-
-followers = account.followed_by_count
-following = account.follows_count
-
-
-folowers=[]
-folowers = instagram.get_followers(account.identifier, 150, 100, delayed=True)
+# login once before the event loop starts, every later call is awaited
+instagram.instagram.login()
 
 
 
@@ -38,15 +32,32 @@ async def my_event_handler(event):
         await event.reply('Hi!,Sandeep welcome to instabot this will update you about who unfollowed you on instagram recently')
 
     if "update" in event.raw_text:
-        await event.respond("This feature is still unavailable.")
+        account = await instagram.get_account(tracked_username)
+        follower_ids = []
+        async for page in instagram.iter_followers(account.identifier, 50):
+            follower_ids.extend(follower.identifier for follower in page['accounts'])
+
+        changes = snapshots.refresh(account.identifier, follower_ids)
+        if changes['is_initial']:
+            await event.respond("Started tracking "+str(len(follower_ids))+" followers, send update again later")
+        elif not changes['removed']:
+            await event.respond("Nobody unfollowed you since the last update")
+        else:
+            for follower_id in changes['removed']:
+                unfollower = await instagram.get_username_by_id(follower_id)
+                await event.respond(unfollower+" unfollowed you")
 
     if "followers" in event.raw_text:
-        await event.respond( "At this moment you are having "+str(followers)+" Followers")
+        account = await instagram.get_account(tracked_username)
+        await event.respond( "At this moment you are having "+str(account.followed_by_count)+" Followers")
 
     if "following" in event.raw_text:
-        await event.respond("At this moment you are following "+str(following)+ " people")
+        account = await instagram.get_account(tracked_username)
+        await event.respond("At this moment you are following "+str(account.follows_count)+ " people")
 
     if "list" in event.raw_text:
+        account = await instagram.get_account(tracked_username)
+        folowers = await instagram.get_followers(account.identifier, 150, 100, delayed=True)
         for follower in folowers['accounts']:
             await event.respond(str(follower))
 
@@ -0,0 +1,131 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .instagram import Instagram
+
+
+class AsyncInstagram:
+    """
+    Awaitable facade over Instagram for use inside an asyncio event loop.
+
+    Every network call of the wrapped Instagram instance runs on a bounded
+    thread pool, so a slow follower crawl does not block the loop. Anything
+    that is not a network call (with_credentials, set_proxies, ...) is
+    forwarded to the wrapped instance unchanged.
+    """
+
+    AWAITABLE_METHODS = [
+        'get_account_by_id',
+        'get_username_by_id',
+        'search_tags_by_tag_name',
+        'get_medias',
+        'get_medias_by_code',
+        'get_medias_by_user_id',
+        'get_media_by_id',
+        'get_media_by_url',
+        'get_medias_from_feed',
+        'get_medias_by_tag',
+        'get_medias_by_location_id',
+        'get_current_top_medias_by_tag_name',
+        'get_current_top_medias_by_location_id',
+        'get_paginate_medias',
+        'get_paginate_medias_by_tag',
+        'get_location_by_id',
+        'get_media_likes_by_code',
+        'get_followers',
+        'get_following',
+        'crawl_followers',
+        'crawl_following',
+        'get_media_comments_by_id',
+        'get_media_comments_by_code',
+        'get_number_of_media_comments_by_id',
+        'get_account',
+        'get_accounts',
+        'get_stories',
+        'search_accounts_by_username',
+        'get_media_tagged_users_by_code',
+        'is_logged_in',
+        'login',
+        'add_comment',
+        'delete_comment',
+        'like',
+        'unlike',
+        'follow',
+        'unfollow',
+        'block',
+        'unblock',
+    ]
+
+    ASYNC_ITERATORS = [
+        'iter_followers',
+        'iter_following',
+        'iter_medias_by_user_id',
+        'iter_medias_by_tag',
+        'iter_medias_by_location_id',
+    ]
+
+    def __init__(self, instagram=None, max_workers=None, **kwargs):
+        """
+        :param instagram: Instagram instance to wrap, a new one is created if None
+        :param max_workers: maximum number of requests running at the same time
+        :param kwargs: passed to Instagram when a new instance is created
+        """
+        self.instagram = instagram if instagram is not None else Instagram(**kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def __getattr__(self, name):
+        return getattr(self.instagram, name)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _iterate(self, generator):
+        loop = asyncio.get_running_loop()
+        exhausted = object()
+        try:
+            while True:
+                item = await loop.run_in_executor(self._executor, next,
+                                                  generator, exhausted)
+                if item is exhausted:
+                    return
+                yield item
+        finally:
+            generator.close()
+
+    def close(self):
+        """shuts down the worker threads once pending calls are done"""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._executor.shutdown(wait=False)
+
+
+def _make_awaitable(name):
+    async def method(self, *args, **kwargs):
+        return await self._run(getattr(self.instagram, name), *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = getattr(Instagram, name).__doc__
+    return method
+
+
+def _make_async_iterator(name):
+    def method(self, *args, **kwargs):
+        return self._iterate(getattr(self.instagram, name)(*args, **kwargs))
+
+    method.__name__ = name
+    method.__doc__ = getattr(Instagram, name).__doc__
+    return method
+
+
+for _name in AsyncInstagram.AWAITABLE_METHODS:
+    setattr(AsyncInstagram, _name, _make_awaitable(_name))
+
+for _name in AsyncInstagram.ASYNC_ITERATORS:
+    setattr(AsyncInstagram, _name, _make_async_iterator(_name))
@@ -0,0 +1,306 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+
+class BlobStore:
+    """
+    Content-addressed store for downloaded CDN files.
+
+    Every distinct file is kept once, under root/objects/<sha256[:2]>/<sha256>.
+    index.db maps the normalized CDN path of every url a blob was fetched
+    from to its sha256, so a url seen before - on any account, with any
+    signature or CDN host - is answered from disk. References are the
+    paths of the archive files that are hard links to a blob. A blob with
+    none left may be evicted, least recently used first, whenever the store
+    grows past max_size bytes; blobs that are still referenced never are.
+    Deleting an archive file drops its reference the next time the store
+    is pruned, which eviction does by itself when it has to.
+    """
+    # query parameters that select a different file, the others only sign the url
+    VARIANT_PARAMETERS = ('stp', 'se', 'efg')
+
+    # seconds between two prunes started by eviction
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, root, max_size=None, timeout=30.0):
+        """
+        :param root: directory of the store, created if it does not exist
+        :param max_size: bytes the blobs may take up before unreferenced ones are evicted, None for no limit
+        :param timeout: seconds to wait for another process holding the index
+        """
+        self.root = root
+        self.max_size = max_size
+
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+
+        self._pruned_at = None
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(root, 'index.db'),
+                                           timeout=timeout,
+                                           check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS blobs ('
+                'sha256 TEXT PRIMARY KEY, size INTEGER, refcount INTEGER, '
+                'last_used REAL)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS urls ('
+                'url_key TEXT PRIMARY KEY, sha256 TEXT)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS refs ('
+                'ref TEXT PRIMARY KEY, sha256 TEXT)')
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS urls_sha256 ON urls (sha256)')
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS blobs_eviction '
+                'ON blobs (refcount, last_used)')
+
+    @staticmethod
+    def normalize_url(url):
+        """
+        :param url: CDN url
+        :return: path of the url with the query parameters that select the file, without host and signature
+        """
+        parsed = urllib.parse.urlparse(url)
+        query = [(name, value)
+                 for name, value in urllib.parse.parse_qsl(parsed.query)
+                 if name in BlobStore.VARIANT_PARAMETERS]
+        if not query:
+            return parsed.path
+        return f'{parsed.path}?{urllib.parse.urlencode(sorted(query))}'
+
+    def get_blob_path(self, sha256):
+        """
+        :param sha256: hex digest of the blob
+        :return: path the blob is stored at
+        """
+        return os.path.join(self.root, 'objects', sha256[:2], sha256)
+
+    def lookup(self, url):
+        """
+        :param url: CDN url
+        :return: sha256 of the blob the url was stored as, None if it is not in the store
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                'SELECT sha256 FROM urls WHERE url_key = ?',
+                (BlobStore.normalize_url(url),)).fetchone()
+            if row is None:
+                return None
+
+            if not os.path.exists(self.get_blob_path(row[0])):
+                # removed behind our back
+                self.__delete_blob(row[0])
+                return None
+
+            self._connection.execute(
+                'UPDATE blobs SET last_used = ? WHERE sha256 = ?',
+                (time.time(), row[0]))
+            return row[0]
+
+    def put_file(self, path, url=None, ref=None, sha256=None):
+        """
+        Adds a file to the store; it is hard linked if the store is on the same file system, copied otherwise
+        :param path: file to add
+        :param url: CDN url the file was downloaded from
+        :param ref: path of the archive file that is a hard link to the blob, usually path itself
+        :param sha256: hex digest of the file if already known
+        :return: sha256 of the blob
+        """
+        if sha256 is None:
+            sha256 = BlobStore.hash_file(path)
+
+        blob_path = self.get_blob_path(sha256)
+        with self._lock, self._connection:
+            # under the lock, so evict() cannot delete the blob in between
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                BlobStore.__place(path, blob_path)
+
+            self._connection.execute(
+                'INSERT INTO blobs (sha256, size, refcount, last_used) '
+                'VALUES (?, ?, 0, ?) ON CONFLICT(sha256) DO UPDATE SET '
+                'last_used = excluded.last_used',
+                (sha256, os.path.getsize(blob_path), time.time()))
+            if url is not None:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO urls (url_key, sha256) VALUES (?, ?)',
+                    (BlobStore.normalize_url(url), sha256))
+            if ref is not None:
+                self.__add_ref(ref, sha256)
+
+        if self.max_size is not None:
+            self.evict(self.max_size)
+        return sha256
+
+    def add_ref(self, ref, sha256):
+        """
+        :param ref: path of the archive file that is a hard link to the blob, a ref names one blob at a time
+        :param sha256: hex digest of the blob
+        """
+        with self._lock, self._connection:
+            self.__add_ref(ref, sha256)
+
+    def release(self, ref):
+        """
+        :param ref: path passed to put_file, add_ref or link, e.g. of an archive file that was deleted
+        """
+        with self._lock, self._connection:
+            self.__release(ref)
+
+    def link(self, sha256, path, ref=None):
+        """
+        Puts a blob at path, as a hard link if possible
+        :param sha256: hex digest of the blob
+        :param path: destination, replaced if it exists
+        :param ref: path the reference is kept under, usually path itself
+        """
+        with self._lock, self._connection:
+            BlobStore.__place(self.get_blob_path(sha256), path)
+            if ref is not None:
+                self.__add_ref(ref, sha256)
+
+    def prune(self):
+        """
+        Drops the refs whose archive file was deleted or no longer is a hard link to the blob
+        :return: number of refs dropped
+        """
+        dropped = 0
+        with self._lock, self._connection:
+            self._pruned_at = time.monotonic()
+            refs = self._connection.execute('SELECT ref, sha256 FROM refs').fetchall()
+            for ref, sha256 in refs:
+                if not self.__is_linked(ref, sha256):
+                    self.__release(ref)
+                    dropped += 1
+        return dropped
+
+    def evict(self, max_size):
+        """
+        Deletes unreferenced blobs, least recently used first, until the store takes up at most max_size bytes.
+        Prunes first if that cannot be reached otherwise and the last prune is PRUNE_INTERVAL ago
+        :param max_size: bytes
+        :return: number of blobs deleted
+        """
+        with self._lock:
+            size, referenced_size = self._connection.execute(
+                'SELECT COALESCE(SUM(size), 0), '
+                'COALESCE(SUM(CASE WHEN refcount > 0 THEN size ELSE 0 END), 0) '
+                'FROM blobs').fetchone()
+            prune = referenced_size > max_size and (
+                self._pruned_at is None
+                or time.monotonic() - self._pruned_at >= BlobStore.PRUNE_INTERVAL)
+        if size <= max_size:
+            return 0
+        if prune:
+            self.prune()
+
+        deleted = 0
+        with self._lock, self._connection:
+            size = self._connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+            if size <= max_size:
+                return 0
+
+            candidates = self._connection.execute(
+                'SELECT sha256, size FROM blobs WHERE refcount = 0 '
+                'ORDER BY last_used').fetchall()
+            for sha256, blob_size in candidates:
+                if size <= max_size:
+                    break
+                self.__delete_blob(sha256)
+                size -= blob_size
+                deleted += 1
+        return deleted
+
+    def get_stats(self):
+        """
+        :return: dict that contains blobs, urls, refs, size, unreferenced_size
+        """
+        with self._lock:
+            blobs, size = self._connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+            unreferenced_size = self._connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM blobs WHERE refcount = 0').fetchone()[0]
+            urls = self._connection.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+            refs = self._connection.execute('SELECT COUNT(*) FROM refs').fetchone()[0]
+        return {
+            'blobs': blobs,
+            'urls': urls,
+            'refs': refs,
+            'size': size,
+            'unreferenced_size': unreferenced_size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def hash_file(path, chunk_size=65536):
+        """
+        :param path: file
+        :param chunk_size: bytes read at once
+        :return: hex sha256 of the file
+        """
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def __place(source, destination):
+        temp_path = f'{destination}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, destination)
+
+    def __is_linked(self, ref, sha256):
+        try:
+            ref_stat = os.stat(ref)
+            blob_stat = os.stat(self.get_blob_path(sha256))
+        except OSError:
+            return False
+        return (ref_stat.st_dev, ref_stat.st_ino) == (blob_stat.st_dev, blob_stat.st_ino)
+
+    def __add_ref(self, ref, sha256):
+        row = self._connection.execute('SELECT sha256 FROM refs WHERE ref = ?',
+                                       (ref,)).fetchone()
+        if row is not None and row[0] == sha256:
+            return
+        if row is not None:
+            self.__release(ref)
+
+        self._connection.execute('INSERT INTO refs (ref, sha256) VALUES (?, ?)',
+                                 (ref, sha256))
+        self._connection.execute(
+            'UPDATE blobs SET refcount = refcount + 1, last_used = ? WHERE sha256 = ?',
+            (time.time(), sha256))
+
+    def __release(self, ref):
+        row = self._connection.execute('SELECT sha256 FROM refs WHERE ref = ?',
+                                       (ref,)).fetchone()
+        if row is None:
+            return
+        self._connection.execute('DELETE FROM refs WHERE ref = ?', (ref,))
+        self._connection.execute(
+            'UPDATE blobs SET refcount = MAX(0, refcount - 1) WHERE sha256 = ?',
+            (row[0],))
+
+    def __delete_blob(self, sha256):
+        self._connection.execute('DELETE FROM blobs WHERE sha256 = ?', (sha256,))
+        self._connection.execute('DELETE FROM urls WHERE sha256 = ?', (sha256,))
+        self._connection.execute('DELETE FROM refs WHERE sha256 = ?', (sha256,))
+        try:
+            os.remove(self.get_blob_path(sha256))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,301 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+INT64 = 'int64'
+FLOAT64 = 'float64'
+BOOL = 'bool'
+STRING = 'string'
+
+_TYPECODES = {
+    INT64: 'q',
+    FLOAT64: 'd',
+    BOOL: 'b',
+}
+
+# (column name, type, model attribute)
+ACCOUNT_COLUMNS = (
+    ('id', INT64, 'identifier'),
+    ('username', STRING, 'username'),
+    ('full_name', STRING, 'full_name'),
+    ('profile_pic_url', STRING, 'profile_pic_url'),
+    ('is_private', BOOL, 'is_private'),
+    ('is_verified', BOOL, 'is_verified'),
+    ('follows_count', INT64, 'follows_count'),
+    ('followed_by_count', INT64, 'followed_by_count'),
+    ('media_count', INT64, 'media_count'),
+)
+
+MEDIA_COLUMNS = (
+    ('id', INT64, 'identifier'),
+    ('short_code', STRING, 'short_code'),
+    ('type', STRING, 'type'),
+    ('created_time', INT64, 'created_time'),
+    ('owner_id', INT64, 'owner_id'),
+    ('caption', STRING, 'caption'),
+    ('likes_count', INT64, 'likes_count'),
+    ('comments_count', INT64, 'comments_count'),
+    ('video_views', INT64, 'video_views'),
+    ('is_ad', BOOL, 'is_ad'),
+    ('location_id', INT64, 'location_id'),
+    ('image_high_resolution_url', STRING, 'image_high_resolution_url'),
+)
+
+
+class ColumnarWriter:
+    """
+    Streams rows into a compressed columnar file.
+
+    Rows are buffered column by column in typed arrays and every batch_size
+    rows the batch is written as one zlib block per column, so only one
+    batch is ever held in memory. A JSON footer records the schema and the
+    offset of every block; ColumnarReader memory-maps the file and
+    decompresses only the blocks it is asked for.
+
+    File layout: MAGIC, blocks, footer JSON, footer length (8 bytes), MAGIC
+    """
+    MAGIC = b'IGCOL1\n\x00'
+    FORMAT_VERSION = 1
+
+    def __init__(self, path, columns, batch_size=65536, compression_level=6):
+        """
+        :param path: output file, replaced on close
+        :param columns: tuple of (name, type, attribute), e.g. ACCOUNT_COLUMNS
+        :param batch_size: rows per batch
+        :param compression_level: zlib level of the blocks
+        """
+        for _, column_type, _ in columns:
+            if column_type != STRING and column_type not in _TYPECODES:
+                raise ValueError(f'Unknown column type {column_type}')
+
+        self.path = path
+        self.columns = tuple(columns)
+        self.batch_size = batch_size
+        self.compression_level = compression_level
+        self.row_count = 0
+
+        self._batches = []
+        self._temp_path = f'{path}.{os.getpid()}.tmp'
+        self._file = open(self._temp_path, 'wb')
+        self._file.write(ColumnarWriter.MAGIC)
+        self.__reset_buffers()
+
+    def __reset_buffers(self):
+        self._values = [[] if column_type == STRING else array(_TYPECODES[column_type])
+                        for _, column_type, _ in self.columns]
+        self._nulls = [array('b') for _ in self.columns]
+        self._has_nulls = [False] * len(self.columns)
+        self._buffered = 0
+
+    def write_row(self, row):
+        """
+        :param row: sequence of values in column order, None for null
+        """
+        for index, value in enumerate(row):
+            column_type = self.columns[index][1]
+            if value is None:
+                self._has_nulls[index] = True
+                self._nulls[index].append(1)
+                value = '' if column_type == STRING else 0
+            else:
+                self._nulls[index].append(0)
+                if column_type == INT64 or column_type == BOOL:
+                    value = int(value)
+                elif column_type == FLOAT64:
+                    value = float(value)
+                else:
+                    value = str(value)
+            self._values[index].append(value)
+
+        self._buffered += 1
+        self.row_count += 1
+        if self._buffered >= self.batch_size:
+            self.flush()
+
+    def write_models(self, models):
+        """
+        :param models: iterable of Account, Media or any object with the column attributes
+        """
+        attributes = [attribute for _, _, attribute in self.columns]
+        for model in models:
+            self.write_row([getattr(model, attribute, None) for attribute in attributes])
+
+    def write_pages(self, pages, key):
+        """
+        Writes every page of a page generator, keeping no page alive after it is written
+        :param pages: generator such as iter_followers or iter_medias_by_tag
+        :param key: 'accounts' or 'medias'
+        :return: number of rows written
+        """
+        written = self.row_count
+        for page in pages:
+            self.write_models(page[key])
+        return self.row_count - written
+
+    def flush(self):
+        if self._buffered == 0:
+            return
+
+        batch = {'rows': self._buffered, 'columns': []}
+        for index, (_, column_type, _) in enumerate(self.columns):
+            values = self._values[index]
+            blocks = []
+            if column_type == STRING:
+                encoded = [value.encode('utf-8') for value in values]
+                blocks.append(self.__write_block(
+                    array('q', map(len, encoded)).tobytes()))
+                blocks.append(self.__write_block(b''.join(encoded)))
+            else:
+                blocks.append(self.__write_block(values.tobytes()))
+            if self._has_nulls[index]:
+                blocks.append(self.__write_block(self._nulls[index].tobytes()))
+            else:
+                blocks.append(None)
+            batch['columns'].append(blocks)
+
+        self._batches.append(batch)
+        self.__reset_buffers()
+
+    def __write_block(self, data):
+        offset = self._file.tell()
+        compressed = zlib.compress(data, self.compression_level)
+        self._file.write(compressed)
+        return [offset, len(compressed), len(data)]
+
+    def close(self):
+        if self._file is None:
+            return
+
+        self.flush()
+        footer = json.dumps({
+            'version': ColumnarWriter.FORMAT_VERSION,
+            'byteorder': sys.byteorder,
+            'columns': [[name, column_type] for name, column_type, _ in self.columns],
+            'rows': self.row_count,
+            'batches': self._batches,
+        }).encode('utf-8')
+        self._file.write(footer)
+        self._file.write(struct.pack('<q', len(footer)))
+        self._file.write(ColumnarWriter.MAGIC)
+        self._file.close()
+        self._file = None
+        os.replace(self._temp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            self._file = None
+            os.remove(self._temp_path)
+
+
+class ColumnarReader:
+    """
+    Reads a file written by ColumnarWriter through a memory map.
+    Batches are decompressed on demand and only for the requested columns.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: file written by ColumnarWriter
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic = ColumnarWriter.MAGIC
+        if self._map[:len(magic)] != magic or self._map[-len(magic):] != magic:
+            self.close()
+            raise ValueError(f'{path} is not a columnar file')
+
+        end = len(self._map) - len(magic)
+        footer_length, = struct.unpack('<q', self._map[end - 8:end])
+        footer = json.loads(self._map[end - 8 - footer_length:end - 8])
+
+        self.columns = [tuple(column) for column in footer['columns']]
+        self.row_count = footer['rows']
+        self._batches = footer['batches']
+        self._swap = footer['byteorder'] != sys.byteorder
+        self._indexes = {name: index for index, (name, _) in enumerate(self.columns)}
+
+    @property
+    def batch_count(self):
+        return len(self._batches)
+
+    def read_batch(self, index, columns=None):
+        """
+        :param index: batch number, from 0 to batch_count - 1
+        :param columns: names of the columns to read, all if None
+        :return: dict of column name to list of values, None for null
+        """
+        batch = self._batches[index]
+        names = columns if columns is not None else [name for name, _ in self.columns]
+
+        result = {}
+        for name in names:
+            column_index = self._indexes[name]
+            column_type = self.columns[column_index][1]
+            blocks = batch['columns'][column_index]
+
+            if column_type == STRING:
+                lengths = self.__read_array('q', blocks[0])
+                data = self.__read_block(blocks[1])
+                values = []
+                position = 0
+                for length in lengths:
+                    values.append(data[position:position + length].decode('utf-8'))
+                    position += length
+            else:
+                values = self.__read_array(_TYPECODES[column_type], blocks[0]).tolist()
+                if column_type == BOOL:
+                    values = [bool(value) for value in values]
+
+            if blocks[-1] is not None:
+                nulls = self.__read_array('b', blocks[-1])
+                values = [None if null else value for value, null in zip(values, nulls)]
+
+            result[name] = values
+
+        return result
+
+    def iter_rows(self, columns=None):
+        """
+        :param columns: names of the columns to read, all if None
+        :return: generator of dict per row, decompressing one batch at a time
+        """
+        for index in range(self.batch_count):
+            batch = self.read_batch(index, columns)
+            names = list(batch)
+            for values in zip(*(batch[name] for name in names)):
+                yield dict(zip(names, values))
+
+    def __read_block(self, block):
+        offset, length, _ = block
+        return zlib.decompress(self._map[offset:offset + length])
+
+    def __read_array(self, typecode, block):
+        values = array(typecode)
+        values.frombytes(self.__read_block(block))
+        if self._swap:
+            values.byteswap()
+        return values
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,203 @@
+import itertools
+import threading
+import time
+
+from .media_watcher import MediaWatcher
+
+
+class CrawlScheduler:
+    """
+    Polls many hashtags and locations with a pool of worker threads.
+
+    A target is due refresh_interval seconds after its last poll ended.
+    Work is handed out one page request at a time, so the polls of all due
+    targets are interleaved instead of running one after the other, and
+    with stride scheduling: every page served moves a target 1 / priority
+    further back in line, so when more targets are due than the rate limit
+    allows each gets requests in proportion to its priority. A target that
+    becomes due again joins at the back of the current line instead of
+    claiming the turns it missed. All requests go through the Instagram
+    instance of the watcher and are paced by its RateLimiter, which is
+    shared by the workers.
+    """
+
+    def __init__(self, watcher, workers=4):
+        """
+        :param watcher: MediaWatcher the targets are polled with, its marks, callback and queue apply
+        :param workers: threads fetching pages at the same time
+        """
+        if workers < 1:
+            raise ValueError('CrawlScheduler needs at least one worker')
+
+        self.watcher = watcher
+        self.workers = workers
+
+        self._targets = {}
+        self._order = itertools.count()
+        self._virtual_time = 0.0
+        self._condition = threading.Condition()
+
+    def add_tag(self, tag, priority=1.0, refresh_interval=300.0):
+        """
+        :param tag: tag string
+        :param priority: share of the requests the target gets while others are due as well
+        :param refresh_interval: seconds between two polls at the least
+        """
+        self.add(MediaWatcher.TAG, tag, priority, refresh_interval)
+
+    def add_location(self, facebook_location_id, priority=1.0, refresh_interval=300.0):
+        """
+        :param facebook_location_id: facebook location id
+        :param priority: share of the requests the target gets while others are due as well
+        :param refresh_interval: seconds between two polls at the least
+        """
+        self.add(MediaWatcher.LOCATION, str(facebook_location_id), priority,
+                 refresh_interval)
+
+    def add(self, kind, target, priority=1.0, refresh_interval=300.0):
+        """
+        Adds a target or changes the priority and refresh interval of a known one
+        :param kind: MediaWatcher.TAG or MediaWatcher.LOCATION
+        :param target: tag or location id
+        :param priority: weight of the target
+        :param refresh_interval: seconds between two polls at the least
+        """
+        if kind not in (MediaWatcher.TAG, MediaWatcher.LOCATION):
+            raise ValueError(f'Unknown kind {kind}')
+        if priority <= 0 or refresh_interval <= 0:
+            raise ValueError('priority and refresh_interval must be positive')
+
+        with self._condition:
+            entry = self._targets.get((kind, target))
+            if entry is None:
+                entry = {
+                    'kind': kind,
+                    'target': target,
+                    'pass': self._virtual_time,
+                    'polled_at': None,
+                    'next_poll_at': time.monotonic(),
+                    'last_served': next(self._order),
+                    'pages': None,
+                    'busy': False,
+                    'polls': 0,
+                    'requests': 0,
+                    'new_medias': 0,
+                    'error': None,
+                }
+                self._targets[(kind, target)] = entry
+            entry['priority'] = priority
+            entry['refresh_interval'] = refresh_interval
+            self._condition.notify_all()
+
+    def remove(self, kind, target):
+        """
+        :param kind: MediaWatcher.TAG or MediaWatcher.LOCATION
+        :param target: tag or location id
+        """
+        with self._condition:
+            entry = self._targets.pop((kind, target), None)
+            if entry is not None and not entry['busy'] and entry['pages'] is not None:
+                entry['pages'].close()
+
+    def step(self):
+        """
+        Fetches the next page of the first due target in line in the calling thread
+        :return: False if no target is due
+        """
+        with self._condition:
+            entry = self.__take(time.monotonic())
+        if entry is None:
+            return False
+
+        self.__fetch(entry)
+        return True
+
+    def run(self, stop_event=None):
+        """
+        Runs the workers until stop_event is set
+        :param stop_event: threading.Event that ends the crawl
+        """
+        stop_event = stop_event if stop_event is not None else threading.Event()
+        threads = [threading.Thread(target=self.__work, args=(stop_event,),
+                                    daemon=True)
+                   for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def get_stats(self):
+        """
+        :return: list of dict that contains kind, target, priority, refresh_interval, polls, requests, new_medias, staleness, polling, error
+        """
+        now = time.monotonic()
+        with self._condition:
+            return [{
+                'kind': entry['kind'],
+                'target': entry['target'],
+                'priority': entry['priority'],
+                'refresh_interval': entry['refresh_interval'],
+                'polls': entry['polls'],
+                'requests': entry['requests'],
+                'new_medias': entry['new_medias'],
+                'staleness': now - entry['polled_at'] if entry['polled_at'] is not None else None,
+                'polling': entry['pages'] is not None,
+                'error': entry['error'],
+            } for entry in self._targets.values()]
+
+    def __work(self, stop_event):
+        while not stop_event.is_set():
+            with self._condition:
+                now = time.monotonic()
+                entry = self.__take(now)
+                if entry is None:
+                    waiting = [other['next_poll_at'] - now
+                               for other in self._targets.values()
+                               if not other['busy']]
+                    # wake up now and then to notice stop_event
+                    self._condition.wait(min(waiting + [1.0]))
+                    continue
+
+            self.__fetch(entry)
+
+    def __take(self, now):
+        due = [entry for entry in self._targets.values()
+               if not entry['busy'] and entry['next_poll_at'] <= now]
+        if not due:
+            return None
+
+        for entry in due:
+            if entry['pages'] is None:
+                entry['pass'] = max(entry['pass'], self._virtual_time)
+
+        entry = min(due, key=lambda entry: (entry['pass'], -entry['priority'],
+                                            entry['last_served']))
+        self._virtual_time = entry['pass']
+        entry['pass'] += 1.0 / entry['priority']
+        entry['busy'] = True
+        return entry
+
+    def __fetch(self, entry):
+        error = None
+        done = False
+        try:
+            if entry['pages'] is None:
+                entry['pages'] = self.watcher.iter_poll(entry['kind'], entry['target'])
+            entry['new_medias'] += len(next(entry['pages']))
+            entry['requests'] += 1
+        except StopIteration:
+            done = True
+        except Exception as e:
+            error = e
+            done = True
+
+        with self._condition:
+            entry['busy'] = False
+            entry['last_served'] = next(self._order)
+            if done:
+                entry['pages'] = None
+                entry['polls'] += 1
+                entry['error'] = error
+                entry['polled_at'] = time.monotonic()
+                entry['next_poll_at'] = entry['polled_at'] + entry['refresh_interval']
+            self._condition.notify_all()
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import threading
+import time
+
+from .model.account import Account
+
+
+class CrawlStore:
+    """
+    SQLite checkpoint store for follower and following crawls.
+
+    Every fetched page is committed together with its end_cursor in one
+    transaction, so a crawl that dies half way can be resumed from the last
+    committed cursor instead of starting over.
+    """
+    FOLLOWERS = 'followers'
+    FOLLOWING = 'following'
+
+    READ_BATCH_SIZE = 1000
+
+    def __init__(self, path):
+        """
+        :param path: sqlite database file, created if it does not exist
+        """
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS crawls ('
+                'kind TEXT, account_id TEXT, end_cursor TEXT, '
+                'has_next_page INTEGER, count INTEGER, updated_at REAL, '
+                'PRIMARY KEY (kind, account_id))')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS accounts ('
+                'kind TEXT, account_id TEXT, id TEXT, username TEXT, '
+                'full_name TEXT, profile_pic_url TEXT, is_private INTEGER, '
+                'is_verified INTEGER, PRIMARY KEY (kind, account_id, id))')
+
+    def get_checkpoint(self, kind, account_id):
+        """
+        :param kind: CrawlStore.FOLLOWERS or CrawlStore.FOLLOWING
+        :param account_id: instagram account id
+        :return: dict that contains next_page, has_next_page, count or None
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT end_cursor, has_next_page, count FROM crawls '
+                'WHERE kind = ? AND account_id = ?',
+                (kind, str(account_id))).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'next_page': row[0],
+            'has_next_page': bool(row[1]),
+            'count': row[2],
+        }
+
+    def is_complete(self, kind, account_id):
+        checkpoint = self.get_checkpoint(kind, account_id)
+        return checkpoint is not None and not checkpoint['has_next_page']
+
+    def save_page(self, kind, account_id, page):
+        """
+        :param kind: CrawlStore.FOLLOWERS or CrawlStore.FOLLOWING
+        :param account_id: instagram account id
+        :param page: page dict yielded by iter_followers or iter_following
+        """
+        account_id = str(account_id)
+        rows = [(kind, account_id, str(account.identifier), account.username,
+                 account.full_name, account.profile_pic_url,
+                 int(bool(account.is_private)), int(bool(account.is_verified)))
+                for account in page['accounts']]
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows)
+            self._connection.execute(
+                'INSERT OR REPLACE INTO crawls VALUES (?, ?, ?, ?, ?, ?)',
+                (kind, account_id, page['next_page'],
+                 int(bool(page['has_next_page'])), page['count'], time.time()))
+
+    def count_accounts(self, kind, account_id):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM accounts WHERE kind = ? AND account_id = ?',
+                (kind, str(account_id))).fetchone()[0]
+
+    def iter_accounts(self, kind, account_id):
+        """
+        :param kind: CrawlStore.FOLLOWERS or CrawlStore.FOLLOWING
+        :param account_id: instagram account id
+        :return: generator of Account in the order they were fetched
+        """
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    'SELECT rowid, id, username, full_name, profile_pic_url, '
+                    'is_private, is_verified FROM accounts '
+                    'WHERE kind = ? AND account_id = ? AND rowid > ? '
+                    'ORDER BY rowid LIMIT ?',
+                    (kind, str(account_id), last_rowid,
+                     CrawlStore.READ_BATCH_SIZE)).fetchall()
+
+            if not rows:
+                return
+
+            last_rowid = rows[-1][0]
+            for row in rows:
+                yield CrawlStore.__account_from_row(row[1:])
+
+    @staticmethod
+    def __account_from_row(row):
+        return Account({
+            'id': row[0],
+            'username': row[1],
+            'full_name': row[2],
+            'profile_pic_url': row[3],
+            'is_private': bool(row[4]),
+            'is_verified': bool(row[5]),
+        })
+
+    def reset(self, kind, account_id):
+        """removes the checkpoint and every stored account of a crawl"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'DELETE FROM crawls WHERE kind = ? AND account_id = ?',
+                (kind, str(account_id)))
+            self._connection.execute(
+                'DELETE FROM accounts WHERE kind = ? AND account_id = ?',
+                (kind, str(account_id)))
+
+    def close(self):
+        self._connection.close()
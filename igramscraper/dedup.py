@@ -0,0 +1,123 @@
+import hashlib
+import json
+import math
+import os
+import threading
+
+
+class SeenSet:
+    """
+    In-memory index of ids that were already processed.
+    """
+
+    def __init__(self, ids=None):
+        self._ids = set(str(i) for i in ids) if ids is not None else set()
+
+    def add(self, key):
+        """
+        :param key: media id
+        :return: True if key was not seen before
+        """
+        key = str(key)
+        if key in self._ids:
+            return False
+        self._ids.add(key)
+        return True
+
+    def __contains__(self, key):
+        return str(key) in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class BloomFilter:
+    """
+    Fixed-size index of processed ids that can be saved and loaded across
+    runs. An added id is always reported as seen; once capacity ids were
+    added, about error_rate of the ids that never were are reported as seen
+    as well.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001, path=None):
+        """
+        :param capacity: ids the filter is sized for
+        :param error_rate: false positive rate at capacity
+        :param path: file the filter is loaded from if it exists and saved to by save()
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                self._bits = bytearray(f.read())
+            self.bit_count = meta['bit_count']
+            self.hash_count = meta['hash_count']
+            self.count = meta['count']
+            self.capacity = meta['capacity']
+            self.error_rate = meta['error_rate']
+            return
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bit_count = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.bit_count + 7) // 8)
+
+    def __positions(self, key):
+        digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.bit_count for i in range(self.hash_count)]
+
+    def add(self, key):
+        """
+        :param key: media id
+        :return: True if key was not seen before
+        """
+        positions = self.__positions(key)
+        with self._lock:
+            new = False
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not self._bits[position >> 3] & mask:
+                    self._bits[position >> 3] |= mask
+                    new = True
+            if new:
+                self.count += 1
+            return new
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7))
+                   for position in self.__positions(key))
+
+    def __len__(self):
+        return self.count
+
+    def save(self, path=None):
+        """
+        :param path: file to write, defaults to the path the filter was created with
+        """
+        path = path if path is not None else self.path
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+
+        with self._lock:
+            meta = {
+                'bit_count': self.bit_count,
+                'hash_count': self.hash_count,
+                'count': self.count,
+                'capacity': self.capacity,
+                'error_rate': self.error_rate,
+            }
+            bits = bytes(self._bits)
+
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(json.dumps(meta).encode('utf-8') + b'\n')
+            f.write(bits)
+        os.replace(temp_path, path)
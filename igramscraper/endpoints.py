@@ -1,5 +1,9 @@
+import re
 import urllib.parse
-import json
+
+from .json_codec import get_codec
+
+_json_codec = get_codec()
 
 USER_MEDIAS = '17880160963012870'
 USER_STORIES = '17890626976041463'
@@ -7,6 +11,7 @@ STORIES = '17873473675158481'
 
 BASE_URL = 'https://www.instagram.com'
 LOGIN_URL = 'https://www.instagram.com/accounts/login/ajax/'
+MID_URL = 'https://www.instagram.com/web/__mid/'
 ACCOUNT_PAGE = 'https://www.instagram.com/%s'
 MEDIA_LINK = 'https://www.instagram.com/p/%s'
 ACCOUNT_MEDIAS = 'https://www.instagram.com/graphql/query/?query_hash=42323d64886122307be10013ad2dcc44&variables=%s'
@@ -53,7 +58,7 @@ def get_account_json_private_info_link_by_account_id(account_id):
 
 
 def get_account_medias_json_link(variables):
-    return ACCOUNT_MEDIAS % urllib.parse.quote_plus(json.dumps(variables, separators=(',', ':')))
+    return ACCOUNT_MEDIAS % urllib.parse.quote_plus(encode_variables(variables))
 
 
 def get_media_page_link(code):
@@ -77,7 +82,7 @@ def get_general_search_json_link(query):
 
 
 def get_comments_before_comments_id_by_code(variables):
-    return COMMENTS_BEFORE_COMMENT_ID_BY_CODE % urllib.parse.quote_plus(json.dumps(variables, separators=(',', ':')))
+    return COMMENTS_BEFORE_COMMENT_ID_BY_CODE % urllib.parse.quote_plus(encode_variables(variables))
 
 
 def get_last_likes_by_code_old(code, count, last_like_id):
@@ -85,7 +90,7 @@ def get_last_likes_by_code_old(code, count, last_like_id):
 
 
 def get_last_likes_by_code(variables):
-    return LIKES_BY_SHORTCODE % urllib.parse.quote_plus(json.dumps(variables, separators=(',', ':')))
+    return LIKES_BY_SHORTCODE % urllib.parse.quote_plus(encode_variables(variables))
 
 
 def get_follow_url(account_id):
@@ -117,7 +122,7 @@ def get_followers_json_link_old(account_id, count, after=''):
     return url
 
 def get_followers_json_link(variables):
-    return FOLLOWERS_URL % urllib.parse.quote_plus(json.dumps(variables, separators=(',', ':')))
+    return FOLLOWERS_URL % urllib.parse.quote_plus(encode_variables(variables))
 
 
 def get_following_json_link_old(account_id, count, after=''):
@@ -133,10 +138,10 @@ def get_following_json_link_old(account_id, count, after=''):
     return url
 
 def get_following_json_link(variables):
-    return FOLLOWING_URL % urllib.parse.quote_plus(json.dumps(variables, separators=(',', ':')))
+    return FOLLOWING_URL % urllib.parse.quote_plus(encode_variables(variables))
 
 def get_user_stories_link():
-    return get_graph_ql_url(USER_STORIES, {'variables': json.dumps([], separators=(',', ':'))})
+    return get_graph_ql_url(USER_STORIES, {'variables': encode_variables([])})
 
 
 def get_graph_ql_url(query_id, parameters):
@@ -150,7 +155,7 @@ def get_graph_ql_url(query_id, parameters):
 
 
 def get_stories_link(variables):
-    return get_graph_ql_url(STORIES, {'variables': json.dumps(variables, separators=(',', ':'))})
+    return get_graph_ql_url(STORIES, {'variables': encode_variables(variables)})
 
 
 def get_like_url(media_id):
@@ -168,3 +173,59 @@ def get_add_comment_url(media_id):
 def get_delete_comment_url(media_id, comment_id):
     return DELETE_COMMENT_URL % (urllib.parse.quote_plus(str(media_id)), urllib.parse.quote_plus(str(comment_id)))
 
+
+
+def set_json_codec(codec):
+    """
+    :param codec: JsonCodec or codec name the GraphQL variables are encoded with
+    """
+    global _json_codec
+    _json_codec = get_codec(codec) if isinstance(codec, str) else codec
+
+
+def encode_variables(variables):
+    """
+    :param variables: GraphQL variables
+    :return: compact JSON string, the same one the url is built with
+    """
+    return _json_codec.dumps(variables)
+
+
+_endpoint_patterns = None
+
+
+def get_endpoint_name(url):
+    """
+    :param url: a url built by one of the functions in this module
+    :return: name of the url template it was built from, e.g. 'FOLLOWERS_URL', or None
+    """
+    global _endpoint_patterns
+    if _endpoint_patterns is None:
+        _endpoint_patterns = _compile_endpoint_patterns()
+
+    if url.rstrip('/') == BASE_URL:
+        return 'BASE_URL'
+
+    for name, pattern in _endpoint_patterns:
+        if pattern.fullmatch(url):
+            return name
+
+    return None
+
+
+def _compile_endpoint_patterns():
+    patterns = []
+    for name, template in globals().items():
+        if not name.isupper() or not isinstance(template, str) \
+                or not template.startswith('https://') or '{{' in template:
+            continue
+
+        regex = re.escape(template).replace('%s', '[^?#&/]*')
+        if '?' in template:
+            regex += '(?:&.*)?'
+
+        patterns.append((len(template.replace('%s', '')), name, re.compile(regex)))
+
+    # most specific template first, ACCOUNT_PAGE would match nearly everything
+    patterns.sort(key=lambda pattern: pattern[0], reverse=True)
+    return [(name, pattern) for _, name, pattern in patterns]
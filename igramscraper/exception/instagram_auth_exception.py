@@ -1,3 +1,4 @@
 class InstagramAuthException(Exception):
     def __init__(self, message = "", code = 401):
-        super().__init__(f'{message}, Code:{code}')
\ No newline at end of file
+        super().__init__(f'{message}, Code:{code}')
+        self.code = code
\ No newline at end of file
@@ -1,6 +1,7 @@
 class InstagramException(Exception):
     def __init__(self, message="", code=500):
         super().__init__(f'{message}, Code:{code}')
+        self.code = code
     
     @staticmethod
     def default(response_text, status_code):
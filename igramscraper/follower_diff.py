@@ -0,0 +1,152 @@
+import json
+import os
+import time
+from array import array
+
+
+class FollowerSnapshots:
+    """
+    Keeps a sorted snapshot of follower ids per tracked account and reports
+    who followed and unfollowed between two refreshes.
+
+    On disk every account has a base snapshot (packed int64 ids) and an
+    append-only change log, so storage grows with the number of changes
+    rather than with a full copy per refresh. The log is folded back into
+    the base snapshot after COMPACT_AFTER entries.
+    """
+    COMPACT_AFTER = 50
+
+    def __init__(self, folder):
+        """
+        :param folder: directory the snapshots are kept in
+        """
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.folder = folder
+        self._snapshots = {}
+        self._log_sizes = {}
+
+    def __path(self, account_id, extension):
+        return os.path.join(self.folder, f'{account_id}.{extension}')
+
+    def get_snapshot(self, account_id):
+        """
+        :param account_id: tracked instagram account id
+        :return: sorted array of follower ids or None if never refreshed
+        """
+        account_id = str(account_id)
+        if account_id in self._snapshots:
+            return self._snapshots[account_id]
+
+        base_path = self.__path(account_id, 'snapshot')
+        if not os.path.exists(base_path):
+            return None
+
+        snapshot = array('q')
+        with open(base_path, 'rb') as f:
+            snapshot.frombytes(f.read())
+
+        log_size = 0
+        for change in self.get_changes(account_id):
+            snapshot = FollowerSnapshots.apply(snapshot, change['added'],
+                                               change['removed'])
+            log_size += 1
+
+        self._snapshots[account_id] = snapshot
+        self._log_sizes[account_id] = log_size
+        return snapshot
+
+    def get_changes(self, account_id):
+        """
+        :param account_id: tracked instagram account id
+        :return: list of dicts that contain time, added and removed ids since the last compaction
+        """
+        try:
+            with open(self.__path(account_id, 'log'), 'r') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def refresh(self, account_id, follower_ids):
+        """
+        :param account_id: tracked instagram account id
+        :param follower_ids: iterable of the current follower ids
+        :return: dict that contains added and removed id lists and is_initial
+        """
+        account_id = str(account_id)
+        current = array('q', sorted(set(int(i) for i in follower_ids)))
+        previous = self.get_snapshot(account_id)
+
+        if previous is None:
+            self.__write_base(account_id, current)
+            return {'added': [], 'removed': [], 'is_initial': True}
+
+        added, removed = FollowerSnapshots.diff(previous, current)
+        self._snapshots[account_id] = current
+
+        if added or removed:
+            change = {'time': int(time.time()), 'added': added,
+                      'removed': removed}
+            with open(self.__path(account_id, 'log'), 'a') as f:
+                f.write(json.dumps(change, separators=(',', ':')) + '\n')
+
+            self._log_sizes[account_id] = self._log_sizes.get(account_id, 0) + 1
+            if self._log_sizes[account_id] >= FollowerSnapshots.COMPACT_AFTER:
+                self.__write_base(account_id, current)
+
+        return {'added': added, 'removed': removed, 'is_initial': False}
+
+    def __write_base(self, account_id, snapshot):
+        base_path = self.__path(account_id, 'snapshot')
+        with open(base_path + '.tmp', 'wb') as f:
+            snapshot.tofile(f)
+        os.replace(base_path + '.tmp', base_path)
+
+        try:
+            os.remove(self.__path(account_id, 'log'))
+        except FileNotFoundError:
+            pass
+
+        self._snapshots[account_id] = snapshot
+        self._log_sizes[account_id] = 0
+
+    @staticmethod
+    def diff(old, new):
+        """
+        Merge diff of two sorted id sequences
+        :param old: sorted ids of the previous snapshot
+        :param new: sorted ids of the current snapshot
+        :return: tuple of added and removed id lists
+        """
+        added = []
+        removed = []
+        i = 0
+        j = 0
+        while i < len(old) and j < len(new):
+            if old[i] == new[j]:
+                i += 1
+                j += 1
+            elif old[i] < new[j]:
+                removed.append(old[i])
+                i += 1
+            else:
+                added.append(new[j])
+                j += 1
+
+        removed.extend(old[i:])
+        added.extend(new[j:])
+        return added, removed
+
+    @staticmethod
+    def apply(snapshot, added, removed):
+        """
+        :param snapshot: sorted array of ids
+        :param added: ids to insert
+        :param removed: ids to drop
+        :return: new sorted array of ids
+        """
+        removed = set(removed)
+        ids = [i for i in snapshot if i not in removed]
+        ids.extend(added)
+        return array('q', sorted(set(ids)))
@@ -6,12 +6,20 @@ import hashlib
 import os
 from slugify import slugify
 import random
+from concurrent.futures import ThreadPoolExecutor
 from .session_manager import CookieSessionManager
+from .crawl_store import CrawlStore
+from .dedup import SeenSet
+from .json_codec import get_codec
+from .rate_limiter import RateLimiter
+from .response_cache import CachedResponse
+from .retry_policy import RetryPolicy
 from .exception.instagram_auth_exception import InstagramAuthException
 from .exception.instagram_exception import InstagramException
 from .exception.instagram_not_found_exception import InstagramNotFoundException
 from .model.account import Account
 from .model.comment import Comment
+from .model.lean import LeanAccount, LeanComment, LeanMedia
 from .model.location import Location
 from .model.media import Media
 from .model.story import Story
@@ -32,20 +40,44 @@ class Instagram:
     PAGING_TIME_LIMIT_SEC = 1800
     PAGING_DELAY_MINIMUM_MICROSEC = 1000000  # 1 sec min delay to simulate browser
     PAGING_DELAY_MAXIMUM_MICROSEC = 3000000  # 3 sec max delay to simulate browser
-
-    instance_cache = None
-
-    def __init__(self, sleep_between_requests=0):
+    # a saved session validated within this many seconds is used without checking it
+    SESSION_FRESHNESS_SEC = 3600
+    # how long tokens fetched before login or the first GraphQL request are reused
+    BOOTSTRAP_TTL_SEC = {
+        'rhx_gis': 86400,
+        'csrf_token': 86400,
+        'mid': 30 * 86400,
+    }
+
+    SHARED_DATA_MARKER = '_sharedData = '
+    __json_decoder = json.JSONDecoder()
+
+    def __init__(self, sleep_between_requests=0, retry_policy=None):
         self.__req = requests.session()
         self.paging_time_limit_sec = Instagram.PAGING_TIME_LIMIT_SEC
         self.paging_delay_minimum_microsec = Instagram.PAGING_DELAY_MINIMUM_MICROSEC
         self.paging_delay_maximum_microsec = Instagram.PAGING_DELAY_MAXIMUM_MICROSEC
+        self.session_freshness_sec = Instagram.SESSION_FRESHNESS_SEC
+        self.bootstrap_ttl_sec = dict(Instagram.BOOTSTRAP_TTL_SEC)
 
         self.session_username = None
         self.session_password = None
         self.user_session = None
+        self.instance_cache = None
         self.rhx_gis = None
+        self.__rhx_gis_loaded = False
         self.sleep_between_requests = sleep_between_requests
+        # a fixed sleep_between_requests becomes the fixed rate of every endpoint class
+        rate = 1.0 / sleep_between_requests if sleep_between_requests else None
+        self.rate_limiter = RateLimiter(rate=rate, max_rate=rate)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.response_cache = None
+        self.validator_store = None
+        self.proxy_pool = None
+        self.account_class = Account
+        self.media_class = Media
+        self.comment_class = Comment
+        self.json_codec = get_codec()
         self.user_agent = 'Instagram 126.0.0.25.121 Android (23/6.0.1; 320dpi; 720x1280; samsung; SM-A310F; a3xelte; samsungexynos7580; en_GB; 110937453)'
 
     def with_credentials(self, username, password, session_folder=None):
@@ -56,7 +88,7 @@ class Instagram:
 
         return Instagram
         """
-        Instagram.instance_cache = None
+        self.instance_cache = None
 
         if not session_folder:
             cwd = os.getcwd()
@@ -64,14 +96,13 @@ class Instagram:
 
         if isinstance(session_folder, str):
 
-            Instagram.instance_cache = CookieSessionManager(
+            self.instance_cache = CookieSessionManager(
                 session_folder, slugify(username) + '.txt')
 
         else:
-            Instagram.instance_cache = session_folder
-
-        Instagram.instance_cache.empty_saved_cookies()
+            self.instance_cache = session_folder
 
+        # saved sessions are kept for other workers, login() checks whether they are still valid
 
         self.session_username = username
         self.session_password = password
@@ -85,6 +116,148 @@ class Instagram:
 
     def disable_proxies(self):
         self.__req.proxies = {}
+        self.set_proxy_pool(None)
+
+    def set_proxy_pool(self, proxy_pool):
+        """
+        :param proxy_pool: ProxyPool requests are sent through, this instance sticks to one of its proxies; None disables it
+        """
+        if self.proxy_pool is not None:
+            self.proxy_pool.release(id(self))
+        self.proxy_pool = proxy_pool
+
+    def set_session_freshness(self, seconds):
+        """
+        :param seconds: how long a validated session is trusted without a request, 0 always checks it
+        """
+        self.session_freshness_sec = seconds
+
+    def set_rate_limiter(self, rate_limiter):
+        """
+        :param rate_limiter: RateLimiter every request is paced by
+        """
+        self.rate_limiter = rate_limiter
+
+    def set_retry_policy(self, retry_policy):
+        """
+        :param retry_policy: RetryPolicy failed requests are retried with
+        """
+        self.retry_policy = retry_policy
+
+    def set_response_cache(self, response_cache):
+        """
+        :param response_cache: ResponseCache profile and media lookups are answered from, None disables caching
+        """
+        self.response_cache = response_cache
+
+    def set_validator_store(self, validator_store):
+        """
+        :param validator_store: ValidatorStore polled JSON endpoints are revalidated with, None disables it
+        """
+        self.validator_store = validator_store
+
+    def set_lean_models(self, lean=True):
+        """
+        :param lean: True returns accounts, medias and comments as LeanAccount, LeanMedia and LeanComment
+        """
+        if lean:
+            self.account_class = LeanAccount
+            self.media_class = LeanMedia
+            self.comment_class = LeanComment
+        else:
+            self.account_class = Account
+            self.media_class = Media
+            self.comment_class = Comment
+
+    def set_json_codec(self, codec):
+        """
+        GraphQL urls are encoded with endpoints.set_json_codec, which is shared by all instances
+        :param codec: JsonCodec or codec name ('orjson', 'ujson', 'json') responses are decoded with
+        """
+        self.json_codec = get_codec(codec) if isinstance(codec, str) else codec
+
+    def __json(self, response):
+        """
+        decodes the response body straight from its bytes
+        :param response: requests.Response or CachedResponse
+        :return: decoded JSON
+        """
+        if isinstance(response, CachedResponse):
+            return response.json(self.json_codec.loads)
+        return self.json_codec.loads(response.content)
+
+    def __get(self, url, **kwargs):
+        if self.response_cache is not None:
+            response = self.response_cache.get(url)
+            if response is not None:
+                return response
+
+        if self.validator_store is not None:
+            kwargs['headers'] = {
+                **(kwargs.get('headers') or {}),
+                **self.validator_store.get_conditional_headers(url)
+            }
+
+        response = self.__send(self.__req.get, url, kwargs, True)
+
+        if self.validator_store is not None:
+            response = self.validator_store.update(url, response)
+
+        if self.response_cache is not None \
+                and response.status_code == Instagram.HTTP_OK:
+            self.response_cache.put(url, response)
+
+        return response
+
+    @staticmethod
+    def __model(response, key, build):
+        """
+        :param response: response the model is built from
+        :param key: name of the model within the response
+        :param build: function that builds the model
+        :return: the model, shared with earlier calls if the response came from a cache or a 304
+        """
+        if not isinstance(response, CachedResponse):
+            return build()
+
+        if key not in response.models:
+            response.models[key] = build()
+
+        return response.models[key]
+
+    def __post(self, url, **kwargs):
+        return self.__send(self.__req.post, url, kwargs, False)
+
+    def __send(self, send, url, kwargs, idempotent):
+        # the same url is sent again, so paginated calls retry the same cursor
+        attempt = 1
+        while True:
+            self.rate_limiter.acquire(url)
+            if self.proxy_pool is not None:
+                proxy, kwargs['proxies'] = self.proxy_pool.get_proxy(id(self))
+                started_at = time.monotonic()
+            try:
+                response = send(url, **kwargs)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout):
+                if self.proxy_pool is not None:
+                    self.proxy_pool.report(proxy, error=True)
+                if not self.retry_policy.should_retry(attempt, None, idempotent):
+                    raise
+            else:
+                if self.proxy_pool is not None:
+                    self.proxy_pool.report(
+                        proxy, time.monotonic() - started_at,
+                        response.status_code == RateLimiter.TOO_MANY_REQUESTS
+                        or response.status_code >= 500)
+                self.rate_limiter.update(url, response.status_code,
+                                         response.headers)
+                if response.status_code < 400 or not self.retry_policy.should_retry(
+                        attempt, response.status_code, idempotent):
+                    return response
+
+            time.sleep(self.retry_policy.get_delay(attempt))
+            attempt += 1
 
     def get_user_agent(self):
         return self.user_agent
@@ -113,8 +286,7 @@ class Instagram:
         :param id: account id
         :return: username string from response
         """
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(
+        response = self.__get(
             endpoints.get_account_json_private_info_link_by_account_id(
                 id), headers=self.generate_headers(self.user_session))
 
@@ -126,7 +298,7 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
         if not json_response:
             raise InstagramException('Response does not JSON')
 
@@ -172,46 +344,83 @@ class Instagram:
         :param variables: a dict used to  generate_gis_token
         :return: a token used to be verified by instagram
         """
-        rhx_gis = self.__get_rhx_gis() if self.__get_rhx_gis() is not None else 'NULL'
-        string_to_hash = ':'.join([rhx_gis, json.dumps(variables, separators=(',', ':')) if isinstance(variables, dict) else variables])
+        rhx_gis = self.__get_rhx_gis()
+        if rhx_gis is None:
+            rhx_gis = 'NULL'
+        string_to_hash = ':'.join([rhx_gis, endpoints.encode_variables(variables) if isinstance(variables, dict) else variables])
         return hashlib.md5(string_to_hash.encode('utf-8')).hexdigest()
 
     def __get_rhx_gis(self):
         """
         :return: a string to generate gis_token
         """
-        if self.rhx_gis is None:
-            try:
-                shared_data = self.__get_shared_data_from_page()
-            except Exception as _:
-                raise InstagramException('Could not extract gis from page')
-
-            if 'rhx_gis' in shared_data.keys():
-                self.rhx_gis = shared_data['rhx_gis']
+        if self.rhx_gis is None and not self.__rhx_gis_loaded:
+            entry = self.__get_bootstrap('rhx_gis')
+            if entry is not None:
+                self.rhx_gis = entry['value']
             else:
-                self.rhx_gis = None
+                try:
+                    shared_data = self.__get_shared_data_from_page()
+                except Exception as _:
+                    raise InstagramException('Could not extract gis from page')
+
+                if 'rhx_gis' in shared_data.keys():
+                    self.rhx_gis = shared_data['rhx_gis']
+                else:
+                    self.rhx_gis = None
+                # pages without rhx_gis are remembered as well, so they are not fetched again
+                self.__set_bootstrap('rhx_gis', self.rhx_gis)
+
+            self.__rhx_gis_loaded = True
 
         return self.rhx_gis
 
     def __get_mid(self):
         """manually fetches the machine id from graphQL"""
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get('https://www.instagram.com/web/__mid/')
+        entry = self.__get_bootstrap('mid')
+        if entry is not None:
+            return entry['value']
+
+        response = self.__get(endpoints.MID_URL)
 
         if response.status_code != Instagram.HTTP_OK:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
+        self.__set_bootstrap('mid', response.text)
         return response.text
 
+    def __get_bootstrap(self, name):
+        """
+        :param name: key of BOOTSTRAP_TTL_SEC
+        :return: dict that contains value and expires_at, None if not stored or expired
+        """
+        entry = self.__get_session_meta().get('bootstrap', {}).get(name)
+        if entry is None or entry['expires_at'] <= time.time():
+            return None
+        return entry
+
+    def __set_bootstrap(self, name, value):
+        entry = {
+            'value': value,
+            'expires_at': time.time() + self.bootstrap_ttl_sec[name],
+        }
+        self.__update_session_meta(
+            lambda meta: meta.setdefault('bootstrap', {}).update({name: entry}))
+
+    def __drop_bootstrap(self, name):
+        def drop(meta):
+            meta.get('bootstrap', {}).pop(name, None)
+
+        self.__update_session_meta(drop)
+
     def __get_shared_data_from_page(self, url=endpoints.BASE_URL):
         """
         :param url: the requested url
         :return: a dict extract from page
         """
         url = url.rstrip('/') + '/'
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(url, headers=self.generate_headers(
+        response = self.__get(url, headers=self.generate_headers(
             self.user_session))
 
         if Instagram.HTTP_NOT_FOUND == response.status_code:
@@ -229,13 +438,15 @@ class Instagram:
         :param body: html string from a page
         :return: a dict extract from page
         """
-        array = re.findall(r'_sharedData = .*?;</script>', body)
-        if len(array) > 0:
-            raw_json = array[0][len("_sharedData ="):-len(";</script>")]
+        # find the marker and decode only the json object after it instead
+        # of running a lazy regex over the whole page
+        start = body.find(Instagram.SHARED_DATA_MARKER)
+        if start < 0:
+            return None
 
-            return json.loads(raw_json)
-
-        return None
+        start += len(Instagram.SHARED_DATA_MARKER)
+        shared_data, _ = Instagram.__json_decoder.raw_decode(body, start)
+        return shared_data
 
     def search_tags_by_tag_name(self, tag):
         """
@@ -243,8 +454,7 @@ class Instagram:
         :return: list of Tag
         """
         # TODO: Add tests and auth
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(endpoints.get_general_search_json_link(tag))
+        response = self.__get(endpoints.get_general_search_json_link(tag))
 
         if Instagram.HTTP_NOT_FOUND == response.status_code:
             raise InstagramNotFoundException(
@@ -254,7 +464,7 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
         try:
             status = json_response['status']
@@ -303,15 +513,28 @@ class Instagram:
         :param max_id: used to paginate
         :return: list of Media
         """
-        index = 0
         medias = []
-        is_more_available = True
+        for page in self.iter_medias_by_user_id(id, count, max_id):
+            medias.extend(page['medias'][:count - len(medias)])
+            if len(medias) == count:
+                break
+
+        return medias
 
-        while index < count and is_more_available:
+    def iter_medias_by_user_id(self, id, page_size=12, max_id=''):
+        """
+        Yields the medias of an account one page at a time
+        :param id: instagram account id
+        :param page_size: the number of medias requested per page
+        :param max_id: end_cursor to start from
+        :return: generator of dict that contains medias, next_page, has_next_page
+        """
+        has_next_page = True
+        while has_next_page:
 
             variables = {
                 'id': str(id),
-                'first': str(count),
+                'first': str(page_size),
                 'after': str(max_id)
             }
 
@@ -319,8 +542,7 @@ class Instagram:
                                             self.__generate_gis_token(
                                                 variables))
 
-            time.sleep(self.sleep_between_requests)
-            response = self.__req.get(
+            response = self.__get(
                 endpoints.get_account_medias_json_link(variables),
                 headers=headers)
 
@@ -328,35 +550,26 @@ class Instagram:
                 raise InstagramException.default(response.text,
                                                  response.status_code)
 
-            arr = json.loads(response.text)
+            arr = self.__json(response)
 
             try:
-                nodes = arr['data']['user']['edge_owner_to_timeline_media'][
-                    'edges']
+                timeline = arr['data']['user']['edge_owner_to_timeline_media']
+                nodes = timeline['edges']
             except KeyError:
-                return {}
+                return
 
-            for mediaArray in nodes:
-                if index == count:
-                    return medias
+            if not nodes:
+                return
 
-                media = Media(mediaArray['node'])
-                medias.append(media)
-                index += 1
-
-            if not nodes or nodes == '':
-                return medias
-
-            max_id = \
-                arr['data']['user']['edge_owner_to_timeline_media'][
-                    'page_info'][
-                    'end_cursor']
-            is_more_available = \
-                arr['data']['user']['edge_owner_to_timeline_media'][
-                    'page_info'][
-                    'has_next_page']
+            max_id = timeline['page_info']['end_cursor']
+            has_next_page = timeline['page_info']['has_next_page']
 
-        return medias
+            yield {
+                'medias': [self.media_class(media_array['node'])
+                           for media_array in nodes],
+                'next_page': max_id,
+                'has_next_page': has_next_page,
+            }
 
     def get_media_by_id(self, media_id):
         """
@@ -377,8 +590,7 @@ class Instagram:
             raise ValueError('Malformed media url')
 
         url = media_url.rstrip('/') + '/?__a=1'
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(url, headers=self.generate_headers(
+        response = self.__get(url, headers=self.generate_headers(
             self.user_session))
 
         if Instagram.HTTP_NOT_FOUND == response.status_code:
@@ -389,13 +601,14 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        media_array = response.json()
+        media_array = self.__json(response)
         try:
             media_in_json = media_array['graphql']['shortcode_media']
         except KeyError:
             raise InstagramException('Media with this code does not exist')
 
-        return Media(media_in_json)
+        return Instagram.__model(response, ('media', self.media_class),
+                                lambda: self.media_class(media_in_json))
 
     def get_medias_from_feed(self, username, count=20):
         """
@@ -405,10 +618,9 @@ class Instagram:
         """
         medias = []
         index = 0
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(endpoints.get_account_json_link(username),
-                                  headers=self.generate_headers(
-                                      self.user_session))
+        response = self.__get(endpoints.get_account_json_link(username),
+                              headers=self.generate_headers(
+                                  self.user_session))
 
         if Instagram.HTTP_NOT_FOUND == response.status_code:
             raise InstagramNotFoundException(
@@ -418,7 +630,7 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        user_array = response.json()
+        user_array = self.__json(response)
 
         try:
             user = user_array['graphql']['user']
@@ -436,27 +648,66 @@ class Instagram:
         for media_array in nodes:
             if index == count:
                 return medias
-            medias.append(Media(media_array['node']))
+            medias.append(self.media_class(media_array['node']))
             index += 1
 
         return medias
 
-    def get_medias_by_tag(self, tag, count=12, max_id='', min_timestamp=None):
+    def get_medias_by_tag(self, tag, count=12, max_id='', min_timestamp=None,
+                          seen=None, max_seen_pages=5):
         """
+        Seen medias are skipped rather than ending the crawl, so with a seen
+        set that already holds the top of a large tag, getting count new
+        medias can page deep into the tag; max_seen_pages and min_timestamp
+        bound that walk
         :param tag: tag string
         :param count: the number of how many media you want to get
         :param max_id: used to paginate
         :param min_timestamp: limit the time you want to start from
+        :param seen: SeenSet or BloomFilter of media ids to skip, new ids are added to it; a new SeenSet if None
+        :param max_seen_pages: pages in a row without an unseen media after which the crawl stops, None for no limit
         :return: list of Media
         """
-        index = 0
+        if seen is None:
+            seen = SeenSet()
+
         medias = []
-        media_ids = []
+        seen_pages = 0
+        for page in self.iter_medias_by_tag(tag, max_id):
+            found = len(medias)
+            for media in page['medias']:
+                if len(medias) == count:
+                    return medias
+
+                if min_timestamp is not None \
+                        and media.created_time < min_timestamp:
+                    return medias
+
+                if not seen.add(media.identifier):
+                    continue
+
+                medias.append(media)
+
+            if len(medias) == count:
+                break
+
+            seen_pages = seen_pages + 1 if len(medias) == found else 0
+            if max_seen_pages is not None and seen_pages >= max_seen_pages:
+                break
+
+        return medias
+
+    def iter_medias_by_tag(self, tag, max_id=''):
+        """
+        Yields the medias of a hashtag one page at a time
+        :param tag: tag string
+        :param max_id: end_cursor to start from
+        :return: generator of dict that contains medias, next_page, has_next_page
+        """
         has_next_page = True
-        while index < count and has_next_page:
+        while has_next_page:
 
-            time.sleep(self.sleep_between_requests)
-            response = self.__req.get(
+            response = self.__get(
                 endpoints.get_medias_json_by_tag_link(tag, max_id),
                 headers=self.generate_headers(self.user_session))
 
@@ -464,31 +715,21 @@ class Instagram:
                 raise InstagramException.default(response.text,
                                                  response.status_code)
 
-            arr = response.json()
+            arr = self.__json(response)
 
             try:
                 arr['graphql']['hashtag']['edge_hashtag_to_media']['count']
             except KeyError:
-                return []
+                return
 
             nodes = arr['graphql']['hashtag']['edge_hashtag_to_media']['edges']
-            for media_array in nodes:
-                if index == count:
-                    return medias
-                media = Media(media_array['node'])
-                if media.identifier in media_ids:
-                    return medias
-
-                if min_timestamp is not None \
-                        and media.created_time < min_timestamp:
-                    return medias
-
-                media_ids.append(media.identifier)
-                medias.append(media)
-                index += 1
-
             if len(nodes) == 0:
-                return medias
+                return
+
+            page = Instagram.__model(
+                response, ('medias', self.media_class),
+                lambda: [self.media_class(media_array['node'])
+                         for media_array in nodes])
 
             max_id = \
                 arr['graphql']['hashtag']['edge_hashtag_to_media']['page_info'][
@@ -497,7 +738,11 @@ class Instagram:
                 arr['graphql']['hashtag']['edge_hashtag_to_media']['page_info'][
                     'has_next_page']
 
-        return medias
+            yield {
+                'medias': page,
+                'next_page': max_id,
+                'has_next_page': has_next_page,
+            }
 
     def get_medias_by_location_id(self, facebook_location_id, count=24,
                                   max_id=''):
@@ -507,14 +752,25 @@ class Instagram:
         :param max_id: used to paginate
         :return: list of Media
         """
-        index = 0
         medias = []
-        has_next_page = True
+        for page in self.iter_medias_by_location_id(facebook_location_id, max_id):
+            medias.extend(page['medias'][:count - len(medias)])
+            if len(medias) == count:
+                break
+
+        return medias
 
-        while index < count and has_next_page:
+    def iter_medias_by_location_id(self, facebook_location_id, max_id=''):
+        """
+        Yields the medias of a location one page at a time
+        :param facebook_location_id: facebook location id
+        :param max_id: end_cursor to start from
+        :return: generator of dict that contains medias, next_page, has_next_page
+        """
+        has_next_page = True
+        while has_next_page:
 
-            time.sleep(self.sleep_between_requests)
-            response = self.__req.get(
+            response = self.__get(
                 endpoints.get_medias_json_by_location_id_link(
                     facebook_location_id, max_id),
                 headers=self.generate_headers(self.user_session))
@@ -523,19 +779,12 @@ class Instagram:
                 raise InstagramException.default(response.text,
                                                  response.status_code)
 
-            arr = response.json()
+            arr = self.__json(response)
 
             nodes = arr['graphql']['location']['edge_location_to_media'][
                 'edges']
-            for media_array in nodes:
-                if index == count:
-                    return medias
-
-                medias.append(Media(media_array['node']))
-                index += 1
-
             if len(nodes) == 0:
-                return medias
+                return
 
             has_next_page = \
                 arr['graphql']['location']['edge_location_to_media'][
@@ -546,15 +795,19 @@ class Instagram:
                     'page_info'][
                     'end_cursor']
 
-        return medias
+            yield {
+                'medias': [self.media_class(media_array['node'])
+                           for media_array in nodes],
+                'next_page': max_id,
+                'has_next_page': has_next_page,
+            }
 
     def get_current_top_medias_by_tag_name(self, tag_name):
         """
         :param tag_name: tag string
         :return: list of the top Media
         """
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(
+        response = self.__get(
             endpoints.get_medias_json_by_tag_link(tag_name, ''),
             headers=self.generate_headers(self.user_session))
 
@@ -566,7 +819,7 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
         medias = []
 
         nodes = \
@@ -574,7 +827,7 @@ class Instagram:
                 'edges']
 
         for media_array in nodes:
-            medias.append(Media(media_array['node']))
+            medias.append(self.media_class(media_array['node']))
 
         return medias
 
@@ -583,8 +836,7 @@ class Instagram:
         :param facebook_location_id: facebook location id
         :return: list of the top Media
         """
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(
+        response = self.__get(
             endpoints.get_medias_json_by_location_id_link(facebook_location_id),
             headers=self.generate_headers(self.user_session))
         if response.status_code == Instagram.HTTP_NOT_FOUND:
@@ -595,7 +847,7 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
         nodes = \
             json_response['graphql']['location']['edge_location_to_top_posts'][
@@ -603,7 +855,7 @@ class Instagram:
         medias = []
 
         for media_array in nodes:
-            medias.append(Media(media_array['node']))
+            medias.append(self.media_class(media_array['node']))
 
         return medias
 
@@ -629,8 +881,7 @@ class Instagram:
             'after': str(max_id)
         }
 
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(
+        response = self.__get(
             endpoints.get_account_medias_json_link(variables),
             headers=self.generate_headers(self.user_session,
                                           self.__generate_gis_token(variables))
@@ -640,7 +891,7 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        arr = response.json()
+        arr = self.__json(response)
 
         try:
             nodes = arr['data']['user']['edge_owner_to_timeline_media']['edges']
@@ -648,7 +899,7 @@ class Instagram:
             return to_return
 
         for mediaArray in nodes:
-            medias.append(Media(mediaArray['node']))
+            medias.append(self.media_class(mediaArray['node']))
 
         max_id = \
             arr['data']['user']['edge_owner_to_timeline_media']['page_info'][
@@ -680,8 +931,7 @@ class Instagram:
             'hasNextPage': has_next_page,
         }
 
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(
+        response = self.__get(
             endpoints.get_medias_json_by_tag_link(tag, max_id),
             headers=self.generate_headers(self.user_session))
 
@@ -689,7 +939,7 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        arr = response.json()
+        arr = self.__json(response)
 
         try:
             nodes = arr['graphql']['hashtag']['edge_hashtag_to_media']['edges']
@@ -697,7 +947,7 @@ class Instagram:
             return to_return
 
         for media_array in nodes:
-            medias.append(Media(media_array['node']))
+            medias.append(self.media_class(media_array['node']))
 
         max_id = \
             arr['graphql']['hashtag']['edge_hashtag_to_media']['page_info'][
@@ -725,8 +975,7 @@ class Instagram:
         :param facebook_location_id: facebook location id
         :return: Location
         """
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(
+        response = self.__get(
             endpoints.get_medias_json_by_location_id_link(facebook_location_id),
             headers=self.generate_headers(self.user_session))
 
@@ -738,9 +987,11 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
-        return Location(json_response['graphql']['location'])
+        return Instagram.__model(
+            response, 'location',
+            lambda: Location(json_response['graphql']['location']))
 
     def get_media_likes_by_code(self, code, count=10, max_id=None):
         """
@@ -774,22 +1025,20 @@ class Instagram:
                 "after": '' if not max_id else max_id
             }
 
-            time.sleep(self.sleep_between_requests)
-
-            response = self.__req.get(
+            response = self.__get(
                 endpoints.get_last_likes_by_code(variables),
                 headers=self.generate_headers(self.user_session))
 
             if not response.status_code == Instagram.HTTP_OK:
                 raise InstagramException.default(response.text,response.status_code)
 
-            jsonResponse = response.json()
+            jsonResponse = self.__json(response)
 
             nodes = jsonResponse['data']['shortcode_media']['edge_liked_by']['edges']
 
             for likesArray in nodes:
 
-                like = Account(likesArray['node'])
+                like = self.account_class(likesArray['node'])
                 likes.append(like)
 
 
@@ -821,8 +1070,8 @@ class Instagram:
         :param account_id:
         :param count:
         :param page_size:
-        :param rate_limit_sleep_min:
-        :param rate_limit_sleep_max:
+        :param rate_limit_sleep_min: unused, kept for compatibility, 429 backoff is done by the rate limiter
+        :param rate_limit_sleep_max: unused, kept for compatibility, 429 backoff is done by the rate limiter
         :param delayed_time_min:
         :param delayed_time_max:
         :param end_cursor:
@@ -834,81 +1083,14 @@ class Instagram:
         #     set_time_limit($this->pagingTimeLimitSec);
         # }
 
-        index = 0
-        accounts = []
-
-        next_page = end_cursor
-
         if count < page_size:
             raise InstagramException(
                 'Count must be greater than or equal to page size.')
 
-        while True:
-            time.sleep(self.sleep_between_requests)
-
-            variables = {
-                'id': str(account_id),
-                'first': str(count),
-                'after': next_page
-            }
-
-            headers = self.generate_headers(self.user_session)
-
-            response = self.__req.get(
-                endpoints.get_followers_json_link(variables),
-                headers=headers)
-
-            if not response.status_code == Instagram.HTTP_OK:
-                if response.status_code == 429:
-                    time.sleep(random.uniform(rate_limit_sleep_min, rate_limit_sleep_max))
-                raise InstagramException.default(response.text,
-                                                 response.status_code)
-
-            jsonResponse = response.json()
-
-            if jsonResponse['data']['user']['edge_followed_by']['count'] == 0:
-                return accounts
-
-            edgesArray = jsonResponse['data']['user']['edge_followed_by'][
-                'edges']
-            if len(edgesArray) == 0 and index > 2:
-                InstagramException(
-                    f'Failed to get followers of account id {account_id}.'
-                    f' The account is private.',
-                    Instagram.HTTP_FORBIDDEN)
-
-            pageInfo = jsonResponse['data']['user']['edge_followed_by'][
-                'page_info']
-            if pageInfo['has_next_page']:
-                next_page = pageInfo['end_cursor']
-
-            for edge in edgesArray:
-
-                accounts.append(Account(edge['node']))
-                index += 1
-
-                if index >= count:
-                    #since break 2 not in python, looking for better solution since duplicate code
-                    data = {}
-                    data['next_page'] = next_page
-                    data['accounts'] = accounts
-
-                    return data
-
-            #must be below here
-            if not pageInfo['has_next_page']:
-                break
+        pages = self.iter_followers(account_id, count, end_cursor,
+                                    delayed_time_min, delayed_time_max, delayed)
 
-            if delayed != None:
-                # Random wait between 1 and 3 sec to mimic browser
-                microsec = random.uniform(delayed_time_min, delayed_time_max)
-                time.sleep(microsec)
-
-        data = {}
-        data['next_page'] = next_page
-        data['accounts'] = accounts
-
-        return data
+        return Instagram.__collect_accounts(pages, count, end_cursor)
 
     def get_following(self, account_id, count=20, page_size=20, rate_limit_sleep_min=10.0, rate_limit_sleep_max=50.0,
                       delayed_time_min=2.0, delayed_time_max=6.0, end_cursor='',
@@ -917,9 +1099,9 @@ class Instagram:
         :param account_id:
         :param count:
         :param page_size:
-        :param rate_limit_sleep_min:
+        :param rate_limit_sleep_min: unused, kept for compatibility, 429 backoff is done by the rate limiter
         :param delayed_time_min:
-        :param rate_limit_sleep_max:
+        :param rate_limit_sleep_max: unused, kept for compatibility, 429 backoff is done by the rate limiter
         :param delayed_time_max:
         :param end_cursor:
         :param delayed:
@@ -931,76 +1113,184 @@ class Instagram:
     #         set_time_limit($this->pagingTimeLimitSec);
     #     }
 
-        index = 0
+        if count < page_size:
+            raise InstagramException('Count must be greater than or equal to page size.')
+
+        pages = self.iter_following(account_id, count, end_cursor,
+                                    delayed_time_min, delayed_time_max, delayed)
+
+        return Instagram.__collect_accounts(pages, count, end_cursor)
+
+    @staticmethod
+    def __collect_accounts(pages, count, end_cursor):
+        """
+        :param pages: generator returned by iter_followers or iter_following
+        :param count: the number of accounts to collect
+        :param end_cursor: cursor the pages started from
+        :return: dict that contains Account list and next_page
+        """
         accounts = []
         next_page = end_cursor
 
-        if count < page_size:
-            raise InstagramException('Count must be greater than or equal to page size.')
+        for page in pages:
+            if page['count'] == 0:
+                break
 
-        while True:
+            next_page = page['next_page']
+            for account in page['accounts']:
+                accounts.append(account)
+                if len(accounts) >= count:
+                    pages.close()
+                    return {'next_page': next_page, 'accounts': accounts}
+
+        return {'next_page': next_page, 'accounts': accounts}
+
+    def iter_followers(self, account_id, page_size=20, end_cursor='',
+                       delayed_time_min=2.0, delayed_time_max=6.0,
+                       delayed=True):
+        """
+        Yields the followers of an account one page at a time, as soon as
+        the page is parsed. Pass a yielded next_page back as end_cursor to
+        resume the crawl later.
+        :param account_id: instagram account id
+        :param page_size: the number of accounts requested per page
+        :param end_cursor: used to paginate
+        :param delayed_time_min:
+        :param delayed_time_max:
+        :param delayed: random wait between pages to mimic browser
+        :return: generator of dicts that contain Account list, next_page, has_next_page, count
+        """
+        return self.__iter_follow_pages(
+            endpoints.get_followers_json_link, 'edge_followed_by', 'followers',
+            account_id, page_size, end_cursor, delayed_time_min,
+            delayed_time_max, delayed)
+
+    def iter_following(self, account_id, page_size=20, end_cursor='',
+                       delayed_time_min=2.0, delayed_time_max=6.0,
+                       delayed=True):
+        """
+        Yields the accounts followed by an account one page at a time, as
+        soon as the page is parsed. Pass a yielded next_page back as
+        end_cursor to resume the crawl later.
+        :param account_id: instagram account id
+        :param page_size: the number of accounts requested per page
+        :param end_cursor: used to paginate
+        :param delayed_time_min:
+        :param delayed_time_max:
+        :param delayed: random wait between pages to mimic browser
+        :return: generator of dicts that contain Account list, next_page, has_next_page, count
+        """
+        return self.__iter_follow_pages(
+            endpoints.get_following_json_link, 'edge_follow', 'follows',
+            account_id, page_size, end_cursor, delayed_time_min,
+            delayed_time_max, delayed)
+
+    def crawl_followers(self, account_id, store, page_size=50, **kwargs):
+        """
+        Fetches every follower into store, committing the page and its
+        end_cursor after each request. Calling it again with the same
+        account id after a failure continues from the last committed cursor.
+        :param account_id: instagram account id
+        :param store: CrawlStore
+        :param page_size: the number of accounts requested per page
+        :param kwargs: passed to iter_followers
+        :return: number of followers in store
+        """
+        return self.__crawl(self.iter_followers, CrawlStore.FOLLOWERS,
+                            account_id, store, page_size, kwargs)
+
+    def crawl_following(self, account_id, store, page_size=50, **kwargs):
+        """
+        Fetches every followed account into store, committing the page and
+        its end_cursor after each request. Calling it again with the same
+        account id after a failure continues from the last committed cursor.
+        :param account_id: instagram account id
+        :param store: CrawlStore
+        :param page_size: the number of accounts requested per page
+        :param kwargs: passed to iter_following
+        :return: number of followed accounts in store
+        """
+        return self.__crawl(self.iter_following, CrawlStore.FOLLOWING,
+                            account_id, store, page_size, kwargs)
+
+    @staticmethod
+    def __crawl(iterate, kind, account_id, store, page_size, kwargs):
+        checkpoint = store.get_checkpoint(kind, account_id)
+
+        if checkpoint is None:
+            end_cursor = ''
+        elif checkpoint['has_next_page']:
+            end_cursor = checkpoint['next_page']
+        else:
+            return store.count_accounts(kind, account_id)
+
+        for page in iterate(account_id, page_size, end_cursor, **kwargs):
+            store.save_page(kind, account_id, page)
 
+        return store.count_accounts(kind, account_id)
+
+    def __iter_follow_pages(self, link, edge_name, label, account_id, page_size,
+                            end_cursor, delayed_time_min, delayed_time_max,
+                            delayed):
+        index = 0
+        next_page = end_cursor
+
+        while True:
             variables = {
                 'id': str(account_id),
-                'first': str(count),
+                'first': str(page_size),
                 'after': next_page
             }
 
-            headers = self.generate_headers(self.user_session)
-
-
-            response = self.__req.get(
-                endpoints.get_following_json_link(variables),
-                headers=headers)
+            response = self.__get(
+                link(variables),
+                headers=self.generate_headers(self.user_session))
 
             if not response.status_code == Instagram.HTTP_OK:
-                if response.status_code == 429:
-                    time.sleep(random.uniform(rate_limit_sleep_min, rate_limit_sleep_max))
-                raise InstagramException.default(response.text,response.status_code)
+                raise InstagramException.default(response.text,
+                                                 response.status_code)
 
-            jsonResponse = response.json()
-            if jsonResponse['data']['user']['edge_follow']['count'] == 0:
-                return accounts
+            edge = self.__json(response)['data']['user'][edge_name]
 
-            edgesArray = jsonResponse['data']['user']['edge_follow']['edges']
+            if edge['count'] == 0:
+                yield {
+                    'accounts': [],
+                    'next_page': next_page,
+                    'has_next_page': False,
+                    'count': 0,
+                }
+                return
+
+            edges_array = edge['edges']
 
             #confirmation of presence of previous increments of indexes making sure account
             #is not a private account
-            if len(edgesArray) == 0 and index > 2:
+            if len(edges_array) == 0 and index > 2:
                 raise InstagramException(
-                    f'Failed to get follows of account id {account_id}.'
+                    f'Failed to get {label} of account id {account_id}.'
                     f' The account is private.',
                     Instagram.HTTP_FORBIDDEN)
 
-            pageInfo = jsonResponse['data']['user']['edge_follow']['page_info']
-            if pageInfo['has_next_page']:
-                next_page = pageInfo['end_cursor']
+            page_info = edge['page_info']
+            if page_info['has_next_page']:
+                next_page = page_info['end_cursor']
 
-            for edge in edgesArray:
-                accounts.append(Account(edge['node']))
-                index += 1
-                if index >= count:
-                    #since no break 2, looking for better solution since duplicate code
-                    data = {}
-                    data['next_page'] = next_page
-                    data['accounts'] = accounts
+            accounts = [self.account_class(item['node']) for item in edges_array]
+            index += len(accounts)
 
-                    return data
+            yield {
+                'accounts': accounts,
+                'next_page': next_page,
+                'has_next_page': page_info['has_next_page'],
+                'count': edge['count'],
+            }
 
-            #must be below here
-            if not pageInfo['has_next_page']:
-                break
+            if not page_info['has_next_page']:
+                return
 
-            if delayed != None:
+            if delayed:
                 # Random wait between 1 and 3 sec to mimic browser
-                microsec = random.uniform(delayed_time_min, delayed_time_max)
-                time.sleep(microsec)
-
-        data = {}
-        data['next_page'] = next_page
-        data['accounts'] = accounts
-
-        return data
+                time.sleep(random.uniform(delayed_time_min, delayed_time_max))
 
     def get_media_comments_by_id(self, media_id, count=10, max_id=None):
         """
@@ -1041,22 +1331,21 @@ class Instagram:
             comments_url = endpoints.get_comments_before_comments_id_by_code(
                 variables)
 
-            time.sleep(self.sleep_between_requests)
-            response = self.__req.get(comments_url,
-                                      headers=self.generate_headers(
-                                          self.user_session,
-                                          self.__generate_gis_token(variables)))
+            response = self.__get(comments_url,
+                                  headers=self.generate_headers(
+                                      self.user_session,
+                                      self.__generate_gis_token(variables)))
 
             if not response.status_code == Instagram.HTTP_OK:
                 raise InstagramException.default(response.text,
                                                  response.status_code)
 
-            jsonResponse = response.json()
+            jsonResponse = self.__json(response)
 
             nodes = jsonResponse['data']['shortcode_media']['edge_media_to_parent_comment']['edges']
 
             for commentArray in nodes:
-                comment = Comment(commentArray['node'])
+                comment = self.comment_class(commentArray['node'])
                 comments.append(comment)
                 index += 1
 
@@ -1091,16 +1380,15 @@ class Instagram:
         comments_url = endpoints.get_comments_before_comments_id_by_code(
             variables)
 
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(comments_url,
-                                  headers=self.generate_headers(
-                                      self.user_session,
-                                      self.__generate_gis_token(variables)))
+        response = self.__get(comments_url,
+                              headers=self.generate_headers(
+                                  self.user_session,
+                                  self.__generate_gis_token(variables)))
 
         if not response.status_code == Instagram.HTTP_OK:
             raise InstagramException.default(response.text,
                                              response.status_code)
-        jsonResponse = response.json()
+        jsonResponse = self.__json(response)
         number_of_comments = jsonResponse['data']['shortcode_media']['edge_media_to_parent_comment']['count']
 
         return number_of_comments
@@ -1110,8 +1398,7 @@ class Instagram:
         :param username: username
         :return: Account
         """
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(endpoints.get_account_page_link(
+        response = self.__get(endpoints.get_account_page_link(
             username), headers=self.generate_headers(self.user_session))
 
         if Instagram.HTTP_NOT_FOUND == response.status_code:
@@ -1128,9 +1415,37 @@ class Instagram:
             raise InstagramNotFoundException(
                 'Account with this username does not exist')
 
-        return Account(
+        return self.account_class(
             user_array['entry_data']['ProfilePage'][0]['graphql']['user'])
 
+    def get_accounts(self, usernames, concurrency=4):
+        """
+        Fetches many accounts over a bounded pool of workers, all paced by
+        the rate limiter of this instance. A failing username does not
+        abort the batch, its error is reported instead.
+        :param usernames: iterable of usernames, duplicates are fetched once
+        :param concurrency: the number of accounts fetched at the same time
+        :return: list of dicts that contain username, account and error, in input order
+        """
+        usernames = list(dict.fromkeys(usernames))
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [executor.submit(self.get_account, username)
+                       for username in usernames]
+
+        results = []
+        for username, future in zip(usernames, futures):
+            try:
+                results.append({'username': username,
+                                'account': future.result(),
+                                'error': None})
+            except Exception as e:
+                results.append({'username': username,
+                                'account': None,
+                                'error': e})
+
+        return results
+
     def get_stories(self, reel_ids=None):
         """
         :param reel_ids: reel ids
@@ -1139,16 +1454,15 @@ class Instagram:
         variables = {'precomposed_overlay': False, 'reel_ids': []}
 
         if reel_ids is None or len(reel_ids) == 0:
-            time.sleep(self.sleep_between_requests)
-            response = self.__req.get(endpoints.get_user_stories_link(),
-                                      headers=self.generate_headers(
-                                          self.user_session))
+            response = self.__get(endpoints.get_user_stories_link(),
+                                  headers=self.generate_headers(
+                                      self.user_session))
 
             if not Instagram.HTTP_OK == response.status_code:
                 raise InstagramException.default(response.text,
                                                  response.status_code)
 
-            json_response = response.json()
+            json_response = self.__json(response)
 
             try:
                 edges = json_response['data']['user']['feed_reels_tray'][
@@ -1162,16 +1476,15 @@ class Instagram:
         else:
             variables['reel_ids'] = reel_ids
 
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(endpoints.get_stories_link(variables),
-                                  headers=self.generate_headers(
-                                      self.user_session))
+        response = self.__get(endpoints.get_stories_link(variables),
+                              headers=self.generate_headers(
+                                  self.user_session))
 
         if not Instagram.HTTP_OK == response.status_code:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
         try:
             reels_media = json_response['data']['reels_media']
@@ -1184,7 +1497,7 @@ class Instagram:
         for user in reels_media:
             user_stories = UserStories()
 
-            user_stories.owner = Account(user['user'])
+            user_stories.owner = self.account_class(user['user'])
             for item in user['items']:
                 story = Story(item)
                 user_stories.stories.append(story)
@@ -1197,8 +1510,7 @@ class Instagram:
         :param username: user name
         :return: Account List
         """
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(
+        response = self.__get(
             endpoints.get_general_search_json_link(username),
             headers=self.generate_headers(self.user_session))
 
@@ -1210,7 +1522,7 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
         try:
             status = json_response['status']
@@ -1232,7 +1544,7 @@ class Instagram:
 
         accounts = []
         for json_account in json_response['users']:
-            accounts.append(Account(json_account['user']))
+            accounts.append(self.account_class(json_account['user']))
 
         return accounts
 
@@ -1244,15 +1556,14 @@ class Instagram:
         """
         url = endpoints.get_media_json_link(code)
 
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(url, headers=self.generate_headers(
+        response = self.__get(url, headers=self.generate_headers(
             self.user_session))
 
         if not Instagram.HTTP_OK == response.status_code:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
         try:
             tag_data = json_response['graphql']['shortcode_media'][
@@ -1295,8 +1606,7 @@ class Instagram:
             'user-agent': self.user_agent,
         }
 
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(endpoints.BASE_URL, headers=headers)
+        response = self.__get(endpoints.BASE_URL, headers=headers)
 
         if not response.status_code == Instagram.HTTP_OK:
             return False
@@ -1308,6 +1618,60 @@ class Instagram:
 
         return True
 
+    def __is_session_valid(self, session):
+        """
+        Trusts a session validated within session_freshness_sec without a request
+        :param session: session dict
+        :return: bool
+        """
+        if session is None or 'sessionid' not in session.keys():
+            return False
+
+        meta = self.__get_session_meta()
+        now = time.time()
+        if meta.get('sessionid') == session['sessionid'] \
+                and now - meta.get('validated_at', 0) < self.session_freshness_sec \
+                and (meta.get('expires_at') is None or meta['expires_at'] > now):
+            return True
+
+        if not self.is_logged_in(session):
+            return False
+
+        self.__save_session_meta(session, meta.get('expires_at')
+                                 if meta.get('sessionid') == session['sessionid'] else None)
+        return True
+
+    def __get_session_meta(self):
+        if not hasattr(self.instance_cache, 'get_session_meta'):
+            return {}
+        return self.instance_cache.get_session_meta()
+
+    def __save_session_meta(self, session, expires_at):
+        self.__update_session_meta(lambda meta: meta.update({
+            'sessionid': session.get('sessionid'),
+            'validated_at': time.time(),
+            'expires_at': expires_at,
+        }))
+
+    def __update_session_meta(self, update):
+        if hasattr(self.instance_cache, 'update_session_meta'):
+            self.instance_cache.update_session_meta(update)
+        elif hasattr(self.instance_cache, 'set_session_meta'):
+            # session managers without an atomic update
+            meta = self.instance_cache.get_session_meta()
+            update(meta)
+            self.instance_cache.set_session_meta(meta)
+
+    @staticmethod
+    def __cookie_expiry(cookie_jar):
+        """
+        :param cookie_jar: cookies of the login response
+        :return: timestamp the first of sessionid and csrftoken expires at, None if unknown
+        """
+        expiries = [cookie.expires for cookie in cookie_jar
+                    if cookie.name in ('sessionid', 'csrftoken') and cookie.expires]
+        return min(expiries) if expiries else None
+
     def login(self, force=False, two_step_verificator=None):
         """support_two_step_verification true works only in cli mode - just run login in cli mode - save cookie to file and use in any mode
         :param force: true will refresh the session
@@ -1320,43 +1684,38 @@ class Instagram:
         if two_step_verificator:
             two_step_verificator = ConsoleVerification()
 
-        session = json.loads(
-            Instagram.instance_cache.get_saved_cookies()) if Instagram.instance_cache.get_saved_cookies() != None else None
-
-        if force or not self.is_logged_in(session):
-            time.sleep(self.sleep_between_requests)
-            response = self.__req.get(endpoints.BASE_URL)
-            if not response.status_code == Instagram.HTTP_OK:
-                raise InstagramException.default(response.text,
-                                                 response.status_code)
-
-            match = re.findall(r'"csrf_token":"(.*?)"', response.text)
-
-            if len(match) > 0:
-                csrfToken = match[0]
-
-            cookies = response.cookies.get_dict()
+        saved_cookies = self.instance_cache.get_saved_cookies()
+        session = json.loads(saved_cookies) if saved_cookies is not None else None
+
+        if force or not self.__is_session_valid(session):
+            # the checkpoint flow sends back the cookies of BASE_URL, which a
+            # cached token comes without
+            csrf_entry = None
+            if two_step_verificator is None:
+                csrf_entry = self.__get_bootstrap('csrf_token')
+            if csrf_entry is not None:
+                csrfToken = csrf_entry['value']
+                cookies = {'csrftoken': csrfToken}
+            else:
+                csrfToken, cookies = self.__fetch_csrf_token()
 
             # cookies['mid'] doesnt work at the moment so fetch it with function
             mid = self.__get_mid()
 
-            headers = {
-                'cookie': f"ig_cb=1; csrftoken={csrfToken}; mid={mid};",
-                'referer': endpoints.BASE_URL + '/',
-                'x-csrftoken': csrfToken,
-                'X-CSRFToken': csrfToken,
-                'user-agent': self.user_agent,
-            }
-            payload = {'username': self.session_username,
-                       'enc_password': f"#PWD_INSTAGRAM_BROWSER:0:{int(time.time())}:{self.session_password}"}
-            response = self.__req.post(endpoints.LOGIN_URL, data=payload,
-                                       headers=headers)
+            response = self.__post_login(csrfToken, mid)
+
+            if response.status_code == Instagram.HTTP_FORBIDDEN:
+                # csrftoken is rotated, a cached one may have gone stale
+                self.__drop_bootstrap('csrf_token')
+                if csrf_entry is not None:
+                    csrfToken, cookies = self.__fetch_csrf_token()
+                    response = self.__post_login(csrfToken, mid)
 
             if not response.status_code == Instagram.HTTP_OK:
                 if (
                         response.status_code == Instagram.HTTP_BAD_REQUEST
                         and response.text is not None
-                        and response.json()['message'] == 'checkpoint_required'
+                        and self.__json(response)['message'] == 'checkpoint_required'
                         and two_step_verificator is not None):
                     response = self.__verify_two_step(response, cookies,
                                                       two_step_verificator)
@@ -1370,13 +1729,14 @@ class Instagram:
                     raise InstagramAuthException(
                         'Something went wrong. Please report issue.',
                         response.status_code)
-            elif not response.json()['authenticated']:
+            elif not self.__json(response)['authenticated']:
                 raise InstagramAuthException('User credentials are wrong.')
 
             cookies = response.cookies.get_dict()
 
             cookies['mid'] = mid
-            Instagram.instance_cache.set_saved_cookies(json.dumps(cookies, separators=(',', ':')))
+            self.instance_cache.set_saved_cookies(json.dumps(cookies, separators=(',', ':')))
+            self.__save_session_meta(cookies, Instagram.__cookie_expiry(response.cookies))
 
             self.user_session = cookies
 
@@ -1385,6 +1745,39 @@ class Instagram:
 
         return self.generate_headers(self.user_session)
 
+    def __fetch_csrf_token(self):
+        """
+        :return: csrf token and cookies of BASE_URL, the token is cached in the session store
+        """
+        response = self.__get(endpoints.BASE_URL)
+        if not response.status_code == Instagram.HTTP_OK:
+            raise InstagramException.default(response.text,
+                                             response.status_code)
+
+        cookies = response.cookies.get_dict()
+        match = re.findall(r'"csrf_token":"(.*?)"', response.text)
+
+        if len(match) > 0:
+            csrfToken = match[0]
+            self.__set_bootstrap('csrf_token', csrfToken)
+        else:
+            csrfToken = cookies.get('csrftoken')
+
+        return csrfToken, cookies
+
+    def __post_login(self, csrfToken, mid):
+        headers = {
+            'cookie': f"ig_cb=1; csrftoken={csrfToken}; mid={mid};",
+            'referer': endpoints.BASE_URL + '/',
+            'x-csrftoken': csrfToken,
+            'X-CSRFToken': csrfToken,
+            'user-agent': self.user_agent,
+        }
+        payload = {'username': self.session_username,
+                   'enc_password': f"#PWD_INSTAGRAM_BROWSER:0:{int(time.time())}:{self.session_password}"}
+        return self.__post(endpoints.LOGIN_URL, data=payload,
+                           headers=headers)
+
     def __verify_two_step(self, response, cookies, two_step_verificator):
         """
         :param response: Response object returned by Request
@@ -1406,10 +1799,9 @@ class Instagram:
             'user-agent': self.user_agent,
         }
 
-        url = endpoints.BASE_URL + response.json()['checkpoint_url']
+        url = endpoints.BASE_URL + self.__json(response)['checkpoint_url']
 
-        time.sleep(self.sleep_between_requests)
-        response = self.__req.get(url, headers=headers)
+        response = self.__get(url, headers=headers)
         data = Instagram.extract_shared_data_from_body(response.text)
 
         if data is not None:
@@ -1439,9 +1831,9 @@ class Instagram:
             if len(choices) > 0:
                 selected_choice = two_step_verificator.get_verification_type(
                     choices)
-                response = self.__req.post(url,
-                                           data={'choice': selected_choice},
-                                           headers=headers)
+                response = self.__post(url,
+                                       data={'choice': selected_choice},
+                                       headers=headers)
 
         if len(re.findall('"input_name":"security_code"', response.text)) <= 0:
             raise InstagramAuthException(
@@ -1456,7 +1848,7 @@ class Instagram:
             'verify': 'Verify Account',
             'security_code': security_code,
         }
-        response = self.__req.post(url, data=post_data, headers=headers)
+        response = self.__post(url, data=post_data, headers=headers)
         if not response.status_code == Instagram.HTTP_OK \
                 or 'Please check the code we sent you and try again' in response.text:
             raise InstagramAuthException(
@@ -1473,23 +1865,23 @@ class Instagram:
         :param replied_to_comment_id: the id of the comment you want to reply
         :return: Comment
         """
-        media_id = media_id.identifier if isinstance(media_id, Media) else media_id
+        media_id = media_id.identifier if isinstance(media_id, (Media, LeanMedia)) else media_id
 
-        replied_to_comment_id = replied_to_comment_id._data['id'] if isinstance(replied_to_comment_id, Comment) else replied_to_comment_id
+        replied_to_comment_id = replied_to_comment_id.identifier if isinstance(replied_to_comment_id, (Comment, LeanComment)) else replied_to_comment_id
 
         body = {'comment_text': text,
                 'replied_to_comment_id': replied_to_comment_id
                 if replied_to_comment_id is not None else ''}
 
-        response = self.__req.post(endpoints.get_add_comment_url(media_id),
-                                   data=body, headers=self.generate_headers(
+        response = self.__post(endpoints.get_add_comment_url(media_id),
+                               data=body, headers=self.generate_headers(
                 self.user_session))
 
         if not Instagram.HTTP_OK == response.status_code:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
         if json_response['status'] != 'ok':
             status = json_response['status']
@@ -1499,20 +1891,20 @@ class Instagram:
                 f' Please report issue.',
                 response.status_code)
 
-        return Comment(json_response)
+        return self.comment_class(json_response)
 
     def delete_comment(self, media_id, comment_id):
         """
         :param media_id: media id
         :param comment_id: the id of the comment you want to delete
         """
-        media_id = media_id.identifier if isinstance(media_id,
-                                                     Media) else media_id
+        media_id = media_id.identifier if isinstance(
+            media_id, (Media, LeanMedia)) else media_id
 
-        comment_id = comment_id._data['id'] if isinstance(comment_id,
-                                                          Comment) else comment_id
+        comment_id = comment_id.identifier if isinstance(
+            comment_id, (Comment, LeanComment)) else comment_id
 
-        response = self.__req.post(
+        response = self.__post(
             endpoints.get_delete_comment_url(media_id, comment_id),
             headers=self.generate_headers(self.user_session))
 
@@ -1520,7 +1912,7 @@ class Instagram:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
         if json_response['status'] != 'ok':
             status = json_response['status']
@@ -1534,17 +1926,17 @@ class Instagram:
         """
         :param media_id: media id
         """
-        media_id = media_id.identifier if isinstance(media_id,
-                                                     Media) else media_id
-        response = self.__req.post(endpoints.get_like_url(media_id),
-                                   headers=self.generate_headers(
-                                       self.user_session))
+        media_id = media_id.identifier if isinstance(
+            media_id, (Media, LeanMedia)) else media_id
+        response = self.__post(endpoints.get_like_url(media_id),
+                               headers=self.generate_headers(
+                                   self.user_session))
 
         if not Instagram.HTTP_OK == response.status_code:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
         if json_response['status'] != 'ok':
             status = json_response['status']
@@ -1558,17 +1950,17 @@ class Instagram:
         """
         :param media_id: media id
         """
-        media_id = media_id.identifier if isinstance(media_id,
-                                                     Media) else media_id
-        response = self.__req.post(endpoints.get_unlike_url(media_id),
-                                   headers=self.generate_headers(
-                                       self.user_session))
+        media_id = media_id.identifier if isinstance(
+            media_id, (Media, LeanMedia)) else media_id
+        response = self.__post(endpoints.get_unlike_url(media_id),
+                               headers=self.generate_headers(
+                                   self.user_session))
 
         if not Instagram.HTTP_OK == response.status_code:
             raise InstagramException.default(response.text,
                                              response.status_code)
 
-        json_response = response.json()
+        json_response = self.__json(response)
 
         if json_response['status'] != 'ok':
             status = json_response['status']
@@ -1587,9 +1979,9 @@ class Instagram:
             url = endpoints.get_follow_url(user_id)
 
             try:
-                follow = self.__req.post(url,
-                                         headers=self.generate_headers(
-                                             self.user_session))
+                follow = self.__post(url,
+                                     headers=self.generate_headers(
+                                         self.user_session))
                 if follow.status_code == Instagram.HTTP_OK:
                     return True
             except:
@@ -1604,7 +1996,7 @@ class Instagram:
         if self.is_logged_in(self.user_session):
             url_unfollow = endpoints.get_unfollow_url(user_id)
             try:
-                unfollow = self.__req.post(url_unfollow)
+                unfollow = self.__post(url_unfollow)
                 if unfollow.status_code == Instagram.HTTP_OK:
                     return unfollow
             except:
@@ -1619,9 +2011,9 @@ class Instagram:
         if self.is_logged_in(self.user_session):
             url_block = endpoints.get_block_url(user_id)
             try:
-                block = self.__req.post(url_block,
-                                        headers=self.generate_headers(
-                                            self.user_session))
+                block = self.__post(url_block,
+                                    headers=self.generate_headers(
+                                        self.user_session))
                 if block.status_code == Instagram.HTTP_OK:
                     return block
             except:
@@ -1636,9 +2028,9 @@ class Instagram:
         if self.is_logged_in(self.user_session):
             url_unblock = endpoints.get_unblock_url(user_id)
             try:
-                unblock = self.__req.post(url_unblock,
-                                          headers=self.generate_headers(
-                                              self.user_session))
+                unblock = self.__post(url_unblock,
+                                      headers=self.generate_headers(
+                                          self.user_session))
                 if unblock.status_code == Instagram.HTTP_OK:
                     return unblock
             except:
@@ -0,0 +1,91 @@
+import json
+import re
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+
+class JsonCodec:
+    """
+    A loads that accepts the raw response bytes and a dumps that produces
+    the compact JSON used in GraphQL urls and gis tokens. Every dumps
+    escapes non-ASCII text like json.dumps does, so the gis token is
+    hashed over the same string whichever backend is installed.
+    """
+
+    def __init__(self, name, loads, dumps):
+        """
+        :param name: name of the backend
+        :param loads: function of bytes or str to the decoded object
+        :param dumps: function of an object to a compact JSON str
+        """
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return f'JsonCodec({self.name!r})'
+
+
+def _stdlib_codec():
+    return JsonCodec('json', json.loads,
+                     lambda obj: json.dumps(obj, separators=(',', ':')))
+
+
+def _orjson_codec():
+    import orjson
+    return JsonCodec('orjson', orjson.loads,
+                     lambda obj: _escape_non_ascii(orjson.dumps(obj).decode('utf-8')))
+
+
+def _ujson_codec():
+    import ujson
+    return JsonCodec('ujson', ujson.loads,
+                     lambda obj: ujson.dumps(obj, ensure_ascii=True,
+                                             escape_forward_slashes=False))
+
+
+def _escape_non_ascii(text):
+    if text.isascii():
+        return text
+    return _NON_ASCII.sub(_escape_character, text)
+
+
+def _escape_character(match):
+    code = ord(match.group())
+    if code < 0x10000:
+        return f'\\u{code:04x}'
+    # outside the BMP json.dumps writes a surrogate pair
+    code -= 0x10000
+    return f'\\u{0xd800 | (code >> 10):04x}\\u{0xdc00 | (code & 0x3ff):04x}'
+
+
+# fastest first
+CODECS = {
+    'orjson': _orjson_codec,
+    'ujson': _ujson_codec,
+    'json': _stdlib_codec,
+}
+
+_codecs = {}
+
+
+def get_codec(name=None):
+    """
+    :param name: 'orjson', 'ujson' or 'json', None picks the fastest one that is installed
+    :return: JsonCodec
+    """
+    names = [name] if name is not None else list(CODECS)
+
+    for codec_name in names:
+        if codec_name not in CODECS:
+            raise ValueError(f'Unknown JSON codec {codec_name}')
+
+        if codec_name not in _codecs:
+            try:
+                _codecs[codec_name] = CODECS[codec_name]()
+            except ImportError:
+                if name is not None:
+                    raise
+                continue
+
+        return _codecs[codec_name]
@@ -0,0 +1,389 @@
+import collections
+import concurrent.futures
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+import requests
+
+from .exception.instagram_exception import InstagramException
+from .model.media import Media
+from .retry_policy import RetryPolicy
+
+
+class MediaDownloader:
+    """
+    Downloads the files of Media and Story objects from the CDN.
+
+    Files are streamed to folder/<media id><extension> in chunks by up to
+    `workers` threads at once. A download goes to a .part file first, which
+    is picked up again with an HTTP Range request if the connection drops
+    or the process is restarted. The sha256 of every file is recorded; a
+    file whose bytes were downloaded before under another name is replaced
+    by a hard link to the first copy. With a BlobStore, urls already in the
+    store are linked from it without a request and new files are added to
+    it, so the dedup holds across runs and folders.
+    """
+    HIGH = 'high'
+    STANDARD = 'standard'
+    LOW = 'low'
+    THUMBNAIL = 'thumbnail'
+
+    RESOLUTIONS = (HIGH, STANDARD, LOW, THUMBNAIL)
+
+    IMAGE_URLS = (
+        'image_high_resolution_url',
+        'image_standard_resolution_url',
+        'image_low_resolution_url',
+        'image_thumbnail_url',
+    )
+    # one name per resolution; Media has no high resolution video, so HIGH
+    # takes the standard one on purpose, and video_low_bandwith_url is
+    # spelled the way Media sets it
+    VIDEO_URLS = (
+        'video_standard_resolution_url',
+        'video_standard_resolution_url',
+        'video_low_resolution_url',
+        'video_low_bandwith_url',
+    )
+
+    DOWNLOADED = 'downloaded'
+    EXISTS = 'exists'
+    DUPLICATE = 'duplicate'
+    STORED = 'stored'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+
+    RETRY_ERRORS = (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.ChunkedEncodingError,
+        requests.exceptions.Timeout,
+    )
+
+    def __init__(self, folder, resolution=HIGH, videos=True, workers=4,
+                 chunk_size=65536, retry_policy=None, timeout=30.0, session=None,
+                 headers=None, progress=None, store=None):
+        """
+        :param folder: directory the files are written to, created if it does not exist
+        :param resolution: MediaDownloader.HIGH, STANDARD, LOW or THUMBNAIL, the nearest one is taken if a media lacks it
+        :param videos: False to download the cover image of videos instead of the video
+        :param workers: files downloaded at the same time
+        :param chunk_size: bytes read from the connection and written to disk at once
+        :param retry_policy: RetryPolicy for dropped connections and 429/5xx answers, each retry resumes where the last attempt stopped
+        :param timeout: seconds to wait for the CDN to connect or send data
+        :param session: requests.Session the files are fetched with
+        :param headers: dict of headers sent with every request
+        :param progress: function called with (result, stats) from the worker threads after each file
+        :param store: BlobStore files are looked up in and added to
+        """
+        if resolution not in MediaDownloader.RESOLUTIONS:
+            raise ValueError(f'Unknown resolution {resolution}')
+
+        self.folder = folder
+        self.resolution = resolution
+        self.videos = videos
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.timeout = timeout
+        self.session = session if session is not None else requests.session()
+        self.headers = headers if headers is not None else {}
+        self.progress = progress
+        self.store = store
+
+        self._checksums = {}
+        self._stats = {
+            'queued': 0,
+            'completed': 0,
+            MediaDownloader.DOWNLOADED: 0,
+            MediaDownloader.EXISTS: 0,
+            MediaDownloader.DUPLICATE: 0,
+            MediaDownloader.STORED: 0,
+            MediaDownloader.SKIPPED: 0,
+            MediaDownloader.FAILED: 0,
+            'resumed': 0,
+            'bytes': 0,
+        }
+        self._started_at = None
+        self._lock = threading.Lock()
+
+        os.makedirs(folder, exist_ok=True)
+
+    def get_url(self, media):
+        """
+        :param media: Media or Story
+        :return: url of the file at the chosen resolution, None if the media has none
+        """
+        urls = MediaDownloader.IMAGE_URLS
+        if self.videos and media.type == Media.TYPE_VIDEO:
+            urls = MediaDownloader.VIDEO_URLS
+
+        index = MediaDownloader.RESOLUTIONS.index(self.resolution)
+        # the chosen resolution, then smaller ones, then larger ones
+        for name in urls[index:] + urls[:index][::-1]:
+            url = getattr(media, name, None)
+            if url:
+                return url
+
+        if media.square_images:
+            return media.square_images[-1]
+        return None
+
+    def get_path(self, media, url):
+        """
+        :param media: Media or Story
+        :param url: url returned by get_url
+        :return: path the file is written to
+        """
+        extension = os.path.splitext(urllib.parse.urlparse(url).path)[1]
+        return os.path.join(self.folder, f'{media.identifier}{extension}')
+
+    def get_url_path(self, url):
+        """
+        :param url: CDN url
+        :return: path in folder named after the last segment of the url path
+        """
+        name = os.path.basename(urllib.parse.urlparse(url).path)
+        if not name:
+            raise ValueError(f'No file name in {url}, pass a path')
+        return os.path.join(self.folder, name)
+
+    def download(self, medias):
+        """
+        :param medias: iterable of Media or Story
+        :return: list of dict that contains media, url, path, status, bytes, sha256, error, in the order of medias
+        """
+        return list(self.iter_download(medias))
+
+    def iter_download(self, medias):
+        """
+        Downloads medias as they are read from the iterable, with at most
+        2 * workers of them queued or running at a time, so a generator such
+        as iter_medias_by_tag is not read ahead of the downloads
+        :param medias: iterable of Media or Story
+        :return: generator of dict that contains media, url, path, status, bytes, sha256, error, in the order of medias
+        """
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            futures = collections.deque()
+            try:
+                for media in medias:
+                    if len(futures) >= 2 * self.workers:
+                        yield futures.popleft().result()
+                    with self._lock:
+                        self._stats['queued'] += 1
+                    futures.append(executor.submit(self.download_media, media))
+                while futures:
+                    yield futures.popleft().result()
+            finally:
+                # closed early, drop what has not started
+                for future in futures:
+                    if future.cancel():
+                        with self._lock:
+                            self._stats['queued'] -= 1
+
+    def download_media(self, media):
+        """
+        Downloads a single media in the calling thread
+        :param media: Media or Story
+        :return: dict that contains media, url, path, status, bytes, sha256, error
+        """
+        url = self.get_url(media)
+        path = self.get_path(media, url) if url is not None else None
+        return self.download_url(url, path, media)
+
+    def download_url(self, url, path, media=None):
+        """
+        Downloads any CDN url, e.g. Account.get_profile_picture_url(), in the calling thread
+        :param url: url of the file, nothing is downloaded if None
+        :param path: path the file is written to, None for the file name of the url in folder
+        :param media: Media or Story the url belongs to, returned in the result
+        :return: dict that contains media, url, path, status, bytes, sha256, error
+        """
+        if url and path is None:
+            path = self.get_url_path(url)
+
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+
+        result = {
+            'media': media,
+            'url': url,
+            'path': path,
+            'status': MediaDownloader.SKIPPED,
+            'bytes': 0,
+            'sha256': None,
+            'error': None,
+        }
+
+        if url:
+            try:
+                self.__download(result)
+            except (InstagramException, OSError, sqlite3.Error) \
+                    + MediaDownloader.RETRY_ERRORS as e:
+                result['status'] = MediaDownloader.FAILED
+                result['error'] = e
+
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats[result['status']] += 1
+
+        if self.progress is not None:
+            self.progress(result, self.get_stats())
+        return result
+
+    def get_stats(self):
+        """
+        :return: dict that contains queued, completed, the count of every status, resumed, bytes, elapsed, throughput in bytes per second
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            started_at = self._started_at
+
+        stats['elapsed'] = time.monotonic() - started_at if started_at is not None else 0.0
+        stats['throughput'] = stats['bytes'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+        return stats
+
+    def __download(self, result):
+        url = result['url']
+        path = result['path']
+        if os.path.exists(path):
+            result['status'] = MediaDownloader.EXISTS
+            result['sha256'] = self.__hash_file(path)
+            if self.store is not None:
+                self.store.put_file(path, url, ref=path, sha256=result['sha256'])
+            else:
+                with self._lock:
+                    self._checksums.setdefault(result['sha256'], path)
+            return
+
+        if self.store is not None:
+            sha256 = self.store.lookup(url)
+            if sha256 is not None:
+                try:
+                    self.store.link(sha256, path, ref=path)
+                except FileNotFoundError:
+                    # evicted since the lookup, download it again
+                    pass
+                else:
+                    result['sha256'] = sha256
+                    result['status'] = MediaDownloader.STORED
+                    return
+
+        result['sha256'] = self.__fetch(result)
+        result['status'] = MediaDownloader.DOWNLOADED
+
+        if self.store is not None:
+            duplicate = os.path.exists(self.store.get_blob_path(result['sha256']))
+            self.store.put_file(path, url, ref=path, sha256=result['sha256'])
+            if duplicate:
+                self.store.link(result['sha256'], path)
+                result['status'] = MediaDownloader.DUPLICATE
+            return
+
+        with self._lock:
+            original = self._checksums.get(result['sha256'])
+            if original is None or not os.path.exists(original):
+                self._checksums[result['sha256']] = original = path
+        if original != path:
+            linked_path = f'{path}.{threading.get_ident()}.link'
+            os.link(original, linked_path)
+            os.replace(linked_path, path)
+            result['status'] = MediaDownloader.DUPLICATE
+
+    def __fetch(self, result):
+        part_path = result['path'] + '.part'
+        sha256 = hashlib.sha256()
+        offset = 0
+        if os.path.exists(part_path):
+            offset = self.__read_part(part_path, sha256)
+            with self._lock:
+                self._stats['resumed'] += 1
+
+        attempt = 1
+        while True:
+            headers = dict(self.headers)
+            if offset:
+                headers['Range'] = f'bytes={offset}-'
+
+            try:
+                with self.session.get(result['url'], headers=headers, stream=True,
+                                      timeout=self.timeout) as response:
+                    if response.status_code == 416 and offset:
+                        if MediaDownloader.__range_length(response) == offset:
+                            # the part file already holds the whole file
+                            break
+                        # the part file is not a piece of the file the CDN has now
+                        open(part_path, 'wb').close()
+                        offset = 0
+                        sha256 = hashlib.sha256()
+                        continue
+                    if response.status_code not in (200, 206):
+                        if not self.retry_policy.should_retry(attempt, response.status_code):
+                            raise InstagramException.default(response.text,
+                                                             response.status_code)
+                        time.sleep(self.retry_policy.get_delay(attempt))
+                        attempt += 1
+                        continue
+
+                    if offset and (response.status_code == 200 or
+                                   MediaDownloader.__range_start(response) != offset):
+                        # the range was ignored or not the one asked for, start over
+                        offset = 0
+                        sha256 = hashlib.sha256()
+                        if response.status_code != 200:
+                            continue
+
+                    with open(part_path, 'ab' if offset else 'wb') as f:
+                        for chunk in response.iter_content(self.chunk_size):
+                            f.write(chunk)
+                            sha256.update(chunk)
+                            offset += len(chunk)
+                            result['bytes'] += len(chunk)
+                            with self._lock:
+                                self._stats['bytes'] += len(chunk)
+                break
+            except MediaDownloader.RETRY_ERRORS:
+                if not self.retry_policy.should_retry(attempt):
+                    raise
+                time.sleep(self.retry_policy.get_delay(attempt))
+                attempt += 1
+
+        os.replace(part_path, result['path'])
+        return sha256.hexdigest()
+
+    @staticmethod
+    def __range_start(response):
+        """
+        :return: first byte of a 206 response from its Content-Range header, None if it has none
+        """
+        try:
+            return int(response.headers['Content-Range'].split()[1].split('-')[0])
+        except (KeyError, IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def __range_length(response):
+        """
+        :return: size of the whole file from the Content-Range header of a 416 response, None if it has none
+        """
+        try:
+            return int(response.headers['Content-Range'].split('/')[1])
+        except (KeyError, IndexError, ValueError):
+            return None
+
+    def __hash_file(self, path):
+        sha256 = hashlib.sha256()
+        self.__read_part(path, sha256)
+        return sha256.hexdigest()
+
+    def __read_part(self, path, sha256):
+        size = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                sha256.update(chunk)
+                size += len(chunk)
+        return size
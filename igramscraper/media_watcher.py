@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+
+
+class MediaWatcher:
+    """
+    Polls hashtag and location feeds for media posted since the last poll.
+
+    Every target keeps a high-water mark, the (created_time, id) of the
+    newest media seen. A poll walks the feed page by page from the top and
+    stops at the first media at or below the mark, so each poll costs as
+    many pages as there are new posts. A poll that runs out of pages
+    before it reaches the mark keeps the mark and the cursor it stopped
+    at; the next poll carries on from that cursor down to the mark, and
+    only then is the mark moved to the newest media of both, so a burst of
+    posts larger than max_pages is read over several polls instead of
+    being skipped. New media are handed, newest first, to the callback and
+    the queue. With a path the marks are saved after every poll and
+    survive restarts.
+    """
+    TAG = 'tag'
+    LOCATION = 'location'
+
+    def __init__(self, instagram, callback=None, queue=None, path=None,
+                 initial_pages=1, max_pages=20):
+        """
+        :param instagram: Instagram the feeds are fetched with
+        :param callback: function called with (kind, target, medias) when a poll finds new media
+        :param queue: queue.Queue every new Media is put into
+        :param path: JSON file the high-water marks are kept in
+        :param initial_pages: pages returned by the first poll of a target without a mark
+        :param max_pages: pages a single poll reads at most
+        """
+        self.instagram = instagram
+        self.callback = callback
+        self.queue = queue
+        self.path = path
+        self.initial_pages = initial_pages
+        self.max_pages = max_pages
+
+        self.targets = []
+        self._marks = {}
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as f:
+                self._marks = json.load(f)
+
+    def watch_tag(self, tag):
+        """
+        :param tag: tag string
+        """
+        self.__watch(MediaWatcher.TAG, tag)
+
+    def watch_location(self, facebook_location_id):
+        """
+        :param facebook_location_id: facebook location id
+        """
+        self.__watch(MediaWatcher.LOCATION, str(facebook_location_id))
+
+    def __watch(self, kind, target):
+        with self._lock:
+            if (kind, target) not in self.targets:
+                self.targets.append((kind, target))
+
+    def get_mark(self, kind, target):
+        """
+        :param kind: MediaWatcher.TAG or MediaWatcher.LOCATION
+        :param target: tag or location id
+        :return: dict that contains created_time and id of the newest media seen, and resume while a poll has
+        left a gap above it, a dict that contains the next_page to carry on from and the created_time and id
+        the mark moves to once the gap is read; None before the first poll
+        """
+        with self._lock:
+            return self._marks.get(MediaWatcher.__key(kind, target))
+
+    def poll(self, kind, target):
+        """
+        :param kind: MediaWatcher.TAG or MediaWatcher.LOCATION
+        :param target: tag or location id
+        :return: list of the new Media, newest first
+        """
+        medias = []
+        for page_medias in self.iter_poll(kind, target):
+            medias.extend(page_medias)
+        return medias
+
+    def iter_poll(self, kind, target):
+        """
+        Polls a target one page request at a time. The mark is moved and the
+        new medias are handed on when the generator is exhausted
+        :param kind: MediaWatcher.TAG or MediaWatcher.LOCATION
+        :param target: tag or location id
+        :return: generator of list of the new Media of each page
+        """
+        mark = self.get_mark(kind, target)
+        mark_position = (mark['created_time'], mark['id']) if mark is not None else None
+        max_pages = self.max_pages if mark is not None else self.initial_pages
+
+        resume = mark.get('resume') if mark is not None else None
+        if resume is not None:
+            # the last poll stopped short of the mark, read the gap first
+            start = resume['next_page']
+            newest = (resume['created_time'], resume['id'])
+        else:
+            start = ''
+            newest = mark_position
+
+        if kind == MediaWatcher.TAG:
+            pages = self.instagram.iter_medias_by_tag(target, start)
+        elif kind == MediaWatcher.LOCATION:
+            pages = self.instagram.iter_medias_by_location_id(target, start)
+        else:
+            raise ValueError(f'Unknown kind {kind}')
+
+        medias = []
+        reached_mark = False
+        next_page = None
+        for page_number, page in enumerate(pages, 1):
+            page_medias = []
+            for media in page['medias']:
+                position = MediaWatcher.__position(media)
+                if mark_position is not None and position <= mark_position:
+                    reached_mark = True
+                    break
+                page_medias.append(media)
+                if newest is None or position > newest:
+                    newest = position
+
+            medias.extend(page_medias)
+            yield page_medias
+
+            if reached_mark:
+                break
+            if page_number >= max_pages:
+                if page['has_next_page']:
+                    next_page = page['next_page']
+                break
+
+        if mark is not None and next_page is not None:
+            # keep the mark until the medias between it and this page are read
+            self.__set_mark(kind, target, mark_position, {
+                'next_page': next_page,
+                'created_time': newest[0],
+                'id': newest[1],
+            })
+        elif newest != mark_position or resume is not None:
+            self.__set_mark(kind, target, newest)
+
+        if medias:
+            if self.callback is not None:
+                self.callback(kind, target, medias)
+            if self.queue is not None:
+                for media in medias:
+                    self.queue.put(media)
+
+    def poll_all(self):
+        """
+        :return: dict of (kind, target) to list of new Media
+        """
+        with self._lock:
+            targets = list(self.targets)
+        return {(kind, target): self.poll(kind, target) for kind, target in targets}
+
+    def run(self, interval=300.0, stop_event=None):
+        """
+        Polls every target, then waits interval seconds, until stop_event is set
+        :param interval: seconds between two rounds
+        :param stop_event: threading.Event that ends the loop
+        """
+        stop_event = stop_event if stop_event is not None else threading.Event()
+        while not stop_event.is_set():
+            started_at = time.monotonic()
+            self.poll_all()
+            stop_event.wait(max(0.0, interval - (time.monotonic() - started_at)))
+
+    def __set_mark(self, kind, target, position, resume=None):
+        with self._lock:
+            mark = {
+                'created_time': position[0],
+                'id': position[1],
+            }
+            if resume is not None:
+                mark['resume'] = resume
+            self._marks[MediaWatcher.__key(kind, target)] = mark
+            if self.path is not None:
+                marks = json.dumps(self._marks)
+                temp_path = f'{self.path}.{os.getpid()}.tmp'
+                with open(temp_path, 'w') as f:
+                    f.write(marks)
+                os.replace(temp_path, self.path)
+
+    @staticmethod
+    def __key(kind, target):
+        return f'{kind}:{target}'
+
+    @staticmethod
+    def __position(media):
+        try:
+            identifier = int(media.identifier)
+        except (TypeError, ValueError):
+            identifier = 0
+        return int(media.created_time or 0), identifier
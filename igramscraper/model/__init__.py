@@ -7,5 +7,6 @@ from igramscraper.model.comment import Comment
 from igramscraper.model.carousel_media import CarouselMedia
 from igramscraper.model.initializer_model import InitializerModel
 from igramscraper.model.user_stories import UserStories
+from igramscraper.model.lean import LeanAccount, LeanMedia, LeanComment
 
-__all__ = ["Account", "Media", "Tag", "Location", "Story", "Comment", "CarouselMedia", "InitializerModel", "UserStories"]
\ No newline at end of file
+__all__ = ["Account", "Media", "Tag", "Location", "Story", "Comment", "CarouselMedia", "InitializerModel", "UserStories", "LeanAccount", "LeanMedia", "LeanComment"]
\ No newline at end of file
@@ -4,6 +4,39 @@ import textwrap
 
 
 class Account(InitializerModel):
+    _standard_properties = (
+        'username',
+        'full_name',
+        'profile_pic_url',
+        'profile_pic_url_hd',
+        'biography',
+        'external_url',
+        'is_private',
+        'is_verified',
+        'blocked_by_viewer',
+        'country_block',
+        'followed_by_viewer',
+        'follows_viewer',
+        'has_channel',
+        'has_blocked_viewer',
+        'highlight_reel_count',
+        'has_requested_viewer',
+        'is_business_account',
+        'is_joined_recently',
+        'business_category_name',
+        'business_email',
+        'business_phone_number',
+        'business_address_json',
+        'requested_by_viewer',
+        'connected_fb_page',
+    )
+
+    _property_initializers = {
+        'id': '_init_identifier',
+        'edge_follow': '_init_follows_count',
+        'edge_followed_by': '_init_followed_by_count',
+        'edge_owner_to_timeline_media': '_init_timeline_media',
+    }
 
     def __init__(self, props=None):
         self.identifier = None
@@ -75,50 +108,16 @@ class Account(InitializerModel):
         except AttributeError:
             raise AttributeError
 
-    def _init_properties_custom(self, value, prop, array):
-        
-        if prop == 'id':
-            self.identifier = value
-
-        standart_properties = [
-            'username',
-            'full_name',
-            'profile_pic_url',
-            'profile_pic_url_hd',
-            'biography',
-            'external_url',
-            'is_private',
-            'is_verified',
-            'blocked_by_viewer',
-            'country_block',
-            'followed_by_viewer',
-            'follows_viewer',
-            'has_channel',
-            'has_blocked_viewer', 
-            'highlight_reel_count',
-            'has_requested_viewer',
-            'is_business_account',
-            'is_joined_recently',
-            'business_category_name',
-            'business_email',
-            'business_phone_number',
-            'business_address_json',
-            'requested_by_viewer',
-            'connected_fb_page'
-        ]
-        if prop in standart_properties:
-            self.__setattr__(prop, value)   
-        
-        if prop == 'edge_follow':
-            self.follows_count = array[prop]['count'] \
-                if array[prop]['count'] is not None  else 0
-
-        if prop == 'edge_followed_by':
-            self.followed_by_count = array[prop]['count'] \
-                if array[prop]['count'] is not None else 0
-
-        if prop == 'edge_owner_to_timeline_media':
-            self._init_media(array[prop])
+    def _init_follows_count(self, value, prop, array):
+        self.follows_count = array[prop]['count'] \
+            if array[prop]['count'] is not None else 0
+
+    def _init_followed_by_count(self, value, prop, array):
+        self.followed_by_count = array[prop]['count'] \
+            if array[prop]['count'] is not None else 0
+
+    def _init_timeline_media(self, value, prop, array):
+        self._init_media(array[prop])
 
     def _init_media(self, array):
         self.media_count = array['count'] if 'count' in array.keys() else 0 
@@ -132,6 +131,7 @@ class Account(InitializerModel):
             return
 
         for media_array in nodes:
-            media = Media(media_array['node'])
-            if isinstance(media, Media):
-                self.add_media(media)
+            self.add_media(self._new_media(media_array['node']))
+
+    def _new_media(self, props):
+        return Media(props)
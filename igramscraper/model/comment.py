@@ -2,10 +2,15 @@ from .initializer_model import InitializerModel
 
 
 class Comment(InitializerModel):
-    """
-     * @param $value
-     * @param $prop
-     """
+    _standard_properties = (
+        'created_at',
+        'text',
+    )
+
+    _property_initializers = {
+        'id': '_init_identifier',
+        'owner': '_init_owner',
+    }
 
     def __init__(self, props=None):
         self.identifier = None
@@ -16,19 +21,25 @@ class Comment(InitializerModel):
 
         super(Comment, self).__init__(props)
 
-    def _init_properties_custom(self, value, prop, array):
-
-        if prop == 'id':
-           self.identifier = value
-
-        standart_properties = [
-            'created_at',
-            'text',
-        ]
-
-        if prop in standart_properties:
-            self.__setattr__(prop, value)
-
-        if prop == 'owner':
-            from .account import Account
-            self.owner = Account(value)
+    @property
+    def owner(self):
+        """
+        Account built from the raw owner dict on first access
+        """
+        if self._owner_data is not None:
+            self._owner = self._new_account(self._owner_data)
+            self._owner_data = None
+        return self._owner
+
+    @owner.setter
+    def owner(self, owner):
+        self._owner = owner
+        self._owner_data = None
+
+    def _init_owner(self, value, prop, array):
+        # a null owner still gives an empty Account, as it always did
+        self._owner_data = value if value is not None else {}
+
+    def _new_account(self, props):
+        from .account import Account
+        return Account(props)
@@ -1,7 +1,46 @@
 import time
 
 
+def _standard_setter(prop):
+    def setter(self, value, prop, array):
+        setattr(self, prop, value)
+    return setter
+
+
 class InitializerModel:
+    """
+    Subclasses describe how JSON keys are parsed with _standard_properties,
+    keys that are copied to the attribute of the same name, and
+    _property_initializers, a dict of key to the name of the method that
+    parses it or None to skip a key a parent class parses. Both are merged
+    along the MRO into the _property_setters dispatch table once, when the
+    class is created.
+
+    Subclasses that override _init_properties_custom are initialized by
+    calling it for every key instead; the table is still built, so an
+    override can hand keys on with super()._init_properties_custom.
+    """
+    _standard_properties = ()
+    _property_initializers = {}
+    _property_setters = {}
+    _has_custom_init = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        cls._has_custom_init = cls._init_properties_custom \
+            is not InitializerModel._init_properties_custom
+
+        setters = {}
+        for klass in reversed(cls.__mro__):
+            for prop in vars(klass).get('_standard_properties', ()):
+                setters[prop] = _standard_setter(prop)
+            for prop, name in vars(klass).get('_property_initializers', {}).items():
+                if name is None:
+                    setters.pop(prop, None)
+                else:
+                    setters[prop] = getattr(cls, name)
+        cls._property_setters = setters
 
     def __init__(self, props=None):
 
@@ -26,17 +65,43 @@ class InitializerModel:
         :param props: props array
         :return: None
         """
-        for key in props.keys():
-            try:
-                self._init_properties_custom(props[key], key, props)
-            except AttributeError:
-                # if function does not exist fill help data array
-                self._data[key] = props[key]
+        if self._has_custom_init:
+            for key in props.keys():
+                try:
+                    self._init_properties_custom(props[key], key, props)
+                except AttributeError:
+                    # if function does not exist fill help data array
+                    self._data[key] = props[key]
+        else:
+            setters = self._property_setters
+            for key, value in props.items():
+                setter = setters.get(key)
+                if setter is None:
+                    continue
+                try:
+                    setter(self, value, key, props)
+                except AttributeError:
+                    self._data[key] = value
 
         self._is_new = False
         self._is_loaded = True
         self._is_load_empty = False
 
+    def _init_properties_custom(self, value, prop, array):
+        """
+        parses a single key through _property_setters
+        :param value: value of the key
+        :param prop: JSON key
+        :param array: the whole props dict
+        :return: None
+        """
+        setter = self._property_setters.get(prop)
+        if setter is not None:
+            setter(self, value, prop, array)
+
+    def _init_identifier(self, value, prop, array):
+        self.identifier = value
+
     # '''
     #  * @return $this
     #  '''
@@ -0,0 +1,122 @@
+from .account import Account
+from .comment import Comment
+from .media import Media
+
+# per-instance state of InitializerModel that lean models do without
+BOOKKEEPING_ATTRIBUTES = (
+    '_is_new',
+    '_is_loaded',
+    '_is_load_empty',
+    '_is_fake',
+    '_modified',
+    '_data',
+    'modified',
+)
+
+
+def _lean_fields(model_class, extra=()):
+    """
+    :param model_class: InitializerModel subclass the lean model mirrors
+    :param extra: attributes the property setters set that __init__ does not
+    :return: tuple of (name, default) pairs
+    """
+    fields = [(name, value) for name, value in vars(model_class()).items()
+              if name not in BOOKKEEPING_ATTRIBUTES]
+    fields.extend((name, None) for name in extra)
+    return tuple(fields)
+
+
+class LeanModel:
+    """
+    Parses the same JSON as its InitializerModel counterpart, through the
+    same _property_setters, into __slots__.
+
+    Instances have no __dict__, keys without an attribute are dropped instead
+    of being kept in _data and there is no load bookkeeping, which makes
+    large follower and media lists several times smaller in memory.
+    """
+    __slots__ = ()
+
+    _fields = ()
+    _property_setters = {}
+
+    def __init__(self, props=None):
+        for name, value in self._fields:
+            setattr(self, name, [] if isinstance(value, list) else value)
+
+        if props:
+            setters = self._property_setters
+            for key, value in props.items():
+                setter = setters.get(key)
+                if setter is None:
+                    continue
+                try:
+                    setter(self, value, key, props)
+                except AttributeError:
+                    pass
+
+
+_ACCOUNT_FIELDS = _lean_fields(Account)
+_MEDIA_FIELDS = _lean_fields(Media, extra=(
+    'thumbnail_src',
+    'video_view_count',
+    'caption_is_edited',
+    'video_low_bandwith_url',
+))
+_COMMENT_FIELDS = _lean_fields(Comment)
+
+
+class LeanAccount(LeanModel):
+    __slots__ = tuple(name for name, _ in _ACCOUNT_FIELDS)
+
+    _fields = _ACCOUNT_FIELDS
+
+    get_profile_picture_url = Account.get_profile_picture_url
+    add_media = Account.add_media
+    _property_setters = Account._property_setters
+    _init_media = Account._init_media
+    __str__ = Account.__str__
+
+    def _new_media(self, props):
+        return LeanMedia(props)
+
+
+class LeanMedia(LeanModel):
+    __slots__ = tuple(name for name, _ in _MEDIA_FIELDS)
+
+    TYPE_IMAGE = Media.TYPE_IMAGE
+    TYPE_VIDEO = Media.TYPE_VIDEO
+    TYPE_SIDECAR = Media.TYPE_SIDECAR
+    TYPE_CAROUSEL = Media.TYPE_CAROUSEL
+
+    _fields = _MEDIA_FIELDS
+
+    owner = Media.owner
+    owner_id = Media.owner_id
+    comments = Media.comments
+
+    get_id_from_code = staticmethod(Media.get_id_from_code)
+    get_link_from_id = staticmethod(Media.get_link_from_id)
+    get_code_from_id = staticmethod(Media.get_code_from_id)
+    set_carousel_media = staticmethod(Media.set_carousel_media)
+    _property_setters = Media._property_setters
+    __str__ = Media.__str__
+
+    def _new_account(self, props):
+        return LeanAccount(props)
+
+    def _new_comment(self, props):
+        return LeanComment(props)
+
+
+class LeanComment(LeanModel):
+    __slots__ = tuple(name for name, _ in _COMMENT_FIELDS)
+
+    _fields = _COMMENT_FIELDS
+
+    _property_setters = Comment._property_setters
+
+    owner = Comment.owner
+
+    def _new_account(self, props):
+        return LeanAccount(props)
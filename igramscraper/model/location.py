@@ -3,6 +3,18 @@ import textwrap
 
 
 class Location(InitializerModel):
+    _standard_properties = (
+        'has_public_page',
+        'name',
+        'slug',
+        'lat',
+        'lng',
+        'modified',
+    )
+
+    _property_initializers = {
+        'id': '_init_identifier',
+    }
 
     def __init__(self, props=None):
         self.identifier = None
@@ -26,20 +38,3 @@ class Location(InitializerModel):
         """
 
         return textwrap.dedent(string)
-
-    def _init_properties_custom(self, value, prop, arr):
-
-        if prop == 'id':
-            self.identifier = value
-
-        standart_properties = [
-            'has_public_page',
-            'name',
-            'slug',
-            'lat',
-            'lng',
-            'modified',
-        ]
-
-        if prop in standart_properties:
-            self.__setattr__(prop, value)
@@ -13,6 +13,45 @@ class Media(InitializerModel):
     TYPE_SIDECAR = 'sidecar'
     TYPE_CAROUSEL = 'carousel'
 
+    _standard_properties = (
+        'type',
+        'link',
+        'thumbnail_src',
+        'caption',
+        'video_view_count',
+        'caption_is_edited',
+        'is_ad',
+    )
+
+    _property_initializers = {
+        'id': '_init_identifier',
+        'created_time': '_init_created_time',
+        'taken_at_timestamp': '_init_created_time',
+        'date': '_init_created_time',
+        'code': '_init_short_code',
+        'shortcode': '_init_short_code',
+        'comments': '_init_comments_count',
+        'likes': '_init_likes_count',
+        'edge_media_preview_like': '_init_likes_count',
+        'edge_liked_by': '_init_likes_count',
+        'display_resources': '_init_display_resources',
+        'display_src': '_init_display_url',
+        'display_url': '_init_display_url',
+        'thumbnail_resources': '_init_thumbnail_resources',
+        'carousel_media': '_init_carousel_media',
+        'video_views': '_init_video_views',
+        'videos': '_init_videos',
+        'video_resources': '_init_video_resources',
+        'location': '_init_location',
+        'user': '_init_owner',
+        'owner': '_init_owner',
+        'is_video': '_init_is_video',
+        'video_url': '_init_video_url',
+        'edge_media_to_comment': '_init_comments',
+        'edge_media_to_caption': '_init_caption',
+        '__typename': '_init_typename',
+    }
+
     def __init__(self, props=None):
         self.identifier = None
         self.short_code = None
@@ -45,6 +84,50 @@ class Media(InitializerModel):
 
         super(Media, self).__init__(props)
 
+    @property
+    def owner(self):
+        """
+        Account built from the raw owner dict on first access
+        """
+        if self._owner_data is not None:
+            self._owner = self._new_account(self._owner_data)
+            self._owner_data = None
+        return self._owner
+
+    @owner.setter
+    def owner(self, owner):
+        self._owner = owner
+        self._owner_data = None
+
+    @property
+    def owner_id(self):
+        """
+        id of the owner, read without building the Account
+        """
+        if self._owner_data is not None:
+            return self._owner_data.get('id')
+        return self._owner.identifier if self._owner is not None else None
+
+    @property
+    def comments(self):
+        """
+        list of Comment built from the raw comment edges on first access
+        """
+        if self._comment_edges is not None:
+            edges = self._comment_edges
+            self._comment_edges = None
+            try:
+                for comment_data in edges:
+                    self._comments.append(self._new_comment(comment_data['node']))
+            except KeyError:
+                pass
+        return self._comments
+
+    @comments.setter
+    def comments(self, comments):
+        self._comments = comments
+        self._comment_edges = None
+
     @staticmethod
     def get_id_from_code(code):
         alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
@@ -92,160 +175,139 @@ class Media(InitializerModel):
 
         return textwrap.dedent(string)
 
-    def _init_properties_custom(self, value, prop, arr):
-
-        if prop == 'id':
-            self.identifier = value
-
-        standart_properties = [
-            'type',
-            'link',
-            'thumbnail_src',
-            'caption',
-            'video_view_count',
-            'caption_is_edited',
-            'is_ad'
-        ]
-
-        if prop in standart_properties:
-            self.__setattr__(prop, value)
-
-        elif prop == 'created_time' or prop == 'taken_at_timestamp' or prop == 'date':
-            self.created_time = int(value)
-
-        elif prop == 'code':
-            self.short_code = value
-            self.link = endpoints.get_media_page_link(self.short_code)
-
-        elif prop == 'comments':
-            self.comments_count = arr[prop]['count']
-        elif prop == 'likes':
-            self.likes_count = arr[prop]['count']
-
-        elif prop == 'display_resources':
-            medias_url = []
-            for media in value:
-                medias_url.append(media['src'])
-
-                if media['config_width'] == 640:
-                    self.image_thumbnail_url = media['src']
-                elif media['config_width'] == 750:
-                    self.image_low_resolution_url = media['src']
-                elif media['config_width'] == 1080:
-                    self.image_standard_resolution_url = media['src']
-
-        elif prop == 'display_src' or prop == 'display_url':
-            self.image_high_resolution_url = value
-            if self.type is None:
-                self.type = Media.TYPE_IMAGE
-
-        elif prop == 'thumbnail_resources':
-            square_images_url = []
-            for square_image in value:
-                square_images_url.append(square_image['src'])
-            self.square_images = square_images_url
-
-        elif prop == 'carousel_media':
-            self.type = Media.TYPE_CAROUSEL
-            self.carousel_media = []
-            for carousel_array in arr["carousel_media"]:
-                self.set_carousel_media(arr, carousel_array)
-
-        elif prop == 'video_views':
-            self.video_views = value
-            self.type = Media.TYPE_VIDEO
+    def _init_created_time(self, value, prop, arr):
+        self.created_time = int(value)
 
-        elif prop == 'videos':
-            self.video_low_resolution_url = arr[prop]['low_resolution']['url']
-            self.video_standard_resolution_url = \
-            arr[prop]['standard_resolution']['url']
-            self.video_low_bandwith_url = arr[prop]['low_bandwidth']['url']
-
-        elif prop == 'video_resources':
-            for video in value:
-                if video['profile'] == 'MAIN':
-                    self.video_standard_resolution_url = video['src']
-                elif video['profile'] == 'BASELINE':
-                    self.video_low_resolution_url = video['src']
-                    self.video_low_bandwith_url = video['src']
-
-        elif prop == 'location' and value is not None:
-            self.location_id = arr[prop]['id']
-            self.location_name = arr[prop]['name']
-            self.location_slug = arr[prop]['slug']
-
-        elif prop == 'user' or prop == 'owner':
-            from .account import Account
-            self.owner = Account(arr[prop])
-
-        elif prop == 'is_video':
-            if bool(value):
-                self.type = Media.TYPE_VIDEO
-
-        elif prop == 'video_url':
-            self.video_standard_resolution_url = value
-
-        elif prop == 'shortcode':
-            self.short_code = value
-            self.link = endpoints.get_media_page_link(self.short_code)
-
-        elif prop == 'edge_media_to_comment':
-            try:
-                self.comments_count = int(arr[prop]['count'])
-            except KeyError:
-                pass
-            try:
-                edges = arr[prop]['edges']
+    def _init_short_code(self, value, prop, arr):
+        self.short_code = value
+        self.link = endpoints.get_media_page_link(self.short_code)
 
-                for comment_data in edges:
-                    self.comments.append(Comment(comment_data['node']))
-            except KeyError:
-                pass
-            try:
-                self.has_more_comments = bool(
-                    arr[prop]['page_info']['has_next_page'])
-            except KeyError:
-                pass
-            try:
-                self.comments_next_page = str(
-                    arr[prop]['page_info']['end_cursor'])
-            except KeyError:
-                pass
+    def _init_comments_count(self, value, prop, arr):
+        self.comments_count = arr[prop]['count']
 
-        elif prop == 'edge_media_preview_like':
-            self.likes_count = arr[prop]['count']
-        elif prop == 'edge_liked_by':
-            self.likes_count = arr[prop]['count']
+    def _init_likes_count(self, value, prop, arr):
+        self.likes_count = arr[prop]['count']
 
-        elif prop == 'edge_media_to_caption':
-            try:
-                self.caption = arr[prop]['edges'][0]['node']['text']
-            except (KeyError, IndexError):
-                pass
+    def _init_display_resources(self, value, prop, arr):
+        medias_url = []
+        for media in value:
+            medias_url.append(media['src'])
+
+            if media['config_width'] == 640:
+                self.image_thumbnail_url = media['src']
+            elif media['config_width'] == 750:
+                self.image_low_resolution_url = media['src']
+            elif media['config_width'] == 1080:
+                self.image_standard_resolution_url = media['src']
+
+    def _init_display_url(self, value, prop, arr):
+        self.image_high_resolution_url = value
+        if self.type is None:
+            self.type = Media.TYPE_IMAGE
+
+    def _init_thumbnail_resources(self, value, prop, arr):
+        square_images_url = []
+        for square_image in value:
+            square_images_url.append(square_image['src'])
+        self.square_images = square_images_url
+
+    def _init_carousel_media(self, value, prop, arr):
+        self.type = Media.TYPE_CAROUSEL
+        self.carousel_media = []
+        for carousel_array in arr["carousel_media"]:
+            self.set_carousel_media(arr, carousel_array)
+
+    def _init_video_views(self, value, prop, arr):
+        self.video_views = value
+        self.type = Media.TYPE_VIDEO
+
+    def _init_videos(self, value, prop, arr):
+        self.video_low_resolution_url = arr[prop]['low_resolution']['url']
+        self.video_standard_resolution_url = \
+        arr[prop]['standard_resolution']['url']
+        self.video_low_bandwith_url = arr[prop]['low_bandwidth']['url']
+
+    def _init_video_resources(self, value, prop, arr):
+        for video in value:
+            if video['profile'] == 'MAIN':
+                self.video_standard_resolution_url = video['src']
+            elif video['profile'] == 'BASELINE':
+                self.video_low_resolution_url = video['src']
+                self.video_low_bandwith_url = video['src']
+
+    def _init_location(self, value, prop, arr):
+        if value is None:
+            return
+        self.location_id = arr[prop]['id']
+        self.location_name = arr[prop]['name']
+        self.location_slug = arr[prop]['slug']
+
+    def _init_owner(self, value, prop, arr):
+        # a null owner still gives an empty Account, as it always did
+        self._owner_data = arr[prop] if arr[prop] is not None else {}
+
+    def _init_is_video(self, value, prop, arr):
+        if bool(value):
+            self.type = Media.TYPE_VIDEO
 
-        elif prop == 'edge_sidecar_to_children':
+    def _init_video_url(self, value, prop, arr):
+        self.video_standard_resolution_url = value
+
+    def _init_comments(self, value, prop, arr):
+        try:
+            self.comments_count = int(arr[prop]['count'])
+        except KeyError:
+            pass
+        try:
+            self._comment_edges = arr[prop]['edges']
+        except KeyError:
+            pass
+        try:
+            self.has_more_comments = bool(
+                arr[prop]['page_info']['has_next_page'])
+        except KeyError:
+            pass
+        try:
+            self.comments_next_page = str(
+                arr[prop]['page_info']['end_cursor'])
+        except KeyError:
+            pass
+
+    def _init_caption(self, value, prop, arr):
+        try:
+            self.caption = arr[prop]['edges'][0]['node']['text']
+        except (KeyError, IndexError):
             pass
-            # #TODO implement
-            # if (!is_array($arr[$prop]['edges'])) {
-            #     break;
-            # }
-            # foreach ($arr[$prop]['edges'] as $edge) {
-            #     if (!isset($edge['node'])) {
-            #         continue;
-            #     }
-
-            #     $this->sidecarMedias[] = static::create($edge['node']);
-            # }
-        elif prop == '__typename':
-            if value == 'GraphImage':
-                self.type = Media.TYPE_IMAGE
-            elif value == 'GraphVideo':
-                self.type = Media.TYPE_VIDEO
-            elif value == 'GraphSidecar':
-                self.type = Media.TYPE_SIDECAR
-
-        # if self.ownerId and self.owner != None:
-        #     self.ownerId = self.getOwner().getId()
+
+    # TODO implement edge_sidecar_to_children
+    # if (!is_array($arr[$prop]['edges'])) {
+    #     break;
+    # }
+    # foreach ($arr[$prop]['edges'] as $edge) {
+    #     if (!isset($edge['node'])) {
+    #         continue;
+    #     }
+
+    #     $this->sidecarMedias[] = static::create($edge['node']);
+    # }
+
+    def _init_typename(self, value, prop, arr):
+        if value == 'GraphImage':
+            self.type = Media.TYPE_IMAGE
+        elif value == 'GraphVideo':
+            self.type = Media.TYPE_VIDEO
+        elif value == 'GraphSidecar':
+            self.type = Media.TYPE_SIDECAR
+
+    # if self.ownerId and self.owner != None:
+    #     self.ownerId = self.getOwner().getId()
+
+    def _new_account(self, props):
+        from .account import Account
+        return Account(props)
+
+    def _new_comment(self, props):
+        return Comment(props)
 
     @staticmethod
     def set_carousel_media(media_array, carousel_array):
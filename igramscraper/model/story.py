@@ -10,16 +10,7 @@ class Story(Media):
 
     #  We do not need some values - do not parse it for Story,
     #  for example - we do not need owner object inside story
-     
-    #  param value
-    #  param prop
-    #  param arr
-
-    def _init_properties_custom(self, value, prop, arr):
-        if prop in Story.skip_prop:
-            return
-        
-        super()._init_properties_custom(value, prop, arr)
+    _property_initializers = dict.fromkeys(skip_prop)
 
     def __str__(self):
         string = f"""
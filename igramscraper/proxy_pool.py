@@ -0,0 +1,132 @@
+import threading
+import time
+
+
+class ProxyPool:
+    """
+    Spreads requests over several proxies and keeps track of their health.
+
+    Every proxy has an EWMA of its latency and of its error rate, where
+    connection errors, 429s and 5xx answers count as errors. A proxy that
+    fails max_failures times in a row is evicted for eviction_time seconds.
+    Each key (one per Instagram instance) sticks to its proxy as long as it
+    stays in the pool, so a logged in session keeps its egress IP; new keys
+    get the best scoring proxy with the fewest keys.
+    """
+
+    def __init__(self, proxies, alpha=0.3, max_failures=3, eviction_time=300.0,
+                 error_penalty=10.0):
+        """
+        :param proxies: list of proxy urls or requests proxies dicts
+        :param alpha: weight of the newest sample in the EWMAs
+        :param max_failures: consecutive failures after which a proxy is evicted
+        :param eviction_time: seconds an evicted proxy is left out
+        :param error_penalty: how much the error rate weighs against latency in the score
+        """
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.eviction_time = eviction_time
+        self.error_penalty = error_penalty
+
+        self._proxies = {}
+        for proxy in proxies:
+            if isinstance(proxy, str):
+                proxy = {'http': proxy, 'https': proxy}
+            name = proxy.get('https') or proxy.get('http')
+            self._proxies[name] = {
+                'proxies': proxy,
+                'latency': None,
+                'error_rate': 0.0,
+                'failures': 0,
+                'evicted_until': 0.0,
+                'requests': 0,
+            }
+
+        if not self._proxies:
+            raise ValueError('ProxyPool needs at least one proxy')
+
+        self._assignments = {}
+        self._lock = threading.Lock()
+
+    def get_proxy(self, key):
+        """
+        :param key: hashable identifying the session, e.g. id() of an Instagram instance
+        :return: (name, requests proxies dict) the session should use
+        """
+        now = time.monotonic()
+        with self._lock:
+            name = self._assignments.get(key)
+            if name is not None and self._proxies[name]['evicted_until'] <= now:
+                return name, self._proxies[name]['proxies']
+
+            available = [name for name, proxy in self._proxies.items()
+                         if proxy['evicted_until'] <= now]
+            if not available:
+                # every proxy is evicted, use the one that comes back first
+                available = [min(self._proxies,
+                                 key=lambda name: self._proxies[name]['evicted_until'])]
+
+            load = {}
+            for assigned in self._assignments.values():
+                load[assigned] = load.get(assigned, 0) + 1
+
+            name = min(available, key=lambda name: (load.get(name, 0), self.__score(name)))
+            self._assignments[key] = name
+            return name, self._proxies[name]['proxies']
+
+    def report(self, name, latency=None, error=False):
+        """
+        :param name: name returned by get_proxy
+        :param latency: seconds the request took, None if it did not complete
+        :param error: True for connection errors, 429s and 5xx answers
+        """
+        with self._lock:
+            proxy = self._proxies[name]
+            proxy['requests'] += 1
+            proxy['error_rate'] += self.alpha * (float(error) - proxy['error_rate'])
+
+            if latency is not None:
+                if proxy['latency'] is None:
+                    proxy['latency'] = latency
+                else:
+                    proxy['latency'] += self.alpha * (latency - proxy['latency'])
+
+            if not error:
+                proxy['failures'] = 0
+                return
+
+            proxy['failures'] += 1
+            if proxy['failures'] >= self.max_failures:
+                proxy['failures'] = 0
+                proxy['evicted_until'] = time.monotonic() + self.eviction_time
+                for key in [key for key, assigned in self._assignments.items()
+                            if assigned == name]:
+                    del self._assignments[key]
+
+    def release(self, key):
+        """
+        :param key: session that no longer needs its proxy
+        """
+        with self._lock:
+            self._assignments.pop(key, None)
+
+    def get_stats(self):
+        """
+        :return: dict of proxy name to dict that contains latency, error_rate, requests, evicted, sessions
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {name: {
+                'latency': proxy['latency'],
+                'error_rate': proxy['error_rate'],
+                'requests': proxy['requests'],
+                'evicted': proxy['evicted_until'] > now,
+                'sessions': sum(1 for assigned in self._assignments.values()
+                                if assigned == name),
+            } for name, proxy in self._proxies.items()}
+
+    def __score(self, name):
+        proxy = self._proxies[name]
+        latency = proxy['latency'] if proxy['latency'] is not None else 0.0
+        return latency * (1 + self.error_penalty * proxy['error_rate']) \
+            + proxy['error_rate']
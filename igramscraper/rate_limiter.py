@@ -0,0 +1,179 @@
+import threading
+import time
+
+from . import endpoints
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate may change while it is in use.
+    A rate of None means requests are not paced at all.
+    """
+
+    def __init__(self, rate=None, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self, now):
+        """
+        Takes one token, letting the balance go negative so concurrent
+        callers queue up behind each other
+        :param now: time.monotonic() value
+        :return: seconds the caller has to wait before sending
+        """
+        wait = max(0.0, self.blocked_until - now)
+
+        if self.rate is not None:
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated_at) * self.rate)
+            self.tokens -= 1
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+
+        self.updated_at = now
+        return wait
+
+
+class RateLimiter:
+    """
+    Paces requests with one TokenBucket per endpoint class.
+
+    The rate of every bucket adapts with AIMD: each successful response adds
+    `increase` requests per second, each 429 multiplies the rate by
+    `decrease` and blocks the bucket for the Retry-After header if one is
+    sent. A bucket that starts unpaced falls back to `backoff_rate` on its
+    first 429.
+    """
+    TOO_MANY_REQUESTS = 429
+
+    ENDPOINT_CLASSES = {
+        'ACCOUNT_MEDIAS': 'graphql',
+        'COMMENTS_BEFORE_COMMENT_ID_BY_CODE': 'graphql',
+        'LIKES_BY_SHORTCODE': 'graphql',
+        'FOLLOWING_URL': 'graphql',
+        'FOLLOWERS_URL': 'graphql',
+        'GRAPH_QL_QUERY_URL': 'graphql',
+        'ACCOUNT_JSON_INFO': 'json',
+        'MEDIA_JSON_INFO': 'json',
+        'MEDIA_JSON_BY_LOCATION_ID': 'json',
+        'MEDIA_JSON_BY_TAG': 'json',
+        'GENERAL_SEARCH': 'json',
+        'BASE_URL': 'page',
+        'MID_URL': 'page',
+        'ACCOUNT_PAGE': 'page',
+        'MEDIA_LINK': 'page',
+        'ACCOUNT_JSON_PRIVATE_INFO_BY_ID': 'api',
+        'LOGIN_URL': 'action',
+        'FOLLOW_URL': 'action',
+        'UNFOLLOW_URL': 'action',
+        'BLOCK_URL': 'action',
+        'UNBLOCK_URL': 'action',
+        'LIKE_URL': 'action',
+        'UNLIKE_URL': 'action',
+        'ADD_COMMENT_URL': 'action',
+        'DELETE_COMMENT_URL': 'action',
+    }
+
+    def __init__(self, rate=None, capacity=1.0, min_rate=0.05, max_rate=None,
+                 increase=0.05, decrease=0.5, backoff_rate=1.0,
+                 endpoint_classes=None):
+        """
+        :param rate: starting requests per second of every bucket, None for unpaced
+        :param capacity: how many requests a bucket lets through in a burst
+        :param min_rate: the rate never drops below this
+        :param max_rate: the rate never grows above this, None for no limit
+        :param increase: requests per second added after each success
+        :param decrease: factor the rate is multiplied with after a 429
+        :param backoff_rate: rate an unpaced bucket is decreased from on its first 429
+        :param endpoint_classes: dict of endpoint name to class, defaults to ENDPOINT_CLASSES
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.backoff_rate = backoff_rate
+        self.endpoint_classes = endpoint_classes if endpoint_classes is not None \
+            else RateLimiter.ENDPOINT_CLASSES
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_endpoint_class(self, url):
+        """
+        :param url: request url
+        :return: name of the bucket the url is paced by
+        """
+        return self.endpoint_classes.get(endpoints.get_endpoint_name(url),
+                                         'other')
+
+    def get_rate(self, endpoint_class):
+        """
+        :param endpoint_class: bucket name
+        :return: current requests per second or None if unpaced
+        """
+        with self._lock:
+            return self.__bucket(endpoint_class).rate
+
+    def __bucket(self, endpoint_class):
+        bucket = self._buckets.get(endpoint_class)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity)
+            self._buckets[endpoint_class] = bucket
+        return bucket
+
+    def acquire(self, url):
+        """
+        Blocks until a request to url may be sent
+        :param url: request url
+        :return: seconds waited
+        """
+        endpoint_class = self.get_endpoint_class(url)
+        with self._lock:
+            wait = self.__bucket(endpoint_class).reserve(time.monotonic())
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+    def update(self, url, status_code, headers=None):
+        """
+        Adapts the rate of the bucket url belongs to after a response
+        :param url: request url
+        :param status_code: response status code
+        :param headers: response headers
+        """
+        endpoint_class = self.get_endpoint_class(url)
+        with self._lock:
+            bucket = self.__bucket(endpoint_class)
+
+            if status_code == RateLimiter.TOO_MANY_REQUESTS:
+                rate = bucket.rate if bucket.rate is not None else self.backoff_rate
+                bucket.rate = max(self.min_rate, rate * self.decrease)
+                bucket.tokens = min(bucket.tokens, 0.0)
+
+                retry_after = RateLimiter.__retry_after(headers)
+                if retry_after is None:
+                    retry_after = 1.0 / bucket.rate
+                bucket.blocked_until = max(bucket.blocked_until,
+                                           time.monotonic() + retry_after)
+
+            elif status_code < 400 and bucket.rate is not None:
+                bucket.rate += self.increase
+                if self.max_rate is not None:
+                    bucket.rate = min(self.max_rate, bucket.rate)
+
+    @staticmethod
+    def __retry_after(headers):
+        if not headers:
+            return None
+
+        try:
+            return max(0.0, float(headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,265 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+from . import endpoints
+
+
+class CachedResponse:
+    """
+    Stands in for a requests.Response that is answered without a request.
+    Models built from it can be kept in models and reused by later hits.
+    """
+
+    def __init__(self, url, status_code, content, headers=None, encoding=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers if headers is not None else {}
+        self.encoding = encoding or 'utf-8'
+        self.cookies = _EmptyCookies()
+        self.models = {}
+        self._json = None
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    def json(self, loads=json.loads):
+        if self._json is None:
+            self._json = loads(self.content)
+        return self._json
+
+
+class _EmptyCookies(dict):
+
+    def get_dict(self):
+        return {}
+
+
+class ResponseCache:
+    """
+    Caches successful GET responses of profile, media and location lookups.
+
+    Entries are keyed by url and live for the TTL of the endpoints.py
+    template the url was built from; urls of endpoints without a TTL are
+    never cached. Memory is an LRU bounded by max_entries and max_bytes.
+    With a folder, entries are also written to disk so they survive the
+    process, bounded by max_disk_bytes.
+    """
+    DEFAULT_TTLS = {
+        'ACCOUNT_PAGE': 300,
+        'ACCOUNT_JSON_INFO': 300,
+        'ACCOUNT_JSON_PRIVATE_INFO_BY_ID': 3600,
+        'MEDIA_LINK': 600,
+        'MEDIA_JSON_INFO': 600,
+        'MEDIA_JSON_BY_LOCATION_ID': 60,
+    }
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttls=None,
+                 folder=None, max_disk_bytes=512 * 1024 * 1024):
+        """
+        :param max_entries: entries kept in memory at most
+        :param max_bytes: body bytes kept in memory at most
+        :param ttls: dict of endpoint name to seconds, defaults to DEFAULT_TTLS
+        :param folder: directory for the on-disk cache, None keeps it in memory only
+        :param max_disk_bytes: bytes kept on disk at most
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = ttls if ttls is not None else ResponseCache.DEFAULT_TTLS
+        self.folder = folder
+        self.max_disk_bytes = max_disk_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._disk_size = None
+        self._lock = threading.Lock()
+
+        if folder is not None and not os.path.exists(folder):
+            os.makedirs(folder)
+
+    def get_ttl(self, url):
+        """
+        :param url: request url
+        :return: seconds a response of url is cached, None if it is not cached
+        """
+        return self.ttls.get(endpoints.get_endpoint_name(url))
+
+    def get(self, url):
+        """
+        :param url: request url
+        :return: CachedResponse or None
+        """
+        if self.get_ttl(url) is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(url)
+                    self.hits += 1
+                    return entry[1]
+                self.__remove(url)
+
+        response = self.__read_disk(url, now)
+
+        with self._lock:
+            if response is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.__store(url, response, response.expires_at)
+            return response
+
+    def put(self, url, response):
+        """
+        :param url: request url
+        :param response: requests.Response with status code 200
+        """
+        ttl = self.get_ttl(url)
+        if ttl is None:
+            return
+
+        cached = CachedResponse(url, response.status_code, response.content,
+                                ResponseCache.__kept_headers(response.headers),
+                                response.encoding)
+        expires_at = time.time() + ttl
+
+        with self._lock:
+            self.__store(url, cached, expires_at)
+
+        if self.folder is not None:
+            self.__write_disk(url, cached, expires_at)
+
+    def get_stats(self):
+        """
+        :return: dict that contains hits, misses, evictions, entries, bytes
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+        if self.folder is not None:
+            for name in os.listdir(self.folder):
+                if name.endswith('.cache'):
+                    os.remove(os.path.join(self.folder, name))
+            self._disk_size = None
+
+    def __store(self, url, response, expires_at):
+        if url in self._entries:
+            self.__remove(url)
+
+        self._entries[url] = (expires_at, response)
+        self._size += len(response.content)
+
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._size > self.max_bytes):
+            self.__remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def __remove(self, url):
+        _, response = self._entries.pop(url)
+        self._size -= len(response.content)
+
+    @staticmethod
+    def __kept_headers(headers):
+        kept = {}
+        for name in ('Content-Type', 'ETag', 'Last-Modified'):
+            value = headers.get(name)
+            if value is not None:
+                kept[name] = value
+        return kept
+
+    def __path(self, url):
+        return os.path.join(self.folder,
+                            hashlib.sha1(url.encode('utf-8')).hexdigest() + '.cache')
+
+    def __read_disk(self, url, now):
+        if self.folder is None:
+            return None
+
+        try:
+            with open(self.__path(url), 'rb') as f:
+                meta = json.loads(f.readline())
+                content = f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if meta['url'] != url or meta['expires_at'] <= now:
+            return None
+
+        response = CachedResponse(url, meta['status_code'], content,
+                                  meta['headers'], meta['encoding'])
+        response.expires_at = meta['expires_at']
+        return response
+
+    def __write_disk(self, url, response, expires_at):
+        meta = {
+            'url': url,
+            'expires_at': expires_at,
+            'status_code': response.status_code,
+            'headers': response.headers,
+            'encoding': response.encoding,
+        }
+        path = self.__path(url)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(json.dumps(meta).encode('utf-8') + b'\n')
+            f.write(response.content)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += len(response.content)
+            if self._disk_size is None or self._disk_size > self.max_disk_bytes:
+                self._disk_size = self.__trim_disk()
+
+    def __trim_disk(self):
+        """
+        removes the least recently written files until the folder fits max_disk_bytes
+        :return: bytes left on disk
+        """
+        files = []
+        total = 0
+        for name in os.listdir(self.folder):
+            if not name.endswith('.cache'):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        return total
@@ -0,0 +1,78 @@
+import collections
+import random
+import threading
+import time
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request is sent again and how long to wait.
+
+    Waits grow exponentially with full jitter. Every retry is drawn from a
+    shared budget of `budget` retries per `budget_period` seconds, so a long
+    outage makes requests fail fast instead of multiplying the load.
+    Non-idempotent requests (POST) are only retried on 429, which means the
+    request was not processed.
+    """
+    TOO_MANY_REQUESTS = 429
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=60.0,
+                 budget=20, budget_period=60.0, status_codes=None):
+        """
+        :param max_attempts: how often a request is sent at most, 1 disables retries
+        :param base_delay: upper bound in seconds of the first backoff
+        :param max_delay: upper bound in seconds of any backoff
+        :param budget: how many retries may happen within budget_period
+        :param budget_period: length of the budget window in seconds
+        :param status_codes: status codes that are retried, defaults to RETRY_STATUS_CODES
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.budget_period = budget_period
+        self.status_codes = status_codes if status_codes is not None \
+            else RetryPolicy.RETRY_STATUS_CODES
+
+        self._retried_at = collections.deque()
+        self._lock = threading.Lock()
+
+    def should_retry(self, attempt, status_code=None, idempotent=True):
+        """
+        :param attempt: number of the attempt that just failed, starting at 1
+        :param status_code: response status code, None if the connection failed
+        :param idempotent: False for requests that must not be sent twice
+        :return: bool
+        """
+        if attempt >= self.max_attempts:
+            return False
+
+        if status_code is not None and status_code not in self.status_codes:
+            return False
+
+        if not idempotent and status_code != RetryPolicy.TOO_MANY_REQUESTS:
+            return False
+
+        return self.__take_budget()
+
+    def __take_budget(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._retried_at and \
+                    self._retried_at[0] <= now - self.budget_period:
+                self._retried_at.popleft()
+
+            if len(self._retried_at) >= self.budget:
+                return False
+
+            self._retried_at.append(now)
+            return True
+
+    def get_delay(self, attempt):
+        """
+        :param attempt: number of the attempt that just failed, starting at 1
+        :return: seconds to wait before the next attempt
+        """
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
@@ -1,27 +1,220 @@
+import contextlib
+import json
 import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # no advisory locks on windows, writes are still atomic
+    fcntl = None
 
 
 class CookieSessionManager:
+    """
+    Keeps the cookies of one account in session_folder/filename and the
+    session meta in session_folder/filename.meta.
+
+    Files are replaced atomically and every access holds an advisory lock
+    on session_folder/filename.lock, so worker processes sharing a folder
+    never read a half-written session.
+    """
+
     def __init__(self, session_folder, filename):
         self.session_folder = session_folder
         self.filename = filename
 
     def get_saved_cookies(self):
+        with self.__lock(exclusive=False):
+            try:
+                with open(self.session_folder + self.filename, 'r') as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+
+    def set_saved_cookies(self, cookie_string):
+        with self.__lock(exclusive=True):
+            self.__write(self.session_folder + self.filename, cookie_string)
+
+    def empty_saved_cookies(self):
+        with self.__lock(exclusive=True):
+            for path in (self.session_folder + self.filename,
+                         self.session_folder + self.filename + '.meta'):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def get_session_meta(self):
+        """
+        :return: dict stored next to the cookies, e.g. when the session was last validated
+        """
+        with self.__lock(exclusive=False):
+            try:
+                with open(self.session_folder + self.filename + '.meta', 'r') as f:
+                    return json.load(f)
+            except (FileNotFoundError, ValueError):
+                return {}
+
+    def set_session_meta(self, meta):
+        """
+        :param meta: JSON serializable dict
+        """
+        with self.__lock(exclusive=True):
+            self.__write(self.session_folder + self.filename + '.meta',
+                         json.dumps(meta))
+
+    def update_session_meta(self, update):
+        """
+        Reads, changes and writes the session meta under one exclusive lock,
+        so workers sharing the session do not overwrite each other's changes
+        :param update: function called with the meta dict, changes it in place or returns the new one
+        :return: the meta dict that was written
+        """
+        path = self.session_folder + self.filename + '.meta'
+        with self.__lock(exclusive=True):
+            try:
+                with open(path, 'r') as f:
+                    meta = json.load(f)
+            except (FileNotFoundError, ValueError):
+                meta = {}
+            result = update(meta)
+            meta = result if result is not None else meta
+            self.__write(path, json.dumps(meta))
+        return meta
+
+    @staticmethod
+    def __write(path, content):
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @contextlib.contextmanager
+    def __lock(self, exclusive):
+        lock_path = self.session_folder + self.filename + '.lock'
+        if exclusive and not os.path.exists(self.session_folder):
+            os.makedirs(self.session_folder, exist_ok=True)
+
+        if fcntl is None:
+            yield
+            return
+
         try:
-            f = open(self.session_folder + self.filename, 'r') 
-            return f.read()
+            f = open(lock_path, 'a' if exclusive else 'r')
         except FileNotFoundError:
-            return None
+            # nothing was written yet, so there is nothing to read either
+            yield
+            return
 
-    def set_saved_cookies(self, cookie_string):
-        if not os.path.exists(self.session_folder):
-            os.makedirs(self.session_folder)
+        with f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
 
-        with open(self.session_folder + self.filename,"w+") as f:
-            f.write(cookie_string)
+
+class SqliteSessionManager:
+    """
+    Keeps the cookies and session meta of many accounts in one SQLite
+    database, which worker processes can share. Same interface as
+    CookieSessionManager, one instance per account.
+    """
+
+    def __init__(self, path, username, timeout=30.0):
+        """
+        :param path: sqlite database file, created if it does not exist
+        :param username: account the session belongs to
+        :param timeout: seconds to wait for another process holding the database
+        """
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.username = username
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=timeout,
+                                           check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'username TEXT PRIMARY KEY, cookies TEXT, meta TEXT, '
+                'updated_at REAL)')
+
+    def get_saved_cookies(self):
+        return self.__get('cookies')
+
+    def set_saved_cookies(self, cookie_string):
+        self.__set('cookies', cookie_string)
 
     def empty_saved_cookies(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM sessions WHERE username = ?',
+                                     (self.username,))
+
+    def get_session_meta(self):
+        """
+        :return: dict stored with the cookies, e.g. when the session was last validated
+        """
+        meta = self.__get('meta')
         try:
-            os.remove(self.session_folder + self.filename)
-        except FileNotFoundError:
-            pass
+            return json.loads(meta) if meta is not None else {}
+        except ValueError:
+            return {}
+
+    def set_session_meta(self, meta):
+        """
+        :param meta: JSON serializable dict
+        """
+        self.__set('meta', json.dumps(meta))
+
+    def update_session_meta(self, update):
+        """
+        Reads, changes and writes the session meta in one write transaction,
+        so workers sharing the database do not overwrite each other's changes
+        :param update: function called with the meta dict, changes it in place or returns the new one
+        :return: the meta dict that was written
+        """
+        with self._lock, self._connection:
+            # takes the write lock before reading
+            self._connection.execute('BEGIN IMMEDIATE')
+            row = self._connection.execute(
+                'SELECT meta FROM sessions WHERE username = ?',
+                (self.username,)).fetchone()
+            try:
+                meta = json.loads(row[0]) if row is not None and row[0] is not None else {}
+            except ValueError:
+                meta = {}
+            result = update(meta)
+            meta = result if result is not None else meta
+            self.__upsert('meta', json.dumps(meta))
+        return meta
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __get(self, column):
+        with self._lock:
+            row = self._connection.execute(
+                f'SELECT {column} FROM sessions WHERE username = ?',
+                (self.username,)).fetchone()
+        return row[0] if row is not None else None
+
+    def __set(self, column, value):
+        with self._lock, self._connection:
+            self.__upsert(column, value)
+
+    def __upsert(self, column, value):
+        self._connection.execute(
+            f'INSERT INTO sessions (username, {column}, updated_at) '
+            f'VALUES (?, ?, ?) ON CONFLICT(username) DO UPDATE SET '
+            f'{column} = excluded.{column}, updated_at = excluded.updated_at',
+            (self.username, value, time.time()))
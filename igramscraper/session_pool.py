@@ -0,0 +1,212 @@
+import itertools
+import threading
+import time
+
+from .exception.instagram_auth_exception import InstagramAuthException
+from .exception.instagram_exception import InstagramException
+from .instagram import Instagram
+
+
+class SessionPool:
+    """
+    Spreads jobs over several logged in Instagram sessions.
+
+    Every session keeps its own cookie jar, session file and RateLimiter, so
+    the pool scales with the number of accounts. A session whose job fails
+    with a 429 sits out for `cooldown` seconds; a session that hits a
+    checkpoint or loses its login is taken out until enable() is called.
+    Jobs that failed that way are moved to another session.
+    """
+    ROUND_ROBIN = 'round_robin'
+    LEAST_LOADED = 'least_loaded'
+
+    TOO_MANY_REQUESTS = 429
+
+    def __init__(self, instagrams=None, strategy=LEAST_LOADED, cooldown=900.0):
+        """
+        :param instagrams: logged in Instagram instances
+        :param strategy: SessionPool.LEAST_LOADED or SessionPool.ROUND_ROBIN
+        :param cooldown: seconds a session that got a 429 is left out
+        """
+        if strategy not in (SessionPool.ROUND_ROBIN, SessionPool.LEAST_LOADED):
+            raise ValueError(f'Unknown strategy {strategy}')
+
+        self.strategy = strategy
+        self.cooldown = cooldown
+
+        self._sessions = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+        for instagram in instagrams or []:
+            self.add(instagram)
+
+    def add(self, instagram):
+        """
+        :param instagram: logged in Instagram instance
+        """
+        with self._condition:
+            self._sessions.append({
+                'instagram': instagram,
+                'in_flight': 0,
+                'jobs': 0,
+                'last_used': next(self._order),
+                'available_at': 0.0,
+                'disabled': False,
+                'error': None,
+            })
+            self._condition.notify_all()
+
+    def add_account(self, username, password, session_folder=None, **kwargs):
+        """
+        Creates, logs in and adds a session for an account
+        :param username: instagram username
+        :param password: instagram password
+        :param session_folder: cookie folder, see Instagram.with_credentials
+        :param kwargs: passed to Instagram
+        :return: the new Instagram instance
+        """
+        instagram = Instagram(**kwargs)
+        instagram.with_credentials(username, password, session_folder)
+        instagram.login()
+        self.add(instagram)
+        return instagram
+
+    def enable(self, instagram):
+        """
+        Puts a session that was taken out back into rotation
+        :param instagram: Instagram instance of the pool
+        """
+        with self._condition:
+            session = self.__session(instagram)
+            session['disabled'] = False
+            session['available_at'] = 0.0
+            session['error'] = None
+            self._condition.notify_all()
+
+    def acquire(self):
+        """
+        Blocks until a session is available
+        :return: Instagram instance, give it back with release()
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                enabled = [session for session in self._sessions
+                           if not session['disabled']]
+                if not enabled:
+                    raise InstagramException('No session left in the pool')
+
+                ready = [session for session in enabled
+                         if session['available_at'] <= now]
+                if ready:
+                    session = min(ready, key=self.__rank)
+                    session['in_flight'] += 1
+                    session['jobs'] += 1
+                    session['last_used'] = next(self._order)
+                    return session['instagram']
+
+                self._condition.wait(
+                    min(session['available_at'] for session in enabled) - now)
+
+    def release(self, instagram, exception=None):
+        """
+        :param instagram: Instagram instance returned by acquire()
+        :param exception: exception the job failed with, if any
+        :return: True if the session was taken out of rotation because of exception
+        """
+        with self._condition:
+            session = self.__session(instagram)
+            session['in_flight'] -= 1
+
+            taken_out = False
+            if exception is not None:
+                if SessionPool.is_rate_limited(exception):
+                    session['available_at'] = time.monotonic() + self.cooldown
+                    session['error'] = exception
+                    taken_out = True
+                elif SessionPool.is_session_lost(exception):
+                    session['disabled'] = True
+                    session['error'] = exception
+                    taken_out = True
+
+            self._condition.notify_all()
+            return taken_out
+
+    def run(self, job):
+        """
+        :param job: function called with an Instagram instance
+        :return: what job returns, run again on another session if its session was taken out
+        """
+        while True:
+            instagram = self.acquire()
+            try:
+                result = job(instagram)
+            except Exception as e:
+                if not self.release(instagram, e):
+                    raise
+                continue
+            self.release(instagram)
+            return result
+
+    def iter_pages(self, method, *args, cursor_name='end_cursor', **kwargs):
+        """
+        Runs a page generator such as iter_followers on one session and
+        continues from the last cursor on another one if it is taken out
+        :param method: name of the Instagram page generator
+        :param cursor_name: keyword the generator takes its start cursor with, max_id for medias
+        :return: generator of the pages
+        """
+        cursor = kwargs.pop(cursor_name, '')
+        while True:
+            instagram = self.acquire()
+            error = None
+            try:
+                pages = getattr(instagram, method)(*args, **{cursor_name: cursor}, **kwargs)
+                for page in pages:
+                    cursor = page['next_page']
+                    yield page
+            except Exception as e:
+                error = e
+            finally:
+                # also runs when the caller stops iterating early
+                taken_out = self.release(instagram, error)
+
+            if error is None:
+                return
+            if not taken_out:
+                raise error
+
+    def get_stats(self):
+        """
+        :return: list of dict that contains username, in_flight, jobs, available, error
+        """
+        now = time.monotonic()
+        with self._condition:
+            return [{
+                'username': session['instagram'].session_username,
+                'in_flight': session['in_flight'],
+                'jobs': session['jobs'],
+                'available': not session['disabled'] and session['available_at'] <= now,
+                'error': session['error'],
+            } for session in self._sessions]
+
+    def __rank(self, session):
+        if self.strategy == SessionPool.LEAST_LOADED:
+            return session['in_flight'], session['last_used']
+        return session['last_used']
+
+    def __session(self, instagram):
+        for session in self._sessions:
+            if session['instagram'] is instagram:
+                return session
+        raise ValueError('Instagram instance is not part of the pool')
+
+    @staticmethod
+    def is_rate_limited(exception):
+        return getattr(exception, 'code', None) == SessionPool.TOO_MANY_REQUESTS
+
+    @staticmethod
+    def is_session_lost(exception):
+        return isinstance(exception, InstagramAuthException) \
+            or 'checkpoint_required' in str(exception)
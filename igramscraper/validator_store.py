@@ -0,0 +1,95 @@
+import collections
+import threading
+
+from . import endpoints
+from .response_cache import CachedResponse
+
+
+class ValidatorStore:
+    """
+    Remembers the ETag and Last-Modified validators of polled JSON endpoints.
+
+    Later requests to the same url are sent with If-None-Match and
+    If-Modified-Since. A 304 answer is replaced by the stored response, which
+    keeps its already parsed JSON and any model built from it, so a poll
+    that did not change costs neither the body nor the parsing.
+    """
+    HTTP_OK = 200
+    HTTP_NOT_MODIFIED = 304
+
+    DEFAULT_ENDPOINTS = (
+        'ACCOUNT_JSON_INFO',
+        'MEDIA_JSON_INFO',
+        'MEDIA_JSON_BY_TAG',
+        'MEDIA_JSON_BY_LOCATION_ID',
+    )
+
+    def __init__(self, max_entries=1024, endpoint_names=None):
+        """
+        :param max_entries: urls whose validators are kept at most
+        :param endpoint_names: endpoints.py template names that are revalidated, defaults to DEFAULT_ENDPOINTS
+        """
+        self.max_entries = max_entries
+        self.endpoint_names = endpoint_names if endpoint_names is not None \
+            else ValidatorStore.DEFAULT_ENDPOINTS
+
+        self.not_modified_count = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_conditional_headers(self, url):
+        """
+        :param url: request url
+        :return: dict of If-None-Match / If-Modified-Since headers, empty if nothing is stored
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+
+        if entry is None:
+            return {}
+
+        headers = {}
+        if 'ETag' in entry.headers:
+            headers['If-None-Match'] = entry.headers['ETag']
+        if 'Last-Modified' in entry.headers:
+            headers['If-Modified-Since'] = entry.headers['Last-Modified']
+        return headers
+
+    def update(self, url, response):
+        """
+        :param url: request url
+        :param response: response of a request sent with get_conditional_headers
+        :return: the stored response on a 304, otherwise the response to use
+        """
+        if response.status_code == ValidatorStore.HTTP_NOT_MODIFIED:
+            with self._lock:
+                entry = self._entries.get(url)
+                if entry is not None:
+                    self._entries.move_to_end(url)
+                    self.not_modified_count += 1
+                    return entry
+            return response
+
+        if response.status_code != ValidatorStore.HTTP_OK \
+                or endpoints.get_endpoint_name(url) not in self.endpoint_names:
+            return response
+
+        headers = {}
+        for name in ('Content-Type', 'ETag', 'Last-Modified'):
+            value = response.headers.get(name)
+            if value is not None:
+                headers[name] = value
+
+        if 'ETag' not in headers and 'Last-Modified' not in headers:
+            return response
+
+        entry = CachedResponse(url, response.status_code, response.content,
+                               headers, response.encoding)
+        with self._lock:
+            self._entries[url] = entry
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return entry
@@ -16,6 +16,9 @@ setuptools.setup(
         'requests>=2.21.0',
         'python-slugify==3.0.2'
     ],
+    extras_require={
+        'fast-json': ['orjson'],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Operating System :: OS Independent',
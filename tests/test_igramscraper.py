@@ -1,12 +1,39 @@
+import asyncio
+import http.server
+import json
 import unittest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from test_data import username, password, user_agent
 import os
+import socket
+import tempfile
+import threading
+import time
+import urllib.parse
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
    
 from igramscraper.instagram import Instagram
-from igramscraper.model import Media
+from igramscraper.async_instagram import AsyncInstagram
+from igramscraper.blob_store import BlobStore
+from igramscraper.columnar import ColumnarWriter, ColumnarReader, ACCOUNT_COLUMNS
+from igramscraper.crawl_scheduler import CrawlScheduler
+from igramscraper.crawl_store import CrawlStore
+from igramscraper.dedup import BloomFilter
+from igramscraper.json_codec import get_codec
+from igramscraper.media_downloader import MediaDownloader
+from igramscraper.media_watcher import MediaWatcher
+from igramscraper.follower_diff import FollowerSnapshots
+from igramscraper.rate_limiter import RateLimiter
+from igramscraper.proxy_pool import ProxyPool
+from igramscraper.retry_policy import RetryPolicy
+from igramscraper.session_pool import SessionPool
+from igramscraper.session_manager import CookieSessionManager, SqliteSessionManager
+from igramscraper.response_cache import ResponseCache
+from igramscraper.validator_store import ValidatorStore
+from igramscraper import endpoints
+from igramscraper.exception import InstagramException, InstagramNotFoundException, InstagramAuthException
+from igramscraper.model import Account, Media, Story, LeanAccount, LeanMedia, LeanComment
 
 class TestIgramscraper(unittest.TestCase):
 
@@ -112,6 +139,1104 @@ class TestIgramscraper(unittest.TestCase):
     # TODO: Add test get_media_by_id
     # TODO: Add test get_location_by_id
 
+
+def fake_response(json_data=None, status_code=200, text=''):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = json_data
+    response.text = text
+    response.content = text.encode('utf-8') if text else json.dumps(json_data).encode('utf-8')
+    response.headers = {}
+    return response
+
+
+def followers_page(ids, end_cursor, has_next_page, count=100):
+    return {'data': {'user': {'edge_followed_by': {
+        'count': count,
+        'page_info': {'end_cursor': end_cursor, 'has_next_page': has_next_page},
+        'edges': [{'node': {'id': str(i), 'username': f'user{i}'}} for i in ids],
+    }}}}
+
+
+def fake_instagram(responses, **kwargs):
+    """
+    Instagram whose requests are answered by responses, a list or a function
+    of the url, and whose rate limiter does not wait
+    """
+    instagram = Instagram(**kwargs)
+    instagram.set_rate_limiter(RateLimiter(backoff_rate=1000))
+    instagram._Instagram__req = MagicMock()
+    instagram._Instagram__req.get.side_effect = responses
+    return instagram
+
+
+def tag_page(ids, end_cursor, has_next_page):
+    return {'graphql': {'hashtag': {'edge_hashtag_to_media': {
+        'count': 1000,
+        'page_info': {'end_cursor': end_cursor, 'has_next_page': has_next_page},
+        'edges': [{'node': {'id': str(i), 'taken_at_timestamp': 1600000000 - i}} for i in ids],
+    }}}}
+
+
+class TestFollowerPaging(unittest.TestCase):
+
+    def setUp(self):
+        self.instagram = fake_instagram([
+            fake_response(followers_page([1, 2], 'c1', True)),
+            fake_response(followers_page([3, 4], 'c2', True)),
+            fake_response(followers_page([5], None, False)),
+        ], retry_policy=RetryPolicy(max_attempts=1))
+
+    def test_iter_followers_yields_pages_with_cursor(self):
+        pages = list(self.instagram.iter_followers(3, 2, delayed=False))
+        self.assertEqual(['c1', 'c2', 'c2'], [page['next_page'] for page in pages])
+        self.assertEqual(['1', '2'], [a.identifier for a in pages[0]['accounts']])
+
+    def test_get_followers_stops_at_count(self):
+        followers = self.instagram.get_followers(3, 3, 2, delayed=False)
+        self.assertEqual(['1', '2', '3'], [a.identifier for a in followers['accounts']])
+        self.assertEqual('c2', followers['next_page'])
+        self.assertEqual(2, self.instagram._Instagram__req.get.call_count)
+
+    def test_get_followers_of_account_without_followers(self):
+        self.instagram._Instagram__req.get.side_effect = [
+            fake_response(followers_page([], None, False, count=0)),
+        ]
+        followers = self.instagram.get_followers(3, 2, 2, delayed=False)
+        self.assertEqual({'next_page': '', 'accounts': []}, followers)
+
+    def test_lean_models_drop_dict_and_bookkeeping(self):
+        self.instagram.set_lean_models()
+        followers = self.instagram.get_followers(3, 2, 2, delayed=False)
+        account = followers['accounts'][0]
+        self.assertIsInstance(account, LeanAccount)
+        self.assertEqual(('1', 'user1'), (account.identifier, account.username))
+        self.assertFalse(hasattr(account, '__dict__'))
+        self.assertFalse(hasattr(account, 'modified'))
+
+    def test_actions_accept_lean_models(self):
+        self.instagram.set_lean_models()
+        requests = self.instagram._Instagram__req
+        requests.post.side_effect = [fake_response({'status': 'ok'}) for _ in range(3)] \
+            + [fake_response({'status': 'ok', 'id': '20', 'text': 'hi'})]
+        media = LeanMedia({'id': '10'})
+        comment = LeanComment({'id': '11'})
+
+        self.instagram.like(media)
+        self.instagram.unlike(media)
+        self.instagram.delete_comment(media, comment)
+        reply = self.instagram.add_comment(media, 'hi', comment)
+
+        self.assertEqual([endpoints.get_like_url('10'), endpoints.get_unlike_url('10'),
+                          endpoints.get_delete_comment_url('10', '11'),
+                          endpoints.get_add_comment_url('10')],
+                         [call[0][0] for call in requests.post.call_args_list])
+        self.assertEqual('11', requests.post.call_args[1]['data']['replied_to_comment_id'])
+        self.assertIsInstance(reply, LeanComment)
+        self.assertEqual('20', reply.identifier)
+
+    def test_crawl_followers_resumes_from_checkpoint(self):
+        requests = self.instagram._Instagram__req
+        requests.get.side_effect = [
+            fake_response(followers_page([1, 2], 'c1', True)),
+            fake_response(followers_page([3, 4], 'c2', True)),
+            fake_response(status_code=429, text='rate limited'),
+        ]
+        with tempfile.TemporaryDirectory() as folder:
+            store = CrawlStore(os.path.join(folder, 'crawl.db'))
+            with self.assertRaises(InstagramException):
+                self.instagram.crawl_followers(3, store, 2, delayed=False)
+            self.assertEqual(4, store.count_accounts(CrawlStore.FOLLOWERS, 3))
+
+            requests.get.side_effect = [
+                fake_response(followers_page([5], None, False)),
+            ]
+            self.assertEqual(5, self.instagram.crawl_followers(3, store, 2, delayed=False))
+            self.assertIn('c2', requests.get.call_args[0][0])
+            usernames = [a.username for a in store.iter_accounts(CrawlStore.FOLLOWERS, 3)]
+            self.assertEqual(['user1', 'user2', 'user3', 'user4', 'user5'], usernames)
+            store.close()
+
+    def test_retry_sends_same_cursor_again(self):
+        self.instagram.set_retry_policy(RetryPolicy(base_delay=0))
+        requests = self.instagram._Instagram__req
+        requests.get.side_effect = [
+            fake_response(followers_page([1, 2], 'c1', True)),
+            fake_response(status_code=429),
+            fake_response(status_code=502),
+            fake_response(followers_page([3], None, False)),
+        ]
+        followers = self.instagram.get_followers(3, 10, 2, delayed=False)
+        self.assertEqual(3, len(followers['accounts']))
+        urls = [call[0][0] for call in requests.get.call_args_list]
+        self.assertEqual(urls[1], urls[3])
+
+    def test_retry_gives_up_after_max_attempts(self):
+        self.instagram.set_retry_policy(RetryPolicy(max_attempts=2, base_delay=0))
+        self.instagram._Instagram__req.get.side_effect = [
+            fake_response(status_code=503),
+            fake_response(status_code=503),
+        ]
+        with self.assertRaises(InstagramException):
+            self.instagram.get_followers(3, 10, 2, delayed=False)
+
+
+class TestColumnarExport(unittest.TestCase):
+
+    def test_pages_round_trip_through_batches(self):
+        instagram = fake_instagram([
+            fake_response(followers_page([1, 2, 3], 'c1', True)),
+            fake_response(followers_page([4, 5], None, False)),
+        ])
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'followers.igcol')
+            with ColumnarWriter(path, ACCOUNT_COLUMNS, batch_size=2) as writer:
+                pages = instagram.iter_followers(3, 3, delayed=False)
+                self.assertEqual(5, writer.write_pages(pages, 'accounts'))
+                writer.write_row([6, None, None, None, True, None, 0, 0, 0])
+
+            with ColumnarReader(path) as reader:
+                self.assertEqual((6, 3), (reader.row_count, reader.batch_count))
+                self.assertEqual({'id': [5, 6], 'username': ['user5', None]},
+                                 reader.read_batch(2, ['id', 'username']))
+                rows = list(reader.iter_rows(['id', 'is_private']))
+                self.assertEqual([1, 2, 3, 4, 5, 6], [row['id'] for row in rows])
+                self.assertEqual([False] * 5 + [True], [row['is_private'] for row in rows])
+
+
+class TestJsonCodec(unittest.TestCase):
+
+    def test_codecs_agree_on_graphql_variables_and_bodies(self):
+        variables = {'id': '3', 'first': '50', 'after': 'QVFE/x=='}
+        body = json.dumps(followers_page([1, 2], 'c1', True)).encode('utf-8')
+        stdlib = get_codec('json')
+        self.assertEqual('{"id":"3","first":"50","after":"QVFE/x=="}', stdlib.dumps(variables))
+        self.assertEqual(stdlib.dumps(variables), get_codec().dumps(variables))
+        self.assertEqual(stdlib.loads(body), get_codec().loads(body))
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+        text = {'tag': 'café', 'emoji': '\U0001f600', 'quote': '"\n'}
+        self.assertEqual('{"tag":"caf\\u00e9","emoji":"\\ud83d\\ude00","quote":"\\"\\n"}',
+                         stdlib.dumps(text))
+        self.assertEqual(stdlib.dumps(text), get_codec().dumps(text))
+        self.assertEqual(text, get_codec().loads(get_codec().dumps(text).encode('utf-8')))
+
+        try:
+            endpoints.set_json_codec('json')
+            self.assertIn(urllib.parse.quote_plus(stdlib.dumps(variables)),
+                          endpoints.get_followers_json_link(variables))
+        finally:
+            endpoints.set_json_codec(get_codec())
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def make_instagram(self, responses):
+        return fake_instagram(responses, retry_policy=RetryPolicy(max_attempts=1))
+
+    def test_rate_limited_session_hands_crawl_to_next_one(self):
+        first = self.make_instagram([
+            fake_response(followers_page([1, 2], 'c1', True)),
+            fake_response(status_code=429, text='rate limited'),
+        ])
+        second = self.make_instagram([
+            fake_response(followers_page([3], None, False)),
+        ])
+        pool = SessionPool([first, second], cooldown=60)
+
+        pages = list(pool.iter_pages('iter_followers', 3, 2, delayed=False))
+        self.assertEqual([['1', '2'], ['3']],
+                         [[a.identifier for a in page['accounts']] for page in pages])
+        self.assertIn('after%22%3A%22c1',
+                      second._Instagram__req.get.call_args[0][0])
+        self.assertEqual([False, True], [s['available'] for s in pool.get_stats()])
+        self.assertEqual(0, sum(s['in_flight'] for s in pool.get_stats()))
+
+    def test_least_loaded_and_lost_sessions(self):
+        first, second = Instagram(), Instagram()
+        pool = SessionPool([first, second])
+        self.assertIs(first, pool.acquire())
+        self.assertIs(second, pool.acquire())
+        pool.release(second)
+        self.assertIs(second, pool.acquire())
+
+        pool.release(first, InstagramAuthException('checkpoint_required'))
+        pool.release(second, InstagramAuthException('checkpoint_required'))
+        with self.assertRaises(InstagramException):
+            pool.acquire()
+        pool.enable(first)
+        self.assertIs(first, pool.run(lambda instagram: instagram))
+
+
+class StandInProxy(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = json.dumps({'proxy': self.server.server_port, 'url': self.path}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestProxyPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInProxy)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.live = f'http://127.0.0.1:{self.server.server_port}'
+
+        with socket.socket() as unused:
+            unused.bind(('127.0.0.1', 0))
+            self.dead = f'http://127.0.0.1:{unused.getsockname()[1]}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_failing_proxy_is_evicted_and_session_sticks_to_live_one(self):
+        pool = ProxyPool([self.dead, self.live], max_failures=1)
+        instagram = Instagram(retry_policy=RetryPolicy(max_attempts=3, base_delay=0))
+        instagram.set_proxy_pool(pool)
+
+        for _ in range(2):
+            response = instagram._Instagram__get('http://www.instagram.test/kevin/')
+            self.assertEqual(self.server.server_port, response.json()['proxy'])
+            self.assertEqual('http://www.instagram.test/kevin/', response.json()['url'])
+
+        stats = pool.get_stats()
+        self.assertTrue(stats[self.dead]['evicted'])
+        self.assertEqual((2, 1, 0.0), (stats[self.live]['requests'], stats[self.live]['sessions'],
+                                       stats[self.live]['error_rate']))
+        self.assertEqual(self.live, pool.get_proxy(id(instagram))[0])
+
+        instagram.disable_proxies()
+        self.assertEqual(0, pool.get_stats()[self.live]['sessions'])
+
+    def test_new_sessions_are_spread_over_healthy_proxies(self):
+        pool = ProxyPool([self.dead, self.live, 'http://127.0.0.1:9'])
+        pool.report(self.live, 0.05)
+        names = [pool.get_proxy(key)[0] for key in range(3)]
+        self.assertEqual(3, len(set(names)))
+        self.assertEqual(names[0], pool.get_proxy(0)[0])
+
+
+class StandInCdn(http.server.BaseHTTPRequestHandler):
+    files = {}
+    # paths whose next response is cut off after this many bytes
+    cut_after = {}
+    # paths whose next range response starts this many bytes early
+    range_shift = {}
+    # paths whose next response is an error with this status code
+    fail_next = {}
+    requests = []
+
+    def do_GET(self):
+        # like the CDN, the signature in the query does not change the file
+        path = self.path.split('?')[0]
+        StandInCdn.requests.append((path, self.headers.get('Range')))
+        body = StandInCdn.files.get(path)
+        if body is None:
+            self.send_error(404)
+            return
+        if path in StandInCdn.fail_next:
+            self.send_error(StandInCdn.fail_next.pop(path))
+            return
+
+        start = 0
+        if self.headers.get('Range'):
+            start = int(self.headers['Range'].split('=')[1].split('-')[0])
+            start -= StandInCdn.range_shift.pop(path, 0)
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body) - start))
+        self.end_headers()
+
+        cut_after = StandInCdn.cut_after.pop(path, None)
+        self.wfile.write(body[start:start + cut_after] if cut_after is not None else body[start:])
+        if cut_after is not None:
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestMediaDownloader(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInCdn)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cdn = f'http://127.0.0.1:{self.server.server_port}'
+        self.folder = tempfile.TemporaryDirectory()
+        StandInCdn.files = {}
+        StandInCdn.cut_after = {}
+        StandInCdn.range_shift = {}
+        StandInCdn.fail_next = {}
+        StandInCdn.requests = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.folder.cleanup()
+
+    def media(self, identifier, **urls):
+        props = {'id': identifier}
+        props.update({name: f'{self.cdn}{path}' for name, path in urls.items()})
+        return Media(props)
+
+    def test_resolution_falls_back_and_videos_are_picked(self):
+        downloader = MediaDownloader(self.folder.name, resolution=MediaDownloader.STANDARD)
+        image = Media({'id': '1', 'display_url': 'https://cdn.test/high.jpg',
+                       'display_resources': [{'config_width': 640, 'src': 'https://cdn.test/low.jpg'}]})
+        video = Media({'id': '2', 'is_video': True, 'display_url': 'https://cdn.test/cover.jpg',
+                       'video_url': 'https://cdn.test/video.mp4'})
+        story = Story({'id': '3', 'display_url': 'https://cdn.test/story.jpg'})
+
+        self.assertEqual('https://cdn.test/low.jpg', downloader.get_url(image))
+        self.assertEqual('https://cdn.test/video.mp4', downloader.get_url(video))
+        self.assertEqual('https://cdn.test/story.jpg', downloader.get_url(story))
+        self.assertEqual(os.path.join(self.folder.name, '2.mp4'),
+                         downloader.get_path(video, downloader.get_url(video)))
+        downloader.videos = False
+        self.assertEqual('https://cdn.test/cover.jpg', downloader.get_url(video))
+        self.assertIsNone(downloader.get_url(Media({'id': '4'})))
+
+    def test_files_are_streamed_resumed_and_deduplicated(self):
+        StandInCdn.files = {
+            '/a.jpg': os.urandom(300000),
+            '/b.mp4': os.urandom(200000),
+            '/repost.jpg': None,
+        }
+        StandInCdn.files['/repost.jpg'] = StandInCdn.files['/a.jpg']
+        StandInCdn.cut_after['/b.mp4'] = 70000
+        # left over by an earlier run that was stopped
+        with open(os.path.join(self.folder.name, '1.jpg.part'), 'wb') as f:
+            f.write(StandInCdn.files['/a.jpg'][:100000])
+
+        progress = []
+        downloader = MediaDownloader(self.folder.name, workers=3, chunk_size=8192,
+                                     retry_policy=RetryPolicy(base_delay=0),
+                                     progress=lambda result, stats: progress.append(stats['completed']))
+        results = downloader.download([
+            self.media('1', display_url='/a.jpg'),
+            self.media('2', is_video=True, display_url='/cover.jpg', video_url='/b.mp4'),
+            self.media('3', display_url='/missing.jpg'),
+        ])
+        results.append(downloader.download_media(self.media('4', display_url='/repost.jpg')))
+
+        self.assertEqual([MediaDownloader.DOWNLOADED, MediaDownloader.DOWNLOADED,
+                          MediaDownloader.FAILED, MediaDownloader.DUPLICATE],
+                         [result['status'] for result in results])
+        self.assertEqual(404, results[2]['error'].code)
+        for result, path in zip(results, ['/a.jpg', '/b.mp4', None, '/repost.jpg']):
+            if path is not None:
+                with open(result['path'], 'rb') as f:
+                    self.assertEqual(StandInCdn.files[path], f.read())
+        self.assertTrue(os.path.samefile(results[0]['path'], results[3]['path']))
+        self.assertFalse([name for name in os.listdir(self.folder.name) if name.endswith('.part')])
+
+        self.assertIn(('/a.jpg', 'bytes=100000-'), StandInCdn.requests)
+        # the dropped connection is resumed from what reached the part file
+        self.assertTrue([range_header for path, range_header in StandInCdn.requests
+                         if path == '/b.mp4' and range_header is not None])
+        stats = downloader.get_stats()
+        self.assertEqual((3, 4, 2, 1, 1, 1), (stats['queued'], stats['completed'], stats['downloaded'],
+                                              stats['duplicate'], stats['failed'], stats['resumed']))
+        self.assertEqual(200000 + 200000 + 300000, stats['bytes'])
+        self.assertEqual([1, 2, 3, 4], sorted(progress))
+
+        # a second run finds the files on disk
+        results = downloader.download([self.media('1', display_url='/a.jpg')])
+        self.assertEqual(MediaDownloader.EXISTS, results[0]['status'])
+
+    def test_medias_are_read_as_the_downloads_go(self):
+        StandInCdn.files = {f'/{i}.jpg': os.urandom(1000) for i in range(20)}
+        read = []
+
+        def medias():
+            for i in range(20):
+                read.append(i)
+                yield self.media(str(i), display_url=f'/{i}.jpg')
+
+        downloader = MediaDownloader(self.folder.name, workers=2)
+        results = downloader.iter_download(medias())
+        self.assertEqual('0', next(results)['media'].identifier)
+        self.assertLessEqual(len(read), 5)
+
+        self.assertEqual([str(i) for i in range(1, 20)],
+                         [result['media'].identifier for result in results])
+        self.assertEqual((20, 20), (downloader.get_stats()['queued'], downloader.get_stats()['completed']))
+
+    def test_wrong_ranges_and_errors_are_retried_from_a_clean_state(self):
+        StandInCdn.files = {'/v/a_n.jpg': os.urandom(100000), '/v/b_n.jpg': os.urandom(1000)}
+        with open(os.path.join(self.folder.name, 'a_n.jpg.part'), 'wb') as f:
+            f.write(StandInCdn.files['/v/a_n.jpg'][:40000])
+        # answers the resume from 30000 instead of 40000
+        StandInCdn.range_shift['/v/a_n.jpg'] = 10000
+        StandInCdn.fail_next['/v/b_n.jpg'] = 503
+
+        retry_policy = RetryPolicy(base_delay=0.05)
+        downloader = MediaDownloader(self.folder.name, retry_policy=retry_policy)
+        with patch('igramscraper.media_downloader.time.sleep') as sleep:
+            results = [downloader.download_url(f'{self.cdn}/v/{name}?oh=1', None)
+                       for name in ('a_n.jpg', 'b_n.jpg')]
+
+        for result, name in zip(results, ('a_n.jpg', 'b_n.jpg')):
+            self.assertEqual((MediaDownloader.DOWNLOADED, os.path.join(self.folder.name, name)),
+                             (result['status'], result['path']))
+            with open(result['path'], 'rb') as f:
+                self.assertEqual(StandInCdn.files[f'/v/{name}'], f.read())
+        self.assertEqual([('/v/a_n.jpg', 'bytes=40000-'), ('/v/a_n.jpg', None),
+                          ('/v/b_n.jpg', None), ('/v/b_n.jpg', None)], StandInCdn.requests)
+        self.assertEqual(1, sleep.call_count)
+        self.assertLessEqual(sleep.call_args[0][0], 0.05)
+
+        with self.assertRaises(ValueError):
+            downloader.download_url(f'{self.cdn}/', None)
+
+    def test_part_file_is_only_taken_as_complete_if_the_size_matches(self):
+        StandInCdn.files = {'/v/a_n.jpg': os.urandom(1000), '/v/b_n.jpg': os.urandom(1000)}
+        with open(os.path.join(self.folder.name, 'a_n.jpg.part'), 'wb') as f:
+            f.write(StandInCdn.files['/v/a_n.jpg'])
+        # left over from an older, larger file under the same url
+        with open(os.path.join(self.folder.name, 'b_n.jpg.part'), 'wb') as f:
+            f.write(os.urandom(3000))
+
+        downloader = MediaDownloader(self.folder.name)
+        results = [downloader.download_url(f'{self.cdn}/v/{name}', None)
+                   for name in ('a_n.jpg', 'b_n.jpg')]
+
+        for result, name in zip(results, ('a_n.jpg', 'b_n.jpg')):
+            with open(result['path'], 'rb') as f:
+                self.assertEqual(StandInCdn.files[f'/v/{name}'], f.read())
+        self.assertEqual([('/v/a_n.jpg', 'bytes=1000-'), ('/v/b_n.jpg', 'bytes=3000-'),
+                          ('/v/b_n.jpg', None)], StandInCdn.requests)
+        self.assertEqual((0, 1000), (results[0]['bytes'], results[1]['bytes']))
+
+
+class TestBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInCdn)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.folder = tempfile.TemporaryDirectory()
+        StandInCdn.files = {}
+        StandInCdn.cut_after = {}
+        StandInCdn.requests = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.folder.cleanup()
+
+    def put(self, store, name, content, ref=False):
+        path = os.path.join(self.folder.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return store.put_file(path, f'https://cdn.test/{name}?oh=1', ref=path if ref else None)
+
+    def test_normalized_url_ignores_host_and_signature(self):
+        self.assertEqual(
+            BlobStore.normalize_url('https://scontent-fra5-1.cdninstagram.com/v/t51/123_n.jpg?_nc_ht=a&oh=1&oe=2'),
+            BlobStore.normalize_url('https://instagram.fmad3-1.fna.fbcdn.net/v/t51/123_n.jpg?oe=3&oh=4'))
+        self.assertNotEqual(
+            BlobStore.normalize_url('https://cdn.test/v/t51/123_n.jpg?stp=dst-jpg_s150x150&oh=1'),
+            BlobStore.normalize_url('https://cdn.test/v/t51/123_n.jpg?stp=dst-jpg_s1080x1080&oh=1'))
+
+    def test_repeat_urls_are_served_from_the_store(self):
+        port = self.server.server_port
+        StandInCdn.files = {'/v/1_n.jpg': os.urandom(50000), '/v/2_n.jpg': None, '/v/pic_n.jpg': os.urandom(1000)}
+        StandInCdn.files['/v/2_n.jpg'] = StandInCdn.files['/v/1_n.jpg']
+        store = BlobStore(os.path.join(self.folder.name, 'store'))
+
+        first = MediaDownloader(os.path.join(self.folder.name, 'alice'), store=store)
+        first.download([Media({'id': '1', 'display_url': f'http://127.0.0.1:{port}/v/1_n.jpg?oh=a'})])
+        self.assertEqual(MediaDownloader.DOWNLOADED, first.download_url(
+            f'http://127.0.0.1:{port}/v/pic_n.jpg?oh=a', os.path.join(first.folder, 'pic.jpg'))['status'])
+
+        # another account, another CDN host and signature
+        second = MediaDownloader(os.path.join(self.folder.name, 'bob'), store=store)
+        results = second.download([
+            Media({'id': '1', 'display_url': f'http://localhost:{port}/v/1_n.jpg?oh=b'}),
+            Media({'id': '2', 'display_url': f'http://localhost:{port}/v/2_n.jpg?oh=b'}),
+        ])
+        results.append(second.download_url(f'http://localhost:{port}/v/pic_n.jpg?oh=b',
+                                           os.path.join(second.folder, 'pic.jpg')))
+
+        self.assertEqual([MediaDownloader.STORED, MediaDownloader.DUPLICATE, MediaDownloader.STORED],
+                         [result['status'] for result in results])
+        self.assertEqual(['/v/1_n.jpg', '/v/pic_n.jpg', '/v/2_n.jpg'],
+                         [path for path, _ in StandInCdn.requests])
+        blob_path = store.get_blob_path(results[0]['sha256'])
+        for result in results[:2]:
+            self.assertTrue(os.path.samefile(blob_path, result['path']))
+        self.assertEqual({'blobs': 2, 'urls': 3, 'refs': 5, 'size': 51000, 'unreferenced_size': 0},
+                         store.get_stats())
+        store.close()
+
+    def test_only_unreferenced_blobs_are_evicted(self):
+        store = BlobStore(os.path.join(self.folder.name, 'store'), max_size=250)
+        kept = self.put(store, 'a.jpg', b'a' * 100, ref=True)
+        old = self.put(store, 'b.jpg', b'b' * 100)
+        recent = self.put(store, 'c.jpg', b'c' * 100)
+        self.assertEqual(recent, store.lookup('https://other.test/c.jpg?oh=2'))
+        # over max_size, b is the least recently used blob without references
+        self.assertIsNone(store.lookup('https://cdn.test/b.jpg'))
+        self.assertFalse(os.path.exists(store.get_blob_path(old)))
+
+        self.put(store, 'd.jpg', b'd' * 100, ref=True)
+        self.assertIsNone(store.lookup('https://cdn.test/c.jpg'))
+        self.assertEqual(kept, store.lookup('https://cdn.test/a.jpg'))
+
+        # referenced blobs stay even when the store is over the limit
+        self.assertEqual(0, store.evict(150))
+        store.release(os.path.join(self.folder.name, 'a.jpg'))
+        self.assertEqual(1, store.evict(150))
+        self.assertEqual({'blobs': 1, 'urls': 1, 'refs': 1, 'size': 100, 'unreferenced_size': 0},
+                         store.get_stats())
+        store.close()
+
+    def test_deleted_archive_files_free_their_blobs(self):
+        cdn = f'http://127.0.0.1:{self.server.server_port}'
+        StandInCdn.files = {f'/v/{i}_n.jpg': bytes([i]) * 1000 for i in range(1, 4)}
+        store = BlobStore(os.path.join(self.folder.name, 'store'), max_size=2500)
+        downloader = MediaDownloader(os.path.join(self.folder.name, 'archive'), store=store)
+
+        first, second = [downloader.download_url(f'{cdn}/v/{i}_n.jpg', None) for i in (1, 2)]
+        os.remove(first['path'])
+        # the third file puts the store over max_size, which prunes the ref
+        # of the deleted file so its blob can go
+        downloader.download_url(f'{cdn}/v/3_n.jpg', None)
+        self.assertFalse(os.path.exists(store.get_blob_path(first['sha256'])))
+        self.assertIsNone(store.lookup(f'{cdn}/v/1_n.jpg'))
+        self.assertEqual({'blobs': 2, 'urls': 2, 'refs': 2, 'size': 2000, 'unreferenced_size': 0},
+                         store.get_stats())
+
+        # an archive file replaced by another file no longer holds the blob
+        replacement = second['path'] + '.new'
+        with open(replacement, 'wb') as f:
+            f.write(b'edited')
+        os.replace(replacement, second['path'])
+        self.assertEqual(1, store.prune())
+        self.assertEqual(1000, store.get_stats()['unreferenced_size'])
+        store.close()
+
+
+class TestLoginSession(unittest.TestCase):
+
+    def test_fresh_session_skips_is_logged_in_request(self):
+        response = fake_response(text='<html></html>')
+        response.cookies.get_dict.return_value = {'ds_user_id': '1'}
+
+        with tempfile.TemporaryDirectory() as folder:
+            instagram = Instagram()
+            instagram._Instagram__req = MagicMock()
+            instagram._Instagram__req.get.return_value = response
+            instagram.with_credentials('kevin', 'secret', CookieSessionManager(folder + os.path.sep, 'kevin.txt'))
+            instagram.instance_cache.set_saved_cookies(
+                json.dumps({'sessionid': 's1', 'csrftoken': 'c1', 'mid': 'm1'}))
+
+            self.assertEqual('c1', instagram.login()['x-csrftoken'])
+            self.assertEqual(1, instagram._Instagram__req.get.call_count)
+            self.assertEqual('s1', instagram.instance_cache.get_session_meta()['sessionid'])
+
+            instagram.login()
+            self.assertEqual(1, instagram._Instagram__req.get.call_count)
+
+            instagram.set_session_freshness(0)
+            instagram.login()
+            self.assertEqual(2, instagram._Instagram__req.get.call_count)
+
+    def test_bootstrap_tokens_are_shared_through_session_store(self):
+        page = fake_response(text='<script>window._sharedData = {"rhx_gis": "abc"};</script>')
+        mid = fake_response(text='mid1')
+
+        with tempfile.TemporaryDirectory() as folder:
+            tokens = []
+            for _ in range(2):
+                instagram = Instagram()
+                instagram._Instagram__req = MagicMock()
+                instagram._Instagram__req.get.side_effect = [page, mid]
+                instagram.instance_cache = CookieSessionManager(folder + os.path.sep, 'kevin.txt')
+                tokens.append(instagram._Instagram__generate_gis_token({'id': '3'}))
+                tokens.append(instagram._Instagram__generate_gis_token({'id': '3'}))
+                self.assertEqual('mid1', instagram._Instagram__get_mid())
+                self.assertEqual('abc', instagram.rhx_gis)
+
+            self.assertEqual(1, len(set(tokens)))
+            self.assertEqual(0, instagram._Instagram__req.get.call_count)
+
+    def test_stale_cached_csrf_token_is_dropped_and_fetched_again(self):
+        page = fake_response(text='<script>{"csrf_token":"fresh"}</script>')
+        page.cookies.get_dict.return_value = {'csrftoken': 'fresh', 'ig_did': 'd1'}
+        logged_in = fake_response({'authenticated': True})
+        logged_in.cookies.get_dict.return_value = {'sessionid': 's1', 'csrftoken': 'c2'}
+        logged_in.cookies.__iter__.return_value = iter([])
+
+        with tempfile.TemporaryDirectory() as folder:
+            instagram = Instagram()
+            instagram._Instagram__req = MagicMock()
+            instagram._Instagram__req.get.return_value = page
+            instagram._Instagram__req.post.side_effect = [fake_response(status_code=403),
+                                                          logged_in]
+            instagram.with_credentials('kevin', 'secret', CookieSessionManager(folder + os.path.sep, 'kevin.txt'))
+            instagram.instance_cache.update_session_meta(lambda meta: {'bootstrap': {
+                'csrf_token': {'value': 'stale', 'expires_at': time.time() + 60},
+                'mid': {'value': 'm1', 'expires_at': time.time() + 60}}})
+
+            instagram.login(force=True)
+
+            sent = [call.kwargs['headers']['x-csrftoken']
+                    for call in instagram._Instagram__req.post.call_args_list]
+            self.assertEqual(['stale', 'fresh'], sent)
+            self.assertEqual('fresh', instagram.instance_cache.get_session_meta()['bootstrap']['csrf_token']['value'])
+
+    def test_cached_csrf_token_is_not_used_for_two_step_logins(self):
+        page = fake_response(text='<script>{"csrf_token":"fresh"}</script>')
+        page.cookies.get_dict.return_value = {'csrftoken': 'fresh', 'ig_did': 'd1'}
+
+        with tempfile.TemporaryDirectory() as folder:
+            instagram = Instagram()
+            instagram._Instagram__req = MagicMock()
+            instagram._Instagram__req.get.return_value = page
+            instagram._Instagram__req.post.return_value = fake_response(status_code=500, text='down')
+            instagram.with_credentials('kevin', 'secret', CookieSessionManager(folder + os.path.sep, 'kevin.txt'))
+            instagram.instance_cache.update_session_meta(lambda meta: {'bootstrap': {
+                'csrf_token': {'value': 'cached', 'expires_at': time.time() + 60},
+                'mid': {'value': 'm1', 'expires_at': time.time() + 60}}})
+
+            with self.assertRaises(InstagramAuthException):
+                instagram.login(force=True, two_step_verificator=True)
+
+            self.assertEqual(endpoints.BASE_URL, instagram._Instagram__req.get.call_args.args[0])
+            self.assertEqual('fresh', instagram._Instagram__req.post.call_args.kwargs['headers']['x-csrftoken'])
+
+
+class TestSessionManagers(unittest.TestCase):
+
+    def test_cookie_files_are_never_read_half_written(self):
+        with tempfile.TemporaryDirectory() as folder:
+            Instagram().with_credentials('kevin', 'secret', folder + os.path.sep)
+            manager = CookieSessionManager(folder + os.path.sep, 'kevin.txt')
+            manager.set_saved_cookies(json.dumps({'sessionid': 'x' * 100000}))
+
+            # with_credentials no longer wipes a session another worker saved
+            Instagram().with_credentials('kevin', 'secret', folder + os.path.sep)
+            self.assertIsNotNone(manager.get_saved_cookies())
+
+            def write(letter):
+                for _ in range(20):
+                    manager.set_saved_cookies(json.dumps({'sessionid': letter * 100000}))
+
+            writers = [threading.Thread(target=write, args=(letter,)) for letter in 'ab']
+            for writer in writers:
+                writer.start()
+            reads = []
+            while any(writer.is_alive() for writer in writers):
+                reads.append(json.loads(manager.get_saved_cookies())['sessionid'][0])
+            for writer in writers:
+                writer.join()
+
+            self.assertTrue(set(reads) <= {'x', 'a', 'b'})
+            self.assertEqual(['kevin.txt', 'kevin.txt.lock'], sorted(os.listdir(folder)))
+
+    def test_sqlite_store_is_shared_between_workers(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'sessions.db')
+            first = SqliteSessionManager(path, 'kevin')
+            second = SqliteSessionManager(path, 'kevin')
+            other = SqliteSessionManager(path, 'derek')
+
+            first.set_saved_cookies('{"sessionid": "s1"}')
+            first.set_session_meta({'validated_at': 1.0})
+            self.assertEqual('{"sessionid": "s1"}', second.get_saved_cookies())
+            self.assertEqual({'validated_at': 1.0}, second.get_session_meta())
+            self.assertIsNone(other.get_saved_cookies())
+
+            second.empty_saved_cookies()
+            self.assertEqual((None, {}), (first.get_saved_cookies(), first.get_session_meta()))
+            for manager in (first, second, other):
+                manager.close()
+
+    def test_concurrent_meta_updates_are_not_lost(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'sessions.db')
+            for make_manager in (lambda: CookieSessionManager(folder + os.path.sep, 'kevin.txt'),
+                                 lambda: SqliteSessionManager(path, 'kevin')):
+                def update(worker):
+                    manager = make_manager()
+                    for i in range(20):
+                        manager.update_session_meta(
+                            lambda meta: meta.setdefault('bootstrap', {}).update({f'{worker}-{i}': i}))
+
+                workers = [threading.Thread(target=update, args=(worker,)) for worker in range(4)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                self.assertEqual(80, len(make_manager().get_session_meta()['bootstrap']))
+
+    def test_reading_a_missing_session_creates_no_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            manager = CookieSessionManager(os.path.join(folder, 'sessions') + os.path.sep, 'kevin.txt')
+            self.assertEqual((None, {}), (manager.get_saved_cookies(), manager.get_session_meta()))
+            self.assertEqual([], os.listdir(folder))
+
+
+class TestTagDedup(unittest.TestCase):
+
+    def get_medias_by_tag(self, pages, **kwargs):
+        instagram = fake_instagram([fake_response(page) for page in pages])
+        return [media.identifier for media in instagram.get_medias_by_tag('dogs', **kwargs)]
+
+    def test_duplicates_are_skipped_instead_of_ending_the_crawl(self):
+        pages = [tag_page([1, 2, 3], 'c1', True), tag_page([3, 2, 4, 5], 'c2', False)]
+        self.assertEqual(['1', '2', '3', '4', '5'], self.get_medias_by_tag(pages, count=10))
+
+    def test_bloom_filter_remembers_ids_across_runs(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'dogs.bloom')
+            seen = BloomFilter(capacity=1000, path=path)
+            self.assertEqual(['1', '2'], self.get_medias_by_tag(
+                [tag_page([1, 2], None, False)], count=10, seen=seen))
+            seen.save()
+
+            seen = BloomFilter(path=path)
+            self.assertEqual((2, 1000), (len(seen), seen.capacity))
+            self.assertEqual(['3'], self.get_medias_by_tag(
+                [tag_page([3, 2, 1], None, False)], count=10, seen=seen))
+
+    def test_walk_through_seen_pages_is_bounded(self):
+        seen = BloomFilter(capacity=1000)
+        for i in range(1, 7):
+            seen.add(str(i))
+        pages = [tag_page([1, 2], 'c1', True), tag_page([3, 4], 'c2', True),
+                 tag_page([5, 6], 'c3', True), tag_page([7], None, False)]
+        self.assertEqual([], self.get_medias_by_tag(pages, count=10, seen=seen, max_seen_pages=2))
+        self.assertEqual(['7'], self.get_medias_by_tag(pages, count=10, seen=seen, max_seen_pages=None))
+
+    def test_bloom_filter_false_positive_rate(self):
+        seen = BloomFilter(capacity=10000, error_rate=0.01)
+        for i in range(10000):
+            seen.add(i)
+        self.assertTrue(all(i in seen for i in range(10000)))
+        false_positives = sum(1 for i in range(10000, 20000) if i in seen)
+        self.assertLess(false_positives, 200)
+
+
+class TestMediaWatcher(unittest.TestCase):
+
+    def watcher(self, pages, **kwargs):
+        instagram = fake_instagram([fake_response(page) for page in pages])
+        return MediaWatcher(instagram, **kwargs), instagram._Instagram__req.get
+
+    def test_poll_stops_at_the_high_water_mark(self):
+        polls = []
+        watcher, get = self.watcher([
+            tag_page([5, 6], 'c1', True),
+            tag_page([2, 3], 'c2', True),
+            tag_page([4, 5], 'c3', True),
+        ], callback=lambda kind, target, medias: polls.append(
+            [media.identifier for media in medias]))
+        watcher.watch_tag('dogs')
+
+        self.assertEqual(['5', '6'], [media.identifier for media in watcher.poll_all()[('tag', 'dogs')]])
+        self.assertEqual(1, get.call_count)
+
+        # 2 and 3 are newer than 5, the next poll ends at 5 on its second page
+        self.assertEqual(['2', '3', '4'], [media.identifier for media in watcher.poll('tag', 'dogs')])
+        self.assertEqual(3, get.call_count)
+        self.assertEqual([['5', '6'], ['2', '3', '4']], polls)
+        self.assertEqual({'created_time': 1600000000 - 2, 'id': 2},
+                         watcher.get_mark('tag', 'dogs'))
+
+    def test_marks_are_kept_across_runs(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'marks.json')
+            watcher, _ = self.watcher([tag_page([3, 4], None, False)], path=path)
+            watcher.poll(MediaWatcher.TAG, 'dogs')
+
+            watcher, get = self.watcher([tag_page([1, 2, 3, 4], 'c1', True)], path=path)
+            self.assertEqual(['1', '2'], [media.identifier for media in watcher.poll(MediaWatcher.TAG, 'dogs')])
+            self.assertEqual(1, get.call_count)
+
+    def test_burst_larger_than_max_pages_is_read_over_several_polls(self):
+        watcher, get = self.watcher([
+            tag_page([5, 6], 'c0', True),
+            tag_page([1, 2], 'c1', True),
+            tag_page([3, 4, 5], 'c2', True),
+        ], max_pages=1)
+        watcher.poll(MediaWatcher.TAG, 'dogs')
+
+        self.assertEqual(['1', '2'], [media.identifier for media in watcher.poll(MediaWatcher.TAG, 'dogs')])
+        mark = watcher.get_mark(MediaWatcher.TAG, 'dogs')
+        self.assertEqual((1600000000 - 5, 5), (mark['created_time'], mark['id']))
+        self.assertEqual({'next_page': 'c1', 'created_time': 1600000000 - 1, 'id': 1}, mark['resume'])
+
+        self.assertEqual(['3', '4'], [media.identifier for media in watcher.poll(MediaWatcher.TAG, 'dogs')])
+        self.assertIn('max_id=c1', get.call_args.args[0])
+        self.assertEqual({'created_time': 1600000000 - 1, 'id': 1},
+                         watcher.get_mark(MediaWatcher.TAG, 'dogs'))
+
+
+class TestCrawlScheduler(unittest.TestCase):
+
+    def scheduler(self, pages, **kwargs):
+        requested = []
+
+        def get(url, **_):
+            tag = url.split('/tags/')[1].split('/')[0]
+            cursor = urllib.parse.parse_qs(urllib.parse.urlparse(url).query).get('max_id', [''])[0]
+            requested.append((tag, cursor))
+            return fake_response(pages[(tag, cursor)])
+
+        instagram = fake_instagram(get)
+        return CrawlScheduler(MediaWatcher(instagram, initial_pages=3), **kwargs), requested
+
+    def test_page_fetches_of_targets_are_interleaved(self):
+        scheduler, requested = self.scheduler({
+            ('dogs', ''): tag_page([1], 'd1', True),
+            ('dogs', 'd1'): tag_page([2], 'd2', True),
+            ('dogs', 'd2'): tag_page([3], None, False),
+            ('cats', ''): tag_page([11], 'c1', True),
+            ('cats', 'c1'): tag_page([12], None, False),
+        })
+        scheduler.add_tag('dogs', refresh_interval=60)
+        scheduler.add_tag('cats', refresh_interval=60)
+
+        while scheduler.step():
+            pass
+
+        self.assertEqual([('dogs', ''), ('cats', ''), ('dogs', 'd1'),
+                          ('cats', 'c1'), ('dogs', 'd2')], requested)
+        stats = {stat['target']: stat for stat in scheduler.get_stats()}
+        self.assertEqual((1, 3, 3), (stats['dogs']['polls'], stats['dogs']['requests'],
+                                     stats['dogs']['new_medias']))
+        self.assertEqual((1, 2, 2), (stats['cats']['polls'], stats['cats']['requests'],
+                                     stats['cats']['new_medias']))
+        # nothing is due again before the refresh interval has passed
+        self.assertFalse(scheduler.step())
+
+    def test_higher_priority_target_goes_first(self):
+        scheduler, requested = self.scheduler({
+            ('dogs', ''): tag_page([1], None, False),
+            ('cats', ''): tag_page([11], None, False),
+        })
+        scheduler.add_tag('dogs')
+        scheduler.add_tag('cats', priority=5)
+
+        while scheduler.step():
+            pass
+
+        self.assertEqual([('cats', ''), ('dogs', '')], requested)
+
+    def test_workers_poll_every_target(self):
+        pages = {(f'tag{i}', ''): tag_page([i], None, False) for i in range(20)}
+        scheduler, requested = self.scheduler(pages, workers=4)
+        for i in range(20):
+            scheduler.add_tag(f'tag{i}', refresh_interval=3600)
+
+        stop_event = threading.Event()
+        thread = threading.Thread(target=scheduler.run, args=(stop_event,))
+        thread.start()
+        for _ in range(500):
+            if all(stat['polls'] for stat in scheduler.get_stats()):
+                break
+            stop_event.wait(0.01)
+        stop_event.set()
+        thread.join()
+
+        self.assertEqual(sorted(pages), sorted(requested))
+        self.assertTrue(all(stat['error'] is None for stat in scheduler.get_stats()))
+
+
+class TestSharedData(unittest.TestCase):
+
+    def test_extract_shared_data_from_body(self):
+        body = ('<script>var a = "</script>";</script><script type="text/javascript">'
+                'window._sharedData = {"config": {"csrf_token": "abc"}, "text": ";</script>"};'
+                '</script><script>window.__other = {};</script>')
+        shared_data = Instagram.extract_shared_data_from_body(body)
+        self.assertEqual('abc', shared_data['config']['csrf_token'])
+        self.assertEqual(';</script>', shared_data['text'])
+        self.assertIsNone(Instagram.extract_shared_data_from_body('<html></html>'))
+
+
+class TestModelDispatch(unittest.TestCase):
+
+    def test_story_skips_owner_and_legacy_models_still_parse(self):
+        props = {'id': '1', 'shortcode': 'abc', 'owner': {'id': '2'},
+                 'is_video': True, 'unknown': 1}
+        self.assertEqual('2', Media(props).owner.identifier)
+
+        story = Story(props)
+        self.assertEqual(('1', 'abc', Media.TYPE_VIDEO, None),
+                         (story.identifier, story.short_code, story.type, story.owner))
+
+        class LegacyMedia(Media):
+            def _init_properties_custom(self, value, prop, arr):
+                if prop == 'shortcode':
+                    self.short_code = value.upper()
+
+        self.assertEqual('ABC', LegacyMedia(props).short_code)
+
+        class ExtendedMedia(Media):
+            def _init_properties_custom(self, value, prop, arr):
+                if prop == 'shortcode':
+                    value = value.upper()
+                super()._init_properties_custom(value, prop, arr)
+
+        media = ExtendedMedia(props)
+        self.assertEqual(('1', 'ABC', Media.TYPE_VIDEO, {}),
+                         (media.identifier, media.short_code, media.type, media._data))
+
+    def test_owner_and_comments_are_built_on_first_access(self):
+        with patch.object(Media, '_new_account') as new_account, \
+                patch.object(Media, '_new_comment') as new_comment:
+            media = Media({'id': '1', 'owner': {'id': '2'}, 'edge_media_to_comment': {
+                'count': 1, 'edges': [{'node': {'id': '3', 'owner': {'id': '4'}}}]}})
+            self.assertEqual(1, media.comments_count)
+            new_account.assert_not_called()
+            new_comment.assert_not_called()
+
+        self.assertEqual('2', media.owner.identifier)
+        self.assertIs(media.owner, media.owner)
+        self.assertEqual(['4'], [c.owner.identifier for c in media.comments])
+
+    def test_null_owner_is_an_empty_account(self):
+        media = Media({'id': '1', 'owner': None, 'edge_media_to_comment': {
+            'count': 1, 'edges': [{'node': {'id': '3', 'owner': None}}]}})
+        self.assertIsNone(media.owner_id)
+        self.assertIsInstance(media.owner, Account)
+        self.assertIsNone(media.owner.username)
+        self.assertIsInstance(media.comments[0].owner, Account)
+
+
+class TestGetAccounts(unittest.TestCase):
+
+    def test_batch_is_deduplicated_ordered_and_reports_errors(self):
+        def get_account(username):
+            if username == 'missing':
+                raise InstagramNotFoundException('Account with given username does not exist.')
+            return username.upper()
+
+        instagram = Instagram()
+        with patch.object(instagram, 'get_account', side_effect=get_account) as mocked:
+            results = instagram.get_accounts(['kevin', 'missing', 'bob', 'kevin'], 2)
+
+        self.assertEqual(3, mocked.call_count)
+        self.assertEqual(['kevin', 'missing', 'bob'], [r['username'] for r in results])
+        self.assertEqual(['KEVIN', None, 'BOB'], [r['account'] for r in results])
+        self.assertIsInstance(results[1]['error'], InstagramNotFoundException)
+
+
+class TestFollowerSnapshots(unittest.TestCase):
+
+    def test_refresh_reports_added_and_removed(self):
+        with tempfile.TemporaryDirectory() as folder:
+            snapshots = FollowerSnapshots(folder)
+            self.assertTrue(snapshots.refresh(3, ['1', '2', '5'])['is_initial'])
+
+            changes = snapshots.refresh(3, ['2', '5', '7'])
+            self.assertEqual([7], changes['added'])
+            self.assertEqual([1], changes['removed'])
+
+            reloaded = FollowerSnapshots(folder)
+            self.assertEqual([2, 5, 7], list(reloaded.get_snapshot(3)))
+            self.assertEqual(1, len(reloaded.get_changes(3)))
+
+    def test_diff_of_sorted_ids(self):
+        added, removed = FollowerSnapshots.diff([1, 3, 4, 9], [2, 3, 9, 10])
+        self.assertEqual([2, 10], added)
+        self.assertEqual([1, 4], removed)
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_repeated_lookup_is_answered_from_cache(self):
+        with tempfile.TemporaryDirectory() as folder:
+            instagram = Instagram()
+            instagram.set_response_cache(ResponseCache(folder=folder))
+            instagram._Instagram__req = MagicMock()
+            response = fake_response({'graphql': {'location': {'id': '1', 'name': 'Dog Patch Labs'}}})
+            response.content = b'{"graphql": {"location": {"id": "1", "name": "Dog Patch Labs"}}}'
+            response.encoding = 'utf-8'
+            instagram._Instagram__req.get.return_value = response
+
+            self.assertEqual('Dog Patch Labs', instagram.get_location_by_id(1).name)
+            self.assertEqual('Dog Patch Labs', instagram.get_location_by_id(1).name)
+            self.assertEqual(1, instagram._Instagram__req.get.call_count)
+            self.assertEqual(1, instagram.response_cache.hits)
+
+            on_disk = ResponseCache(folder=folder)
+            url = endpoints.get_medias_json_by_location_id_link(1)
+            self.assertEqual('1', on_disk.get(url).json()['graphql']['location']['id'])
+
+    def test_not_modified_reuses_parsed_model(self):
+        instagram = Instagram()
+        instagram.set_validator_store(ValidatorStore())
+        instagram._Instagram__req = MagicMock()
+        response = fake_response()
+        response.content = b'{"graphql": {"location": {"id": "1", "name": "Dog Patch Labs"}}}'
+        response.encoding = 'utf-8'
+        response.headers = {'ETag': '"v1"'}
+        instagram._Instagram__req.get.side_effect = [response, fake_response(status_code=304)]
+
+        location = instagram.get_location_by_id(1)
+        self.assertIs(location, instagram.get_location_by_id(1))
+        headers = instagram._Instagram__req.get.call_args[1]['headers']
+        self.assertEqual('"v1"', headers['If-None-Match'])
+        self.assertEqual(1, instagram.validator_store.not_modified_count)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_rate_backs_off_on_429_and_recovers(self):
+        limiter = RateLimiter(rate=4.0, increase=1.0)
+        url = endpoints.get_followers_json_link({'id': '3'})
+        self.assertEqual('graphql', limiter.get_endpoint_class(url))
+
+        limiter.update(url, 429, {'Retry-After': '0'})
+        self.assertEqual(2.0, limiter.get_rate('graphql'))
+        limiter.update(url, 200)
+        self.assertEqual(3.0, limiter.get_rate('graphql'))
+        self.assertEqual(4.0, limiter.get_rate('page'))
+
+    def test_fixed_sleep_between_requests_is_kept(self):
+        instagram = Instagram(sleep_between_requests=2)
+        instagram.rate_limiter.update(endpoints.BASE_URL, 200)
+        self.assertEqual(0.5, instagram.rate_limiter.get_rate('page'))
+
+
+class TestAsyncInstagram(unittest.TestCase):
+
+    def test_awaitable_methods_call_wrapped_instance(self):
+        class FakeInstagram:
+            def get_account(self, username):
+                return 'account:' + username
+
+        instagram = AsyncInstagram(FakeInstagram(), max_workers=2)
+
+        async def fetch():
+            return await asyncio.gather(instagram.get_account('kevin'),
+                                        instagram.get_account('bob'))
+
+        self.assertEqual(['account:kevin', 'account:bob'], asyncio.run(fetch()))
+        instagram.close()
+
 if __name__ == '__main__':
     unittest.main()
 